@@ -0,0 +1,108 @@
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from game_state import GameState
+from players import RandomPlayer, EnginePlayer, ENGINE_RANDOM_PLIES
+
+
+def make_player(kind, depth, seed):
+    if kind == 'random':
+        return RandomPlayer(seed)
+    if kind == 'engine':
+        return EnginePlayer(max_depth=depth, seed=seed)
+    raise ValueError(f"unknown player {kind!r}")
+
+
+def opening_plies(player_kinds, random_plies=None):
+    # None picks the default, two engines without random plies would replay the same two games
+    engines = player_kinds.count('engine')
+    if random_plies is None:
+        return ENGINE_RANDOM_PLIES if engines else 0
+    if engines == 2 and random_plies < 1:
+        raise ValueError("engine players are deterministic, engine vs engine needs random_plies > 0 for its games to differ")
+    return random_plies
+
+
+def play_game(white, black, max_plies=200, backend='board', random_plies=0, rng=None):
+    state = GameState(backend, max_plies)
+    players = {'white': white, 'black': black}
+    while not state.is_over():
+        if len(state.history) < random_plies:
+            state.play(rng.choice(state.valid_moves))
+        else:
+            state.play(players[state.turn].select_move(state.board_instance, state.turn))
+    return state
+
+
+def play_games(first_game, games, player_kinds, depths, max_plies, backend, seed, random_plies=None):
+    # player_kinds[0] is "player one"; colors alternate every game so both sides get white
+    random_plies = opening_plies(player_kinds, random_plies)
+    rng = random.Random(seed * 1000003 + first_game)
+    stats = {'wins': 0, 'draws': 0, 'losses': 0, 'plies': 0, 'results': {}}
+    for game in range(first_game, first_game + games):
+        one = make_player(player_kinds[0], depths[0], rng.getrandbits(32))
+        two = make_player(player_kinds[1], depths[1], rng.getrandbits(32))
+        one_color = 'white' if game % 2 == 0 else 'black'
+        white, black = (one, two) if one_color == 'white' else (two, one)
+        state = play_game(white, black, max_plies, backend, random_plies, rng)
+        score = state.score(one_color)
+        stats['wins' if score == 1.0 else 'losses' if score == 0.0 else 'draws'] += 1
+        stats['plies'] += len(state.history)
+        stats['results'][state.result] = stats['results'].get(state.result, 0) + 1
+    return stats
+
+
+def run_match(games, player_kinds=('random', 'random'), depths=(1, 1), workers=1, games_per_task=10, max_plies=200, backend='board', seed=0, random_plies=None):
+    random_plies = opening_plies(player_kinds, random_plies)
+    start = time.perf_counter()
+    tasks = [(first, min(games_per_task, games - first)) for first in range(0, games, games_per_task)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(play_games, first, count, player_kinds, depths, max_plies, backend, seed, random_plies) for first, count in tasks]
+            outcomes = [future.result() for future in futures]
+    else:
+        outcomes = [play_games(first, count, player_kinds, depths, max_plies, backend, seed, random_plies) for first, count in tasks]
+    elapsed = time.perf_counter() - start
+
+    totals = {'wins': 0, 'draws': 0, 'losses': 0, 'plies': 0, 'results': {}}
+    for outcome in outcomes:
+        for field in ('wins', 'draws', 'losses', 'plies'):
+            totals[field] += outcome[field]
+        for result, count in outcome['results'].items():
+            totals['results'][result] = totals['results'].get(result, 0) + count
+    return {
+        'players': list(player_kinds),
+        'games': games,
+        'random_plies': random_plies,
+        'player_one': {'wins': totals['wins'], 'draws': totals['draws'], 'losses': totals['losses']},
+        'score': (totals['wins'] + totals['draws'] / 2) / games if games else 0,
+        'results': totals['results'],
+        'seconds': elapsed,
+        'games_per_minute': games * 60 / elapsed if elapsed > 0 else 0,
+        'plies_per_second': totals['plies'] / elapsed if elapsed > 0 else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless engine vs engine matches, results printed as JSON")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--one', choices=['random', 'engine'], default='random')
+    parser.add_argument('--two', choices=['random', 'engine'], default='random')
+    parser.add_argument('--depth-one', type=int, default=1)
+    parser.add_argument('--depth-two', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--games-per-task', type=int, default=10)
+    parser.add_argument('--max-plies', type=int, default=200)
+    parser.add_argument('--backend', choices=['board', 'bitboard'], default='board')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--random-plies', type=int, default=None, help=f"random opening plies per game, default {ENGINE_RANDOM_PLIES} with an engine player and 0 otherwise")
+    args = parser.parse_args()
+    result = run_match(args.games, (args.one, args.two), (args.depth_one, args.depth_two), args.workers,
+                       args.games_per_task, args.max_plies, args.backend, args.seed, args.random_plies)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
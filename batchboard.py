@@ -0,0 +1,321 @@
+import argparse
+import json
+import time
+import numpy as np
+from board import Board
+from piece import colors, figures
+from notation import move_squares
+
+# N independent positions in one (N, 65) int8 array, the Board.serialize layout: signed square codes
+# (positive white) and the side to move. Moves are flat from * 64 + to indices like notation.encode_move
+ONGOING, CHECKMATE, STALEMATE, INSUFFICIENT_MATERIAL = 0, 1, 2, 3
+NO_MOVE = -1
+
+PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING = (figures[name] for name in ('Pawn', 'Rook', 'Knight', 'Bishop', 'Queen', 'King'))
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+KNIGHT_OFFSETS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+# white pawns move up the rows, black pawns down
+PAWN_DIRECTION = {colors['white']: 1, colors['black']: -1}
+PAWN_START_ROW = {colors['white']: 1, colors['black']: 6}
+
+
+def on_board(row, col):
+    return 0 <= row < 8 and 0 <= col < 8
+
+
+def build_tables():
+    # square 64 is an off-board pad: every table maps missing squares there and has an empty row for it
+    ray_squares = np.full((65, 8, 7), 64)
+    between = np.zeros((64, 64, 64), dtype=bool)
+    ray_line = np.zeros((64, 8, 64), dtype=bool)
+    pair_index = np.full(64 * 64, 7 * 64 * 8)
+    knight_targets = np.full((65, 8), 64)
+    king_targets = np.full((65, 8), 64)
+    pawn_pushes = np.full((2, 64), 64)
+    pawn_doubles = np.full((2, 64), 64)
+    pawn_captures = np.full((2, 64, 2), 64)
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        for d, (dr, dc) in enumerate(DIRECTIONS):
+            passed = []
+            for step in range(7):
+                r, c = row + dr * (step + 1), col + dc * (step + 1)
+                if not on_board(r, c):
+                    break
+                target = r * 8 + c
+                ray_squares[sq, d, step] = target
+                ray_line[sq, d, target] = True
+                # slider moves are gathered from a (step, square, direction) layout
+                pair_index[sq * 64 + target] = step * 512 + sq * 8 + d
+                between[sq, target, passed] = True
+                passed.append(target)
+            if on_board(row + dr, col + dc):
+                king_targets[sq, d] = (row + dr) * 8 + col + dc
+        for j, (dr, dc) in enumerate(KNIGHT_OFFSETS):
+            if on_board(row + dr, col + dc):
+                knight_targets[sq, j] = (row + dr) * 8 + col + dc
+        for color, dr in PAWN_DIRECTION.items():
+            for j, dc in enumerate((1, -1)):
+                if on_board(row + dr, col + dc):
+                    pawn_captures[color, sq, j] = (row + dr) * 8 + col + dc
+            if on_board(row + dr, col):
+                pawn_pushes[color, sq] = (row + dr) * 8 + col
+            if row == PAWN_START_ROW[color]:
+                pawn_doubles[color, sq] = (row + 2 * dr) * 8 + col
+    return ray_squares, between, ray_line, pair_index, knight_targets, king_targets, pawn_pushes, pawn_doubles, pawn_captures
+
+
+def target_masks(targets):
+    # (65, 64) boolean rows from (65, k) target lists
+    masks = np.zeros((65, 65), dtype=bool)
+    masks[np.arange(65)[:, None], targets] = True
+    return masks[:, :64]
+
+
+RAY_SQUARES, BETWEEN, RAY_LINE, PAIR_INDEX, KNIGHT_TARGETS, KING_TARGETS, PAWN_PUSHES, PAWN_DOUBLES, PAWN_CAPTURES = build_tables()
+STEP_SQUARES = RAY_SQUARES[:64].transpose(2, 0, 1).reshape(-1)
+STEP_VALID = (STEP_SQUARES < 64).reshape(7, 512)
+STEP_NUMBERS = np.arange(7)
+KNIGHT_MASK = target_masks(KNIGHT_TARGETS)
+KING_MASK = target_masks(KING_TARGETS)
+# PAWN_ATTACKS[color, sq]: squares a pawn of that color on sq attacks, also the squares an enemy pawn attacks sq from
+PAWN_ATTACKS = np.stack([target_masks(np.vstack([PAWN_CAPTURES[color], np.full((1, 2), 64)])) for color in (0, 1)])
+# the enemy slider codes (relative to the side to move) that attack along each ray
+SLIDER_CODES = np.where(np.arange(8) < 4, -ROOK, -BISHOP)
+
+
+def ray_directions(piece_figures):
+    # (N, 64, 8): the piece on the square slides along the ray
+    orthogonal = (piece_figures == ROOK) | (piece_figures == QUEEN)
+    diagonal = (piece_figures == BISHOP) | (piece_figures == QUEEN)
+    return np.where(np.arange(8) < 4, orthogonal[..., None], diagonal[..., None])
+
+
+def slider_hits(codes):
+    # the relative codes on the 8 rays (last axis) are enemy sliders that move along that ray
+    return (codes == SLIDER_CODES) | (codes == -QUEEN)
+
+
+def scan_rays(padded, squares):
+    # for every ray out of each of squares (N, S): the first and second pieces met (relative codes,
+    # 0 for none) and the square of the first, each (N, S, 8)
+    count = len(padded)
+    ray_squares = RAY_SQUARES[squares]
+    along = np.take_along_axis(padded, ray_squares.reshape(count, -1), axis=1).reshape(ray_squares.shape)
+    occupied = along != 0
+    first_step = occupied.argmax(axis=-1)[..., None]
+    first = np.take_along_axis(along, first_step, axis=-1)[..., 0]
+    first_square = np.take_along_axis(ray_squares, first_step, axis=-1)[..., 0]
+    beyond = occupied & (STEP_NUMBERS > first_step)
+    second = np.take_along_axis(along, beyond.argmax(axis=-1)[..., None], axis=-1)[..., 0] * beyond.any(axis=-1)
+    return first, second, first_square
+
+
+class BatchBoard:
+    def __init__(self, codes):
+        self.codes = np.array(codes, dtype=np.int8).reshape(-1, 65)
+
+    @classmethod
+    def start(cls, count):
+        return cls(np.tile(np.frombuffer(Board().serialize(), dtype=np.int8), (count, 1)))
+
+    @classmethod
+    def from_boards(cls, boards):
+        return cls(np.frombuffer(b''.join(board_instance.serialize() for board_instance in boards), dtype=np.int8))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def to_board(self, index):
+        return Board.from_serialized(self.codes[index].tobytes())
+
+    def generate(self):
+        # legal from-to masks (N, 64, 64) and check flags (N,) for the side to move of every position
+        codes = self.codes
+        count = len(codes)
+        turn = codes[:, 64].astype(np.intp)
+        # relative codes, positive for the side to move, with the off-board pad square 64 left empty
+        padded = np.zeros((count, 65), dtype=np.int8)
+        padded[:, :64] = codes[:, :64] * np.where(turn == 0, 1, -1).astype(np.int8)[:, None]
+        relative = padded[:, :64]
+        own, enemy = padded > 0, padded < 0
+        empty = padded == 0
+        empty[:, 64] = False
+        own_figures = np.where(own[:, :64], relative, 0)
+        own_kings = own_figures == KING
+        has_king = own_kings.any(axis=1)
+        king_square = np.where(has_king, own_kings.argmax(axis=1), 64)
+
+        # sliders, dense: rays walked one step at a time over (step, square, direction), then every
+        # (from, to) pair gathered from the step that reaches it
+        along = (padded != 0).take(STEP_SQUARES, axis=1).reshape(count, 7, 512)
+        reach = np.empty((count, 7, 512), dtype=bool)
+        reach[:, 0] = True
+        for step in range(1, 7):
+            np.logical_and(reach[:, step - 1], ~along[:, step - 1], out=reach[:, step])
+        reach &= STEP_VALID
+        reach &= ray_directions(own_figures).reshape(count, 1, 512)
+        slides = np.zeros((count, 7 * 512 + 1), dtype=bool)
+        slides[:, :-1] = reach.reshape(count, -1)
+        mask = slides.take(PAIR_INDEX, axis=1)
+        squares = mask.reshape(count, 64, 64)
+        squares &= ~own[:, None, :64]
+
+        # knights and pawns, sparse: only the squares that hold one are looked at
+        knight_rows, knight_squares = np.nonzero(own_figures == KNIGHT)
+        targets = KNIGHT_TARGETS[knight_squares]
+        found, slots = np.nonzero(~own[knight_rows[:, None], targets] & (targets < 64))
+        mask[knight_rows[found], knight_squares[found] * 64 + targets[found, slots]] = True
+        pawn_rows, pawn_squares = np.nonzero(own_figures == PAWN)
+        pawn_colors = turn[pawn_rows]
+        pushes = PAWN_PUSHES[pawn_colors, pawn_squares]
+        pushed = empty[pawn_rows, pushes]
+        mask[pawn_rows[pushed], pawn_squares[pushed] * 64 + pushes[pushed]] = True
+        doubles = PAWN_DOUBLES[pawn_colors, pawn_squares]
+        doubled = pushed & empty[pawn_rows, doubles]
+        mask[pawn_rows[doubled], pawn_squares[doubled] * 64 + doubles[doubled]] = True
+        captures = PAWN_CAPTURES[pawn_colors, pawn_squares]
+        found, slots = np.nonzero(enemy[pawn_rows[:, None], captures])
+        mask[pawn_rows[found], pawn_squares[found] * 64 + captures[found, slots]] = True
+
+        # the king's rays: the first piece is a checker if it is an enemy slider of the ray's kind,
+        # or pinned if it is ours with such a slider right behind it
+        first, second, first_square = (part[:, 0] for part in scan_rays(padded, king_square[:, None]))
+        checkers = np.zeros((count, 65), dtype=bool)
+        check_rows, check_rays = np.nonzero(slider_hits(first))
+        checkers[check_rows, first_square[check_rows, check_rays]] = True
+        checkers = checkers[:, :64]
+        checkers |= KNIGHT_MASK[king_square] & (relative == -KNIGHT)
+        checkers |= PAWN_ATTACKS[turn, king_square] & (relative == -PAWN)
+        checks = checkers.sum(axis=1)
+
+        # in check: capture the checker or block its ray; in double check only the king moves
+        check_rows = np.flatnonzero(checks)
+        evasions = checkers[check_rows] | BETWEEN[king_square[check_rows], checkers[check_rows].argmax(axis=1)]
+        squares[check_rows] &= (evasions & (checks[check_rows] == 1)[:, None])[:, None, :]
+        pin_rows, pin_rays = np.nonzero((first > 0) & slider_hits(second))
+        squares[pin_rows, first_square[pin_rows, pin_rays]] &= RAY_LINE[king_square[pin_rows], pin_rays]
+
+        # king steps, tested with the king lifted off its square so it cannot retreat along a checking ray
+        king_rows = np.flatnonzero(has_king)
+        kings = king_square[king_rows]
+        targets = KING_TARGETS[kings]
+        lifted = padded[king_rows]
+        lifted[np.arange(len(king_rows)), kings] = 0
+        enemy_codes = lifted[:, None, :64]
+        attacked = slider_hits(scan_rays(lifted, targets)[0]).any(axis=-1)
+        attacked |= (KNIGHT_MASK[targets] & (enemy_codes == -KNIGHT)).any(axis=-1)
+        attacked |= (KING_MASK[targets] & (enemy_codes == -KING)).any(axis=-1)
+        attacked |= (PAWN_ATTACKS[turn[king_rows][:, None], targets] & (enemy_codes == -PAWN)).any(axis=-1)
+        found, slots = np.nonzero(~attacked & ~own[king_rows[:, None], targets] & (targets < 64))
+        mask[king_rows[found], kings[found] * 64 + targets[found, slots]] = True
+        return squares, checks > 0
+
+    def status(self):
+        # legal masks, check flags and the terminal state of every position
+        mask, in_check = self.generate()
+        no_moves = ~mask.reshape(len(mask), -1).any(axis=1)
+        terminal = np.full(len(mask), ONGOING, dtype=np.int8)
+        terminal[np.count_nonzero(self.codes[:, :64], axis=1) == 2] = INSUFFICIENT_MATERIAL
+        terminal[no_moves & ~in_check] = STALEMATE
+        terminal[no_moves & in_check] = CHECKMATE
+        return mask, in_check, terminal
+
+    def apply(self, moves):
+        # plays one flat from * 64 + to move per position in place, NO_MOVE leaves the position as it is;
+        # returns the captured codes
+        moves = np.asarray(moves)
+        rows = np.flatnonzero(moves != NO_MOVE)
+        starts, ends = np.divmod(moves[rows], 64)
+        captured = np.zeros(len(self.codes), dtype=np.int8)
+        captured[rows] = self.codes[rows, ends]
+        self.codes[rows, ends] = self.codes[rows, starts]
+        self.codes[rows, starts] = 0
+        self.codes[rows, 64] ^= 1
+        return captured
+
+    def children(self, mask):
+        # every position after every legal move, with the index of its parent
+        parents, moves = np.nonzero(mask.reshape(len(mask), -1))
+        batch = BatchBoard(self.codes[parents])
+        batch.apply(moves)
+        return batch, parents
+
+
+def random_moves(mask, rng):
+    # one uniformly random legal move per position, NO_MOVE where there is none
+    count = len(mask)
+    rows, moves = np.nonzero(mask.reshape(count, -1))
+    counts = np.bincount(rows, minlength=count)
+    picks = np.cumsum(counts) - counts + (rng.random(count) * counts).astype(np.int64)
+    chosen = np.full(count, NO_MOVE)
+    chosen[counts > 0] = moves[picks[counts > 0]]
+    return chosen
+
+
+def batch_perft(batch, depth):
+    # leaf count, one whole ply of the tree per step
+    if depth == 0:
+        return len(batch)
+    for _ in range(depth - 1):
+        mask, _ = batch.generate()
+        batch, _ = batch.children(mask)
+    mask, _ = batch.generate()
+    return int(mask.sum())
+
+
+def compare_with_board(batch, mask, in_check):
+    # positions whose masks or check flags differ from Board.legal_moves / is_check
+    mismatches = []
+    for index in range(len(batch)):
+        board_instance = batch.to_board(index)
+        expected = np.zeros((64, 64), dtype=bool)
+        for move in board_instance.legal_moves(board_instance.turn):
+            expected[move_squares(move)] = True
+        if not np.array_equal(expected, mask[index]) or board_instance.is_check(board_instance.turn)[0] != in_check[index]:
+            mismatches.append(board_instance.to_fen())
+    return mismatches
+
+
+def verify(games=64, plies=120, depth=3, seed=0):
+    # perft against the reference counts, then lockstep random games checked against Board every ply
+    import perft
+    counts = {}
+    for name, reference in perft.reference_positions.items():
+        batch = BatchBoard.from_boards([Board.from_fen(reference['fen'])])
+        nodes = [batch_perft(batch, level) for level in range(1, depth + 1)]
+        counts[name] = nodes
+        assert nodes == reference['nodes'][:depth], f"{name}: {nodes} != {reference['nodes'][:depth]}"
+
+    rng = np.random.default_rng(seed)
+    batch = BatchBoard.start(games)
+    checked = 0
+    for _ in range(plies):
+        mask, in_check, terminal = batch.status()
+        mismatches = compare_with_board(batch, mask, in_check)
+        assert not mismatches, f"batch move generation differs from Board on {mismatches[:3]}"
+        checked += len(batch)
+        moves = random_moves(mask, rng)
+        moves[terminal != ONGOING] = NO_MOVE
+        batch.apply(moves)
+    terminal = batch.status()[2]
+    names = {ONGOING: 'ongoing', CHECKMATE: 'checkmate', STALEMATE: 'stalemate', INSUFFICIENT_MATERIAL: 'insufficient material'}
+    finished = {names[state]: int(np.count_nonzero(terminal == state)) for state in names}
+    return {'perft': counts, 'positions_checked': checked, 'games': finished}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check batched move generation against Board")
+    parser.add_argument('--games', type=int, default=64)
+    parser.add_argument('--plies', type=int, default=120)
+    parser.add_argument('--depth', type=int, default=3, help="perft depth for the reference positions")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    result = verify(args.games, args.plies, args.depth, args.seed)
+    result['seconds'] = time.perf_counter() - start
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+import argparse
+import copy
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from board import Board
+from piece import other_color
+import encoder
+from search import Search
+from parallel import ParallelSearch
+from position import Position
+import pgn
+from game_state import GameState
+from players import RandomPlayer
+import mcts
+from batchboard import BatchBoard, random_moves, ONGOING, NO_MOVE
+
+
+def middlegame_positions(count=10, plies=24, seed=0):
+    # seeded random playouts from the starting position
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board_instance = Board()
+        turn = 'white'
+        for _ in range(plies):
+            moves = board_instance.get_moves_free_check(turn)
+            if not moves:
+                break
+            board_instance.move_piece(*rng.choice(moves))
+            turn = other_color(turn)
+        else:
+            positions.append((board_instance, turn))
+    return positions
+
+
+def is_check_by_regeneration(board_instance, color):
+    king_position = board_instance.get_king_position(color)
+    return any(move[1] == king_position for move in board_instance.get_moves(other_color(color)))
+
+
+def turn_by_regeneration(board_instance, color):
+    # legality as it was done before the attack maps: every check query regenerates enemy moves
+    moves_free_check = []
+    for move in board_instance.get_moves(color):
+        record = board_instance.make_move(move)
+        if not is_check_by_regeneration(board_instance, color):
+            moves_free_check.append(move)
+        board_instance.unmake_move(record)
+    in_check = is_check_by_regeneration(board_instance, color)
+    return moves_free_check, in_check
+
+
+def turn_by_attack_maps(board_instance, color):
+    moves_free_check = board_instance.get_moves_free_check(color)
+    in_check = board_instance.is_check(color)[0]
+    board_instance.check_for_check_mate(color, moves_free_check)
+    board_instance.check_for_pat(color, moves_free_check)
+    return moves_free_check, in_check
+
+
+def turn_by_legal_moves(board_instance, color):
+    legal_moves = board_instance.legal_moves(color)
+    in_check = board_instance.is_check(color)[0]
+    board_instance.check_for_check_mate(color, legal_moves)
+    board_instance.check_for_pat(color, legal_moves)
+    return legal_moves, in_check
+
+
+def time_per_call(function, positions, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board_instance, turn in positions:
+            function(board_instance, turn)
+    return (time.perf_counter() - start) / (repeat * len(positions))
+
+
+def bench_turn_latency(count=10, plies=24, repeat=3, seed=0):
+    positions = middlegame_positions(count, plies, seed)
+    for board_instance, turn in positions:
+        expected = sorted(turn_by_regeneration(board_instance, turn)[0])
+        assert expected == sorted(turn_by_attack_maps(board_instance, turn)[0])
+        assert expected == sorted(turn_by_legal_moves(board_instance, turn)[0])
+    before = time_per_call(turn_by_regeneration, positions, repeat)
+    after = time_per_call(turn_by_attack_maps, positions, repeat)
+    single_pass = time_per_call(turn_by_legal_moves, positions, repeat)
+    return {
+        'benchmark': 'turn-latency',
+        'positions': len(positions),
+        'plies': plies,
+        'repeat': repeat,
+        'before_ms': before * 1000,
+        'after_ms': after * 1000,
+        'speedup': before / after,
+        'legal_moves_ms': single_pass * 1000,
+        'legal_moves_speedup': before / single_pass,
+    }
+
+
+def bench_search(count=5, plies=24, depth=3, time_limit=None, tt_memory_mb=16, seed=0):
+    positions = middlegame_positions(count, plies, seed)
+    nodes = 0
+    elapsed = 0.0
+    per_position = []
+    for board_instance, turn in positions:
+        result = Search(board_instance, tt_memory_mb).search(turn, max_depth=depth, time_limit=time_limit)
+        nodes += result.nodes
+        elapsed += result.elapsed
+        per_position.append({'depth': result.depth, 'nodes': result.nodes, 'nps': result.nps, 'score': result.score})
+    return {
+        'benchmark': 'search',
+        'positions': len(positions),
+        'depth': depth,
+        'time_limit': time_limit,
+        'nodes': nodes,
+        'seconds': elapsed,
+        'nps': int(nodes / elapsed) if elapsed > 0 else 0,
+        'per_position': per_position,
+    }
+
+
+def bench_parallel(workers=(1, 2, 4), count=3, plies=24, depth=3, seed=0):
+    positions = middlegame_positions(count, plies, seed)
+    start = time.perf_counter()
+    reference = [Search(board_instance).search(turn, max_depth=depth).score for board_instance, turn in positions]
+    single_process = time.perf_counter() - start
+
+    runs = []
+    for worker_count in workers:
+        with ParallelSearch(worker_count) as parallel_search:
+            # warm the pool so process start-up is not timed
+            parallel_search.search(*positions[0], max_depth=1)
+            start = time.perf_counter()
+            scores = [parallel_search.search(board_instance, turn, max_depth=depth).score for board_instance, turn in positions]
+            elapsed = time.perf_counter() - start
+        runs.append({'workers': worker_count, 'seconds': elapsed, 'consistent': scores == reference})
+    for run in runs:
+        run['speedup'] = runs[0]['seconds'] / run['seconds']
+        run['efficiency'] = run['speedup'] * runs[0]['workers'] / run['workers']
+    return {
+        'benchmark': 'parallel',
+        'positions': len(positions),
+        'depth': depth,
+        'single_process_seconds': single_process,
+        'runs': runs,
+    }
+
+
+def bench_encode(count=100000, batch_size=4096, planes=12, side_to_move=True, seed=0):
+    samples = [board_instance.serialize() for board_instance, _ in middlegame_positions(16, 24, seed)]
+    codes = encoder.stack_positions(samples)[np.arange(count) % len(samples)]
+    out = encoder.allocate(batch_size, planes, side_to_move)
+    scratch = encoder.allocate_scratch(batch_size) if planes == 6 else None
+    start = time.perf_counter()
+    for offset in range(0, count - batch_size + 1, batch_size):
+        encoder.encode_batch(codes[offset:offset + batch_size], out, planes, side_to_move, scratch)
+    batched = time.perf_counter() - start
+    encoded = (count // batch_size) * batch_size
+
+    boards = [Board.from_serialized(sample) for sample in samples]
+    start = time.perf_counter()
+    for board_instance in boards:
+        board_instance.translate_to_matrix()
+    per_board = time.perf_counter() - start
+    return {
+        'benchmark': 'encode',
+        'positions': encoded,
+        'batch_size': batch_size,
+        'planes': encoder.plane_count(planes, side_to_move),
+        'seconds': batched,
+        'positions_per_second': encoded / batched if batched > 0 else 0,
+        'translate_to_matrix_positions_per_second': len(boards) / per_board if per_board > 0 else 0,
+    }
+
+
+def bytes_per_item(build, count):
+    # traced allocations of the list build() returns, divided by its length
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del items
+    return used / count
+
+
+def bench_memory(count=1000, plies=24, seed=0):
+    samples = middlegame_positions(16, plies, seed)
+    boards = [board_instance for board_instance, _ in samples]
+    picks = [boards[i % len(boards)] for i in range(count)]
+    board_bytes = bytes_per_item(lambda: [copy.deepcopy(board_instance) for board_instance in picks], count)
+    position_bytes = bytes_per_item(lambda: [Position.from_board(board_instance) for board_instance in picks], count)
+    serialized = [board_instance.serialize() for board_instance in picks]
+    array_bytes = bytes_per_item(lambda: encoder.stack_positions(serialized).copy(), count)
+    # Position.copy shares the immutable codes, a copied history costs one small object per position
+    positions = [Position.from_board(board_instance) for board_instance in picks]
+    copy_bytes = bytes_per_item(lambda: [position.copy() for position in positions], count)
+    return {
+        'benchmark': 'memory',
+        'positions': count,
+        'board_bytes': board_bytes,
+        'position_bytes': position_bytes,
+        'position_copy_bytes': copy_bytes,
+        'array_bytes': array_bytes,
+        'board_to_position_ratio': board_bytes / position_bytes,
+    }
+
+
+def write_sample_pgn(path, games=200, max_plies=160, seed=0):
+    # seeded random games, gzip-compressed like the downloaded databases
+    with gzip.open(path, 'wt') as stream:
+        for number in range(games):
+            state = GameState(max_plies=max_plies)
+            player = RandomPlayer(seed * 1000003 + number)
+            while not state.is_over():
+                state.play(player.select_move(state.board_instance, state.turn))
+            result = {'white': '1-0', 'black': '0-1'}.get(state.winner, '1/2-1/2') if state.result != 'move limit' else '*'
+            pgn.write_game(stream, state.history, {'Event': f"sample {number}"}, result)
+
+
+def bench_pgn(path=None, games=200, batch_size=4096, seed=0):
+    directory = None
+    if path is None:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, 'sample.pgn.gz')
+        write_sample_pgn(path, games, seed=seed)
+
+    start = time.perf_counter()
+    game_count = sum(1 for _ in pgn.read_games(path))
+    parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    replayed = sum(1 for game in pgn.read_games(path) for _ in game.positions())
+    replay = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoded = sum(len(batch[0]) for batch in pgn.encode_games(path, batch_size))
+    bulk = time.perf_counter() - start
+    if directory:
+        directory.cleanup()
+    return {
+        'benchmark': 'pgn',
+        'file': path if directory is None else 'generated sample',
+        'games': game_count,
+        'positions': replayed,
+        'parse_games_per_second': game_count / parse if parse > 0 else 0,
+        'replay_games_per_second': game_count / replay if replay > 0 else 0,
+        'replay_positions_per_second': replayed / replay if replay > 0 else 0,
+        'encode_positions_per_second': encoded / bulk if bulk > 0 else 0,
+    }
+
+
+def bench_mcts(batch_sizes=(1, 4, 16, 64), simulations=800, count=3, plies=24, seed=0):
+    # simulations per second against the leaf batch size, with the share spent inside the evaluator
+    positions = middlegame_positions(count, plies, seed)
+    evaluator = mcts.NumpyEvaluator(seed=seed)
+    inference = [0.0]
+
+    def timed_evaluator(codes):
+        start = time.perf_counter()
+        outputs = evaluator(codes)
+        inference[0] += time.perf_counter() - start
+        return outputs
+
+    results = []
+    for batch_size in batch_sizes:
+        inference[0] = 0.0
+        done, elapsed, batches, collisions = 0, 0.0, 0, 0
+        for board_instance, turn in positions:
+            result = mcts.MCTS(board_instance, timed_evaluator, batch_size).search(turn, simulations)
+            done += result.simulations
+            elapsed += result.elapsed
+            batches += result.batches
+            collisions += result.collisions
+        results.append({
+            'batch_size': batch_size,
+            'simulations': done,
+            'sims_per_second': done / elapsed if elapsed > 0 else 0,
+            'sims_per_batch': done / batches if batches else 0,
+            'collisions': collisions,
+            'evaluator_share': inference[0] / elapsed if elapsed > 0 else 0,
+        })
+    return {
+        'benchmark': 'mcts',
+        'positions': len(positions),
+        'simulations_per_position': simulations,
+        'results': results,
+    }
+
+
+def bench_batch(sizes=(1, 16, 256, 1024, 4096), plies=40, seed=0):
+    # random games advanced in lockstep: legal masks, check and terminal flags, a move chosen and applied
+    # for every game each ply; Board.legal_moves one game at a time is the baseline
+    rng = np.random.default_rng(seed)
+    baseline_positions = [board_instance for board_instance, _ in middlegame_positions(20, 24, seed)]
+    start = time.perf_counter()
+    for board_instance in baseline_positions:
+        board_instance.legal_moves(board_instance.turn)
+        board_instance.is_check(board_instance.turn)
+    board_rate = len(baseline_positions) / (time.perf_counter() - start)
+
+    results = []
+    for size in sizes:
+        batch = BatchBoard.start(size)
+        generate_time = 0.0
+        start = time.perf_counter()
+        for _ in range(plies):
+            generate_start = time.perf_counter()
+            mask, _, terminal = batch.status()
+            generate_time += time.perf_counter() - generate_start
+            moves = random_moves(mask, rng)
+            moves[terminal != ONGOING] = NO_MOVE
+            batch.apply(moves)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'games': size,
+            'positions_per_second': size * plies / elapsed,
+            'generate_positions_per_second': size * plies / generate_time,
+            'speedup_over_board': size * plies / elapsed / board_rate,
+        })
+    return {
+        'benchmark': 'batch',
+        'plies': plies,
+        'board_positions_per_second': board_rate,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chess_AI benchmarks, results are printed as JSON")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    turn_latency = subparsers.add_parser('turn-latency', help="legal moves + check/mate/pat per turn")
+    turn_latency.add_argument('--positions', type=int, default=10)
+    turn_latency.add_argument('--plies', type=int, default=24)
+    turn_latency.add_argument('--repeat', type=int, default=3)
+    turn_latency.add_argument('--seed', type=int, default=0)
+
+    search = subparsers.add_parser('search', help="alpha-beta search throughput in nodes per second")
+    search.add_argument('--positions', type=int, default=5)
+    search.add_argument('--plies', type=int, default=24)
+    search.add_argument('--depth', type=int, default=3)
+    search.add_argument('--time-limit', type=float, default=None)
+    search.add_argument('--tt-memory-mb', type=float, default=16)
+    search.add_argument('--seed', type=int, default=0)
+
+    parallel = subparsers.add_parser('parallel', help="root-split search speedup against worker count (below 1 for shallow depths)")
+    parallel.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parallel.add_argument('--positions', type=int, default=3)
+    parallel.add_argument('--plies', type=int, default=24)
+    parallel.add_argument('--depth', type=int, default=3)
+    parallel.add_argument('--seed', type=int, default=0)
+
+    encode = subparsers.add_parser('encode', help="batched position encoding in positions per second")
+    encode.add_argument('--count', type=int, default=100000)
+    encode.add_argument('--batch-size', type=int, default=4096)
+    encode.add_argument('--planes', type=int, choices=[6, 12], default=12)
+    encode.add_argument('--no-side-to-move', action='store_true')
+    encode.add_argument('--seed', type=int, default=0)
+
+    memory = subparsers.add_parser('memory', help="bytes per stored position for Board copies and compact positions")
+    memory.add_argument('--positions', type=int, default=1000)
+    memory.add_argument('--plies', type=int, default=24)
+    memory.add_argument('--seed', type=int, default=0)
+
+    pgn_parser = subparsers.add_parser('pgn', help="streaming PGN reading, replay and bulk encoding throughput")
+    pgn_parser.add_argument('--file', default=None, help="PGN or gzipped PGN file, a random sample is generated if omitted")
+    pgn_parser.add_argument('--games', type=int, default=200, help="games in the generated sample")
+    pgn_parser.add_argument('--batch-size', type=int, default=4096)
+    pgn_parser.add_argument('--seed', type=int, default=0)
+
+    mcts_parser = subparsers.add_parser('mcts', help="MCTS simulations per second against the leaf batch size")
+    mcts_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 16, 64])
+    mcts_parser.add_argument('--simulations', type=int, default=800)
+    mcts_parser.add_argument('--positions', type=int, default=3)
+    mcts_parser.add_argument('--plies', type=int, default=24)
+    mcts_parser.add_argument('--seed', type=int, default=0)
+
+    batch = subparsers.add_parser('batch', help="lockstep move generation over N games in positions per second")
+    batch.add_argument('--sizes', type=int, nargs='+', default=[1, 16, 256, 1024, 4096])
+    batch.add_argument('--plies', type=int, default=40)
+    batch.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.benchmark == 'turn-latency':
+        result = bench_turn_latency(args.positions, args.plies, args.repeat, args.seed)
+    elif args.benchmark == 'search':
+        result = bench_search(args.positions, args.plies, args.depth, args.time_limit, args.tt_memory_mb, args.seed)
+    elif args.benchmark == 'parallel':
+        result = bench_parallel(args.workers, args.positions, args.plies, args.depth, args.seed)
+    elif args.benchmark == 'encode':
+        result = bench_encode(args.count, args.batch_size, args.planes, not args.no_side_to_move, args.seed)
+    elif args.benchmark == 'memory':
+        result = bench_memory(args.positions, args.plies, args.seed)
+    elif args.benchmark == 'pgn':
+        result = bench_pgn(args.file, args.games, args.batch_size, args.seed)
+    elif args.benchmark == 'mcts':
+        result = bench_mcts(args.batch_sizes, args.simulations, args.positions, args.plies, args.seed)
+    elif args.benchmark == 'batch':
+        result = bench_batch(args.sizes, args.plies, args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
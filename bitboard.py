@@ -0,0 +1,421 @@
+import numpy as np
+from piece import Pawn, Rook, Knight, Bishop, Queen, King, colors, figures, reverse_figures, piece_classes, other_color
+from zobrist import piece_keys, side_key
+from evaluation import compute_scores, mg_tables, eg_tables, phase_weights
+
+# square index = row * 8 + col, bit n of a mask is square n
+FULL_MASK = (1 << 64) - 1
+SQUARE_POSITIONS = [(sq >> 3, sq & 7) for sq in range(64)]
+
+ORTHOGONAL = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def square_index(position):
+    return position[0] * 8 + position[1]
+
+
+def mask_index(color, figure):
+    return color * 6 + figure - 1
+
+
+def _leaper_table(offsets):
+    table = []
+    for row, col in SQUARE_POSITIONS:
+        mask = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                mask |= 1 << (r * 8 + c)
+        table.append(mask)
+    return table
+
+
+def _ray_table(dr, dc):
+    table = []
+    for row, col in SQUARE_POSITIONS:
+        mask = 0
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            mask |= 1 << (r * 8 + c)
+            r += dr
+            c += dc
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table([(1, 2), (1, -2), (-1, 2), (-1, -2), (2, 1), (2, -1), (-2, 1), (-2, -1)])
+KING_ATTACKS = _leaper_table(ORTHOGONAL + DIAGONAL)
+PAWN_ATTACKS = [
+    _leaper_table([(1, 1), (1, -1)]),
+    _leaper_table([(-1, 1), (-1, -1)]),
+]
+RAYS = {direction: _ray_table(*direction) for direction in ORTHOGONAL + DIAGONAL}
+# rays that walk towards higher square indices find their first blocker at the lowest set bit
+POSITIVE_DIRECTIONS = {direction for direction in RAYS if direction[0] * 8 + direction[1] > 0}
+
+ROW_MASKS = [0xFF << (8 * row) for row in range(8)]
+
+
+def sliding_attacks(sq, occupied, directions):
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][sq]
+        blockers = ray & occupied
+        if blockers:
+            if direction in POSITIVE_DIRECTIONS:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= RAYS[direction][first]
+        attacks |= ray
+    return attacks
+
+
+def iterate_bits(mask):
+    while mask:
+        lsb = mask & -mask
+        yield lsb.bit_length() - 1
+        mask ^= lsb
+
+
+def mask_to_matrix(mask):
+    bits = np.unpackbits(np.array([mask], dtype=np.uint64).view(np.uint8), bitorder='little')
+    return bits.reshape(8, 8).astype(int)
+
+
+class BitBoard:
+    def __init__(self):
+        self.bitboards = [0] * 12
+        self.populate_board()
+        self.captured_pieces = []
+        # None so the first is_changed call reports the starting position, like Board
+        self.tmp_key = None
+
+    @classmethod
+    def from_board(cls, board_instance):
+        bitboard = cls.__new__(cls)
+        bitboard.bitboards = [0] * 12
+        for row in range(8):
+            for col in range(8):
+                piece = board_instance.get_piece((row, col))
+                if piece:
+                    bitboard.bitboards[mask_index(piece.color, piece.figure)] |= 1 << (row * 8 + col)
+        bitboard.captured_pieces = list(board_instance.captured_pieces)
+        bitboard.turn = board_instance.turn
+        bitboard.zobrist_key = bitboard.compute_zobrist_key()
+        bitboard.mg_score, bitboard.eg_score, bitboard.phase = bitboard.compute_scores()
+        bitboard.tmp_key = None
+        return bitboard
+
+    def populate_board(self):
+        self.bitboards = [0] * 12
+        self.turn = 'white'
+        self.place_pieces(Pawn, 1, colors['white'])
+        self.place_pieces(Pawn, 6, colors['black'])
+        self.place_pieces(Rook, 0, colors['white'], [0, 7])
+        self.place_pieces(Rook, 7, colors['black'], [0, 7])
+        self.place_pieces(Knight, 0, colors['white'], [1, 6])
+        self.place_pieces(Knight, 7, colors['black'], [1, 6])
+        self.place_pieces(Bishop, 0, colors['white'], [2, 5])
+        self.place_pieces(Bishop, 7, colors['black'], [2, 5])
+        self.place_pieces(Queen, 0, colors['white'], [3])
+        self.place_pieces(Queen, 7, colors['black'], [3])
+        self.place_pieces(King, 0, colors['white'], [4])
+        self.place_pieces(King, 7, colors['black'], [4])
+        self.zobrist_key = self.compute_zobrist_key()
+        self.mg_score, self.eg_score, self.phase = self.compute_scores()
+
+    def compute_scores(self):
+        return compute_scores((index // 6, index % 6 + 1, sq) for index, bitboard in enumerate(self.bitboards) for sq in iterate_bits(bitboard))
+
+    def compute_zobrist_key(self):
+        # same keys as Board, so both backends hash a position identically
+        key = side_key if self.turn == 'black' else 0
+        for index, bitboard in enumerate(self.bitboards):
+            for sq in iterate_bits(bitboard):
+                key ^= piece_keys[index // 6][index % 6 + 1][sq]
+        return key
+
+    def place_pieces(self, piece_class, row, color, cols=None):
+        figure = piece_class(color, (row, 0)).figure
+        if cols is None:
+            cols = range(8)
+        for col in cols:
+            self.bitboards[mask_index(color, figure)] |= 1 << (row * 8 + col)
+
+    def is_changed(self):
+        if self.zobrist_key != self.tmp_key:
+            self.tmp_key = self.zobrist_key
+            return True
+        return False
+
+    def occupancy(self, color):
+        start = color * 6
+        mask = 0
+        for bitboard in self.bitboards[start:start + 6]:
+            mask |= bitboard
+        return mask
+
+    def piece_at(self, sq):
+        bit = 1 << sq
+        for index, bitboard in enumerate(self.bitboards):
+            if bitboard & bit:
+                return index // 6, index % 6 + 1
+        return None
+
+    def get_piece(self, position):
+        found = self.piece_at(square_index(position))
+        if found is None:
+            return None
+        color, figure = found
+        return piece_classes[figure](color, tuple(position))
+
+    @property
+    def board(self):
+        board = np.array([[None for _ in range(8)] for _ in range(8)])
+        for index, bitboard in enumerate(self.bitboards):
+            for sq in iterate_bits(bitboard):
+                row, col = SQUARE_POSITIONS[sq]
+                board[row][col] = piece_classes[index % 6 + 1](index // 6, (row, col))
+        return board
+
+    def check_for_enemy(self, position, color):
+        return bool(self.occupancy(1 - color) >> square_index(position) & 1)
+
+    def check_for_friendly(self, position, color):
+        return bool(self.occupancy(color) >> square_index(position) & 1)
+
+    def check_for_empty(self, position):
+        return self.piece_at(square_index(position)) is None
+
+    def piece_moves(self, sq, color, figure, own, enemy):
+        occupied = own | enemy
+        if figure == figures['Pawn']:
+            bit = 1 << sq
+            if color == colors['white']:
+                single = (bit << 8) & ~occupied & FULL_MASK
+                double = (single << 8) & ~occupied if bit & ROW_MASKS[1] else 0
+            else:
+                single = (bit >> 8) & ~occupied
+                double = (single >> 8) & ~occupied if bit & ROW_MASKS[6] else 0
+            return single | double | (PAWN_ATTACKS[color][sq] & enemy)
+        if figure == figures['Knight']:
+            return KNIGHT_ATTACKS[sq] & ~own
+        if figure == figures['Bishop']:
+            return sliding_attacks(sq, occupied, DIAGONAL) & ~own
+        if figure == figures['Rook']:
+            return sliding_attacks(sq, occupied, ORTHOGONAL) & ~own
+        if figure == figures['Queen']:
+            return sliding_attacks(sq, occupied, ORTHOGONAL + DIAGONAL) & ~own
+        moves = KING_ATTACKS[sq] & ~own
+        # restricted moves
+        enemy_king = self.bitboards[mask_index(1 - color, figures['King'])]
+        if enemy_king:
+            moves &= ~KING_ATTACKS[enemy_king.bit_length() - 1]
+        return moves
+
+    def get_moves(self, color):
+        color_value = colors[color]
+        own = self.occupancy(color_value)
+        enemy = self.occupancy(1 - color_value)
+        moves = []
+        for sq in iterate_bits(own):
+            _, figure = self.piece_at(sq)
+            start = SQUARE_POSITIONS[sq]
+            for target in iterate_bits(self.piece_moves(sq, color_value, figure, own, enemy)):
+                moves.append([start, SQUARE_POSITIONS[target]])
+        return moves
+
+    def attackers(self, sq, color):
+        # pieces of `color` attacking square `sq`
+        start = color * 6
+        pawns, rooks, knights, bishops, queens, kings = self.bitboards[start:start + 6]
+        occupied = self.occupancy(0) | self.occupancy(1)
+        return (
+            (PAWN_ATTACKS[1 - color][sq] & pawns)
+            | (KNIGHT_ATTACKS[sq] & knights)
+            | (KING_ATTACKS[sq] & kings)
+            | (sliding_attacks(sq, occupied, DIAGONAL) & (bishops | queens))
+            | (sliding_attacks(sq, occupied, ORTHOGONAL) & (rooks | queens))
+        )
+
+    def piece_count(self):
+        return sum(bin(bitboard).count('1') for bitboard in self.bitboards)
+
+    def get_king_position(self, color):
+        king = self.bitboards[mask_index(colors[color], figures['King'])]
+        if not king:
+            return None
+        return SQUARE_POSITIONS[king.bit_length() - 1]
+
+    def is_check(self, color):
+        king_position = self.get_king_position(color)
+        if king_position is None:
+            return False, []
+        attackers = self.attackers(square_index(king_position), 1 - colors[color])
+        checking_pieces = [self.get_piece(SQUARE_POSITIONS[sq]) for sq in iterate_bits(attackers)]
+        return bool(checking_pieces), checking_pieces
+
+    def move_piece(self, start_pos, end_pos):
+        start_sq, end_sq = square_index(start_pos), square_index(end_pos)
+        found = self.piece_at(start_sq)
+        if found is None:
+            return False
+        color, figure = found
+        own = self.occupancy(color)
+        enemy = self.occupancy(1 - color)
+        if not self.piece_moves(start_sq, color, figure, own, enemy) >> end_sq & 1:
+            return False
+        target = self.piece_at(end_sq)
+        if target and target[1] == figures['King']:
+            return False
+
+        self.make_move((start_pos, end_pos))
+        return True
+
+    def make_move(self, move):
+        start_pos, end_pos = tuple(move[0]), tuple(move[1])
+        start_sq, end_sq = square_index(start_pos), square_index(end_pos)
+        color, figure = self.piece_at(start_sq)
+        key = self.zobrist_key
+        self.zobrist_key ^= piece_keys[color][figure][start_sq] ^ piece_keys[color][figure][end_sq] ^ side_key
+        scores = (self.mg_score, self.eg_score, self.phase)
+        self.mg_score += mg_tables[color][figure][end_sq] - mg_tables[color][figure][start_sq]
+        self.eg_score += eg_tables[color][figure][end_sq] - eg_tables[color][figure][start_sq]
+        captured_index = None
+        target = self.piece_at(end_sq)
+        if target:
+            target_color, target_figure = target
+            self.zobrist_key ^= piece_keys[target_color][target_figure][end_sq]
+            self.mg_score -= mg_tables[target_color][target_figure][end_sq]
+            self.eg_score -= eg_tables[target_color][target_figure][end_sq]
+            self.phase -= phase_weights[target_figure]
+            captured_index = mask_index(target_color, target_figure)
+            captured = piece_classes[target_figure](target_color, end_pos)
+            captured.eliminate()
+            self.captured_pieces.append(captured)
+            self.bitboards[captured_index] &= ~(1 << end_sq)
+
+        index = mask_index(color, figure)
+        self.bitboards[index] ^= (1 << start_sq) | (1 << end_sq)
+        self.turn = other_color(self.turn)
+        return index, start_sq, end_sq, captured_index, key, scores
+
+    def unmake_move(self, record):
+        index, start_sq, end_sq, captured_index, key, scores = record
+        self.zobrist_key = key
+        self.mg_score, self.eg_score, self.phase = scores
+        self.turn = other_color(self.turn)
+        self.bitboards[index] ^= (1 << start_sq) | (1 << end_sq)
+        if captured_index is not None:
+            self.bitboards[captured_index] |= 1 << end_sq
+            self.captured_pieces.pop()
+
+    def get_moves_free_check(self, color):
+        moves_free_check = []
+        for move in self.get_moves(color):
+            record = self.make_move(move)
+            if not self.is_check(color)[0]:
+                moves_free_check.append(move)
+            self.unmake_move(record)
+        return moves_free_check
+
+    def attacked_mask(self, color, occupied):
+        start = color * 6
+        pawns, rooks, knights, bishops, queens, kings = self.bitboards[start:start + 6]
+        attacks = 0
+        for sq in iterate_bits(pawns):
+            attacks |= PAWN_ATTACKS[color][sq]
+        for sq in iterate_bits(knights):
+            attacks |= KNIGHT_ATTACKS[sq]
+        for sq in iterate_bits(kings):
+            attacks |= KING_ATTACKS[sq]
+        for sq in iterate_bits(bishops | queens):
+            attacks |= sliding_attacks(sq, occupied, DIAGONAL)
+        for sq in iterate_bits(rooks | queens):
+            attacks |= sliding_attacks(sq, occupied, ORTHOGONAL)
+        return attacks
+
+    def legal_moves(self, color):
+        color_value = colors[color]
+        enemy_color = 1 - color_value
+        king = self.bitboards[mask_index(color_value, figures['King'])]
+        if not king:
+            return self.get_moves(color)
+        king_sq = king.bit_length() - 1
+        own = self.occupancy(color_value)
+        enemy = self.occupancy(enemy_color)
+        occupied = own | enemy
+        start = enemy_color * 6
+        orthogonal_sliders = self.bitboards[start + figures['Rook'] - 1] | self.bitboards[start + figures['Queen'] - 1]
+        diagonal_sliders = self.bitboards[start + figures['Bishop'] - 1] | self.bitboards[start + figures['Queen'] - 1]
+
+        checkers = self.attackers(king_sq, enemy_color)
+        check_mask = FULL_MASK
+        if checkers:
+            check_mask = checkers
+        pin_masks = {}
+        for direction in ORTHOGONAL + DIAGONAL:
+            ray = RAYS[direction][king_sq]
+            blockers = ray & occupied
+            if not blockers:
+                continue
+            positive = direction in POSITIVE_DIRECTIONS
+            first = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1
+            sliders = orthogonal_sliders if direction in ORTHOGONAL else diagonal_sliders
+            if (1 << first) & sliders:
+                check_mask |= ray ^ RAYS[direction][first]
+            elif (1 << first) & own:
+                blockers ^= 1 << first
+                if blockers:
+                    second = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1
+                    if (1 << second) & sliders:
+                        pin_masks[first] = ray ^ RAYS[direction][second]
+        if checkers & (checkers - 1):
+            check_mask = 0
+
+        # the king may not step onto attacked squares, including those behind it on a checking ray
+        danger = self.attacked_mask(enemy_color, occupied ^ king)
+        moves = []
+        for sq in iterate_bits(own):
+            _, figure = self.piece_at(sq)
+            targets = self.piece_moves(sq, color_value, figure, own, enemy)
+            if figure == figures['King']:
+                targets &= ~danger
+            else:
+                targets &= check_mask & pin_masks.get(sq, FULL_MASK)
+            start_pos = SQUARE_POSITIONS[sq]
+            for target in iterate_bits(targets):
+                moves.append([start_pos, SQUARE_POSITIONS[target]])
+        return moves
+
+    def check_for_check_mate(self, color, valid_moves):
+        in_check, checking_pieces = self.is_check(color)
+        if in_check and len(valid_moves) == 0:
+            return True
+        return False
+
+    def check_for_pat(self, color, valid_moves):
+        in_check, _ = self.is_check(color)
+        if not in_check and len(valid_moves) == 0:
+            return True
+        return False
+
+    def show_board(self):
+        print("  " + " ".join(str(x) for x in range(8)))
+        for y in range(8):
+            row = []
+            for x in range(8):
+                found = self.piece_at(y * 8 + x)
+                row.append(reverse_figures[found[1]] if found else '.')
+            print(f"{y} " + " ".join(row))
+
+    def translate_to_matrix(self):
+        # same plane order as Board.translate_to_matrix: pawn, rook, knight, bishop, queen, king
+        planes = []
+        for figure in range(1, 7):
+            white = self.bitboards[mask_index(colors['white'], figure)]
+            black = self.bitboards[mask_index(colors['black'], figure)]
+            planes.append(mask_to_matrix(white) - mask_to_matrix(black))
+        return np.array(planes)
@@ -1,18 +1,29 @@
 import numpy as np
 import copy
-from piece import Pawn, Rook, Knight, Bishop, Queen, King, colors, reverse_figures
+from piece import Pawn, Rook, Knight, Bishop, Queen, King, colors, reverse_figures, piece_classes, other_color
+from zobrist import piece_key, side_key
+from evaluation import compute_scores, mg_tables, eg_tables, phase_weights
+from encoder import encode_batch, allocate
+
+# FEN letters, lowercase for black
+fen_letters = {Pawn: 'p', Rook: 'r', Knight: 'n', Bishop: 'b', Queen: 'q', King: 'k'}
+fen_classes = {letter: piece_class for piece_class, letter in fen_letters.items()}
+
+slider_directions = [[1, 0], [-1, 0], [0, 1], [0, -1], [1, 1], [1, -1], [-1, 1], [-1, -1]]
 
 class Board:
     def __init__(self):
         self.board = self.create_board()
         self.populate_board()
         self.captured_pieces = []
-        self.tmp_board = np.copy(self.board)
+        # None so the first is_changed call reports the starting position
+        self.tmp_key = None
 
     def create_board(self):
         return np.array([[None for _ in range(8)] for _ in range(8)])
 
     def populate_board(self):
+        self.turn = 'white'
         self.place_pieces(Pawn, 1, colors['white'])
         self.place_pieces(Pawn, 6, colors['black'])
         self.place_pieces(Rook, 0, colors['white'], [0, 7])
@@ -25,13 +36,148 @@ class Board:
         self.place_pieces(Queen, 7, colors['black'], [3])
         self.place_pieces(King, 0, colors['white'], [4])
         self.place_pieces(King, 7, colors['black'], [4])
+        self.rebuild_state()
+
+    def rebuild_state(self):
+        # recompute everything make_move/unmake_move maintain incrementally,
+        # needed after self.board is edited directly
+        self.king_positions = {}
+        self.attacks_from = [None] * 64
+        self.attack_counts = np.zeros((2, 64), dtype=np.int16)
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    if isinstance(piece, King):
+                        self.king_positions[piece.color] = (row, col)
+                    self.add_attacks(piece)
+        self.zobrist_key = self.compute_zobrist_key()
+        self.mg_score, self.eg_score, self.phase = self.compute_scores()
+
+    def compute_scores(self):
+        return compute_scores((piece.color, piece.figure, row * 8 + col)
+                              for row in range(8) for col in range(8) for piece in [self.board[row][col]] if piece)
+
+    def compute_zobrist_key(self):
+        key = side_key if self.turn == 'black' else 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    key ^= piece_key(piece, (row, col))
+        return key
+
+    def add_attacks(self, piece, squares=None):
+        row, col = piece.position
+        if squares is None:
+            squares = np.array([r * 8 + c for r, c in piece.attacked_squares(self)], dtype=np.intp)
+        self.attacks_from[row * 8 + col] = squares
+        self.attack_counts[piece.color, squares] += 1
+
+    def remove_attacks(self, piece):
+        row, col = piece.position
+        self.attack_counts[piece.color, self.attacks_from[row * 8 + col]] -= 1
+        self.attacks_from[row * 8 + col] = None
+
+    def sliders_seeing(self, position, sliders):
+        # first piece along each ray from position, if it slides back along that ray
+        row, col = position
+        for dr, dc in slider_directions:
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                piece = self.board[r][c]
+                if piece:
+                    if isinstance(piece, Queen) or isinstance(piece, Rook if dr == 0 or dc == 0 else Bishop):
+                        if piece not in sliders:
+                            sliders.append(piece)
+                    break
+                r += dr
+                c += dc
+        return sliders
+
+    def attack_map(self, color):
+        return self.attack_counts[colors[color]].reshape(8, 8) > 0
 
     def is_changed(self):
-        if not np.array_equal(self.board, self.tmp_board):
-            self.tmp_board = np.copy(self.board)
+        if self.zobrist_key != self.tmp_key:
+            self.tmp_key = self.zobrist_key
             return True
         return False
 
+    def serialize(self):
+        # 64 signed square codes (figure, negated for black) followed by the side to move
+        codes = bytearray(65)
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    codes[row * 8 + col] = piece.figure if piece.color == colors['white'] else 256 - piece.figure
+        codes[64] = colors[self.turn]
+        return bytes(codes)
+
+    @classmethod
+    def from_serialized(cls, data):
+        codes = np.frombuffer(data, dtype=np.int8)
+        board_instance = cls.__new__(cls)
+        board_instance.board = board_instance.create_board()
+        for sq in np.flatnonzero(codes[:64]):
+            code = int(codes[sq])
+            row, col = divmod(int(sq), 8)
+            color = colors['white'] if code > 0 else colors['black']
+            board_instance.board[row][col] = piece_classes[abs(code)](color, (row, col))
+        board_instance.turn = 'black' if codes[64] else 'white'
+        board_instance.captured_pieces = []
+        board_instance.tmp_key = None
+        board_instance.rebuild_state()
+        return board_instance
+
+    @classmethod
+    def from_fen(cls, fen):
+        # placement and side to move, castling and en passant fields do not apply to these rules
+        fields = fen.split()
+        if not fields:
+            raise ValueError(f"empty FEN: {fen!r}")
+        board_instance = cls.__new__(cls)
+        board_instance.board = board_instance.create_board()
+        ranks = fields[0].split('/')
+        if len(ranks) != 8:
+            raise ValueError(f"FEN placement needs 8 ranks: {fen!r}")
+        for rank, placement in enumerate(ranks):
+            row, col = 7 - rank, 0
+            for char in placement:
+                if char.isdigit():
+                    col += int(char)
+                elif char.lower() in fen_classes and col < 8:
+                    color = colors['white'] if char.isupper() else colors['black']
+                    board_instance.board[row][col] = fen_classes[char.lower()](color, (row, col))
+                    col += 1
+                else:
+                    raise ValueError(f"bad FEN rank {placement!r}: {fen!r}")
+            if col != 8:
+                raise ValueError(f"bad FEN rank {placement!r}: {fen!r}")
+        board_instance.turn = 'black' if len(fields) > 1 and fields[1] == 'b' else 'white'
+        board_instance.captured_pieces = []
+        board_instance.tmp_key = None
+        board_instance.rebuild_state()
+        return board_instance
+
+    def to_fen(self):
+        ranks = []
+        for row in range(7, -1, -1):
+            placement = ''
+            empty = 0
+            for piece in self.board[row]:
+                if not piece:
+                    empty += 1
+                    continue
+                if empty:
+                    placement += str(empty)
+                    empty = 0
+                letter = fen_letters[type(piece)]
+                placement += letter.upper() if piece.color == colors['white'] else letter
+            ranks.append(placement + (str(empty) if empty else ''))
+        return f"{'/'.join(ranks)} {self.turn[0]} - - 0 1"
+
     def place_pieces(self, piece_class, row, color, cols=None):
         if cols is None:
             for col in range(8):
@@ -50,14 +196,74 @@ class Board:
         if target_piece:
             if isinstance(target_piece, King):
                 return False
-            if target_piece.color != piece.color:
-                target_piece.eliminate()
-                self.captured_pieces.append(target_piece)
+
+        self.make_move((start_pos, end_pos))
+        return True
+
+    def make_move(self, move):
+        # no validation: the move must come from get_moves/valid_moves
+        start_pos, end_pos = tuple(move[0]), tuple(move[1])
+        piece = self.board[start_pos[0]][start_pos[1]]
+        target_piece = self.board[end_pos[0]][end_pos[1]]
+
+        # only sliders whose rays pass through the from/to squares change their attacks
+        sliders = self.sliders_seeing(end_pos, self.sliders_seeing(start_pos, []))
+        sliders = [slider for slider in sliders if slider is not piece and slider is not target_piece]
+        # attacks of the mover, the sliders and the captured piece, restored as-is by unmake_move
+        saved_attacks = [self.attacks_from[row * 8 + col] for row, col in [start_pos] + [slider.position for slider in sliders] + [end_pos]]
+        self.remove_attacks(piece)
+        for slider in sliders:
+            self.remove_attacks(slider)
+        key = self.zobrist_key
+        self.zobrist_key ^= piece_key(piece, start_pos) ^ piece_key(piece, end_pos) ^ side_key
+        scores = (self.mg_score, self.eg_score, self.phase)
+        start_sq, end_sq = start_pos[0] * 8 + start_pos[1], end_pos[0] * 8 + end_pos[1]
+        mg_table, eg_table = mg_tables[piece.color][piece.figure], eg_tables[piece.color][piece.figure]
+        self.mg_score += mg_table[end_sq] - mg_table[start_sq]
+        self.eg_score += eg_table[end_sq] - eg_table[start_sq]
+        if target_piece:
+            self.zobrist_key ^= piece_key(target_piece, end_pos)
+            self.mg_score -= mg_tables[target_piece.color][target_piece.figure][end_sq]
+            self.eg_score -= eg_tables[target_piece.color][target_piece.figure][end_sq]
+            self.phase -= phase_weights[target_piece.figure]
+            self.remove_attacks(target_piece)
+            target_piece.eliminate()
+            self.captured_pieces.append(target_piece)
 
         self.board[start_pos[0]][start_pos[1]] = None
         piece.position = end_pos
         self.board[end_pos[0]][end_pos[1]] = piece
-        return True
+        if isinstance(piece, King):
+            self.king_positions[piece.color] = end_pos
+        self.turn = other_color(self.turn)
+
+        self.add_attacks(piece)
+        for slider in sliders:
+            self.add_attacks(slider)
+        return piece, start_pos, end_pos, target_piece, sliders, saved_attacks, key, scores
+
+    def unmake_move(self, record):
+        piece, start_pos, end_pos, target_piece, sliders, saved_attacks, key, scores = record
+        self.zobrist_key = key
+        self.mg_score, self.eg_score, self.phase = scores
+        self.turn = other_color(self.turn)
+        self.remove_attacks(piece)
+        for slider in sliders:
+            self.remove_attacks(slider)
+
+        self.board[end_pos[0]][end_pos[1]] = target_piece
+        piece.position = start_pos
+        self.board[start_pos[0]][start_pos[1]] = piece
+        if isinstance(piece, King):
+            self.king_positions[piece.color] = start_pos
+
+        self.add_attacks(piece, saved_attacks[0])
+        for slider, squares in zip(sliders, saved_attacks[1:]):
+            self.add_attacks(slider, squares)
+        if target_piece:
+            self.add_attacks(target_piece, saved_attacks[-1])
+            target_piece.eliminated = False
+            self.captured_pieces.pop()
 
     def show_board(self):
         print("  " + " ".join(str(x) for x in range(8)))
@@ -131,23 +337,102 @@ class Board:
         return []
 
     def get_king_position(self, color):
+        return self.king_positions.get(colors[color])
+
+    def piece_count(self):
+        # every piece on the board has an attack entry
+        return sum(squares is not None for squares in self.attacks_from)
+
+    def is_check(self, color):
         color_value = colors[color]
+        king_position = self.king_positions.get(color_value)
+        if king_position is None:
+            return False, []
+        king_square = king_position[0] * 8 + king_position[1]
+        if not self.attack_counts[1 - color_value, king_square]:
+            return False, []
+
+        checking_pieces = []
         for row in range(8):
             for col in range(8):
-                piece = self.get_piece((row, col))
-                if piece and isinstance(piece, King) and piece.color == color_value:
-                    return (row, col)
-        return None
+                piece = self.board[row][col]
+                if piece and piece.color != color_value and king_square in self.attacks_from[row * 8 + col]:
+                    checking_pieces.append(piece)
+        return bool(checking_pieces), checking_pieces
 
-    def is_check(self, color):
-        king_position = self.get_king_position(color)
-        checking_pieces = []
-        enemy_moves = self.get_moves('white' if color == 'black' else 'black')
-        for move in enemy_moves:
-            if move[1] == king_position:
-                checking_pieces.append(self.get_piece(move[0]))
+    def get_moves_free_check(self, color):
+        enemy_attacks = self.attack_counts[1 - colors[color]]
+        moves_free_check = []
+        for move in self.get_moves(color):
+            end_pos = move[1]
+            if isinstance(self.get_piece(move[0]), King) and enemy_attacks[end_pos[0] * 8 + end_pos[1]]:
+                continue
+            record = self.make_move(move)
+            if not self.is_check(color)[0]:
+                moves_free_check.append(move)
+            self.unmake_move(record)
+        return moves_free_check
 
-        return bool(checking_pieces), checking_pieces
+    def legal_moves(self, color):
+        color_value = colors[color]
+        king_position = self.king_positions.get(color_value)
+        if king_position is None:
+            return self.get_moves(color)
+        king_row, king_col = king_position
+        enemy_attacks = self.attack_counts[1 - color_value]
+        checks = enemy_attacks[king_row * 8 + king_col]
+
+        # walk every ray from the king: a lone friendly piece in front of an enemy
+        # slider is pinned to that ray, an enemy slider in front is a checker
+        pin_rays = {}
+        block_squares = None
+        king_forbidden = []
+        for dr, dc in slider_directions:
+            ray = []
+            friendly = None
+            r, c = king_row + dr, king_col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                ray.append((r, c))
+                piece = self.board[r][c]
+                if piece:
+                    if piece.color == color_value:
+                        if friendly:
+                            break
+                        friendly = piece
+                    else:
+                        if isinstance(piece, Queen) or isinstance(piece, Rook if dr == 0 or dc == 0 else Bishop):
+                            if friendly:
+                                pin_rays[friendly.position] = ray
+                            else:
+                                block_squares = ray
+                                king_forbidden.append((king_row - dr, king_col - dc))
+                        break
+                r += dr
+                c += dc
+        if checks == 1 and block_squares is None:
+            block_squares = [self.is_check(color)[1][0].position]
+
+        moves = []
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if not piece or piece.color != color_value:
+                    continue
+                if isinstance(piece, King):
+                    for move in piece.valid_moves(self):
+                        if not enemy_attacks[move[0] * 8 + move[1]] and move not in king_forbidden:
+                            moves.append([(row, col), move])
+                    continue
+                if checks > 1:
+                    continue
+                piece_moves = piece.valid_moves(self)
+                if (row, col) in pin_rays:
+                    piece_moves = [move for move in piece_moves if move in pin_rays[(row, col)]]
+                if checks:
+                    piece_moves = [move for move in piece_moves if move in block_squares]
+                for move in piece_moves:
+                    moves.append([(row, col), move])
+        return moves
 
     def check_for_check_mate(self, color, valid_moves):
         in_check, checking_pieces = self.is_check(color)
@@ -162,31 +447,5 @@ class Board:
         return False
 
     def translate_to_matrix(self):
-        pawn_matrix = np.zeros((8, 8), dtype=int)
-        rook_matrix = np.zeros((8, 8), dtype=int)
-        knight_matrix = np.zeros((8, 8), dtype=int)
-        bishop_matrix = np.zeros((8, 8), dtype=int)
-        queen_matrix = np.zeros((8, 8), dtype=int)
-        king_matrix = np.zeros((8, 8), dtype=int)
-
-        for row in range(8):
-            for col in range(8):
-                piece = self.get_piece((row, col))
-                if piece:
-                    value = 1 if piece.color == colors['white'] else -1
-                    if isinstance(piece, Pawn):
-                        pawn_matrix[row, col] = value
-                    elif isinstance(piece, Rook):
-                        rook_matrix[row, col] = value
-                    elif isinstance(piece, Knight):
-                        knight_matrix[row, col] = value
-                    elif isinstance(piece, Bishop):
-                        bishop_matrix[row, col] = value
-                    elif isinstance(piece, Queen):
-                        queen_matrix[row, col] = value
-                    elif isinstance(piece, King):
-                        king_matrix[row, col] = value
-
-        board_matrix = np.array([pawn_matrix, rook_matrix, knight_matrix, bishop_matrix, queen_matrix, king_matrix])
-
-        return board_matrix
\ No newline at end of file
+        board_matrix = encode_batch([self.serialize()], allocate(1, planes=6), planes=6)[0]
+        return board_matrix.astype(int)
@@ -0,0 +1,125 @@
+import argparse
+import bisect
+import json
+import os
+import random
+import numpy as np
+from board import Board
+import pgn
+from notation import encode_move, decode_move
+
+# Polyglot record layout: 16 big-endian bytes sorted by key. The keys are this engine's Zobrist keys
+# (zobrist.py), not the Polyglot random table, so books must be built with build_book
+record_dtype = np.dtype([('key', '>u8'), ('move', '>u2'), ('weight', '>u2'), ('learn', '>u4')])
+MAX_WEIGHT = 0xFFFF
+
+
+class Book:
+    # the file is memory-mapped read-only, pages are loaded on demand and shared between processes
+    def __init__(self, path):
+        self.path = path
+        if os.path.getsize(path) % record_dtype.itemsize:
+            raise ValueError(f"{path} is not a book, its size is not a multiple of {record_dtype.itemsize} bytes")
+        if os.path.getsize(path):
+            self.records = np.memmap(path, dtype=record_dtype, mode='r')
+        else:
+            self.records = np.zeros(0, dtype=record_dtype)
+        # a strided view, bisect reads about log2(n) keys and nothing is converted up front
+        self.keys = self.records['key']
+
+    def __len__(self):
+        return len(self.records)
+
+    def entries(self, key):
+        start = bisect.bisect_left(self.keys, key)
+        end = start
+        while end < len(self.keys) and self.keys[end] == key:
+            end += 1
+        return [(decode_move(record['move']), int(record['weight'])) for record in self.records[start:end]]
+
+    def moves(self, board_instance, color):
+        # book moves with their weights, anything illegal here (a key collision) is dropped
+        entries = self.entries(board_instance.zobrist_key)
+        if not entries:
+            return []
+        legal_moves = board_instance.legal_moves(color)
+        return [(move, weight) for move, weight in entries if weight > 0 and move in legal_moves]
+
+    def choose(self, board_instance, color, rng=None, best=False):
+        moves = self.moves(board_instance, color)
+        if not moves:
+            return None
+        if best:
+            return max(moves, key=lambda entry: entry[1])[0]
+        rng = rng or random
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def collect_statistics(sources, max_plies=20, max_games=None):
+    # (key, encoded move) -> [games, score] where score is 2 per win and 1 per draw for the mover
+    statistics = {}
+    games = 0
+    for source in sources:
+        for game in pgn.read_games(source):
+            if max_games is not None and games >= max_games:
+                return statistics, games
+            games += 1
+            outcome = game.outcome()
+            if outcome is None:
+                continue
+            for ply, (board_instance, move) in enumerate(game.positions()):
+                if ply >= max_plies:
+                    break
+                mover_outcome = outcome if board_instance.turn == 'white' else -outcome
+                entry = statistics.setdefault((board_instance.zobrist_key, encode_move(move)), [0, 0])
+                entry[0] += 1
+                entry[1] += mover_outcome + 1
+    return statistics, games
+
+
+def build_book(sources, path, max_plies=20, min_games=1, max_games=None):
+    statistics, games = collect_statistics(sources, max_plies, max_games)
+    entries = [(key, move, score) for (key, move), (count, score) in statistics.items() if count >= min_games and score > 0]
+    records = np.zeros(len(entries), dtype=record_dtype)
+    if entries:
+        keys, moves, scores = zip(*entries)
+        records['key'] = np.array(keys, dtype=np.uint64)
+        records['move'] = moves
+        # weights are scaled down together so the largest fits the 16-bit field
+        scores = np.array(scores, dtype=np.int64)
+        scale = max(1, -(-int(scores.max()) // MAX_WEIGHT))
+        records['weight'] = np.maximum(scores // scale, 1)
+        # by key, best move first within a key
+        records = records[np.lexsort((-records['weight'].astype(np.int64), records['key'].astype(np.uint64)))]
+    with open(path + '.tmp', 'wb') as book_file:
+        records.tofile(book_file)
+    os.replace(path + '.tmp', path)
+    return {'games': games, 'positions': len(set(records['key'].tolist())), 'entries': len(records)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or probe an opening book")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="compile PGN files (plain or gzipped) into a book")
+    build.add_argument('book')
+    build.add_argument('pgn', nargs='+')
+    build.add_argument('--max-plies', type=int, default=20)
+    build.add_argument('--min-games', type=int, default=1)
+    build.add_argument('--max-games', type=int, default=None)
+    probe = subparsers.add_parser('probe', help="list the book moves of a position")
+    probe.add_argument('book')
+    probe.add_argument('--fen', default=None)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        result = build_book(args.pgn, args.book, args.max_plies, args.min_games, args.max_games)
+    else:
+        board_instance = Board.from_fen(args.fen) if args.fen else Board()
+        moves = Book(args.book).moves(board_instance, board_instance.turn)
+        legal_moves = board_instance.legal_moves(board_instance.turn)
+        result = {'fen': board_instance.to_fen(), 'moves': {pgn.move_to_san(board_instance, move, board_instance.turn, legal_moves): weight for move, weight in moves}}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
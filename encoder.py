@@ -0,0 +1,56 @@
+import numpy as np
+
+# plane order follows Board.translate_to_matrix: pawn, rook, knight, bishop, queen, king
+figure_codes = np.arange(1, 7, dtype=np.int8)
+# 12-plane layout: six white planes, then six black planes
+signed_codes = np.concatenate([figure_codes, -figure_codes])
+
+
+def plane_count(planes=12, side_to_move=False):
+    if planes not in (6, 12):
+        raise ValueError(f"planes must be 6 or 12, got {planes}")
+    return planes + (1 if side_to_move else 0)
+
+
+def stack_positions(positions):
+    # serialized positions (Board.serialize) -> (N, 65) int8 codes, squares first and side to move last
+    if isinstance(positions, np.ndarray):
+        return positions.reshape(-1, 65).view(np.int8)
+    return np.frombuffer(b''.join(positions), dtype=np.int8).reshape(-1, 65)
+
+
+def allocate(count, planes=12, side_to_move=False, dtype=np.int8):
+    return np.zeros((count, plane_count(planes, side_to_move), 8, 8), dtype=dtype)
+
+
+def allocate_scratch(count):
+    # the 6-plane encoding goes through the one-hot planes, pass this to encode_batch to reuse them
+    return np.zeros((count, 12, 8, 8), dtype=bool)
+
+
+def encode_batch(positions, out, planes=12, side_to_move=False, scratch=None):
+    # 12 planes hold 0/1 per piece type and color, 6 planes hold +1/-1 like translate_to_matrix;
+    # the optional side-to-move plane is 0 for white and 1 for black. Nothing is allocated per call
+    # except the 6-plane scratch when none (or one of the wrong size) is passed
+    codes = stack_positions(positions)
+    count = codes.shape[0]
+    expected = (count, plane_count(planes, side_to_move), 8, 8)
+    if out.shape != expected:
+        raise ValueError(f"out has shape {out.shape}, expected {expected}")
+    squares = codes[:, :64].reshape(count, 1, 8, 8)
+
+    if planes == 12:
+        np.equal(squares, signed_codes.reshape(1, 12, 1, 1), out=out[:, :12], casting='unsafe')
+    else:
+        if out.dtype.kind == 'u':
+            raise ValueError("6-plane encoding is signed, out must not be unsigned")
+        if scratch is None or scratch.shape[0] < count:
+            scratch = allocate_scratch(count)
+        one_hot = scratch[:count]
+        np.equal(squares, signed_codes.reshape(1, 12, 1, 1), out=one_hot)
+        # white planes minus black planes
+        np.subtract(one_hot[:, :6], one_hot[:, 6:], out=out[:, :6], dtype=np.int8, casting='unsafe')
+
+    if side_to_move:
+        out[:, -1] = codes[:, 64].reshape(count, 1, 1)
+    return out
@@ -1,10 +1,88 @@
+import argparse
+import queue
+import threading
 import pygame
 import sys
-import copy
-from board import Board  # Import the Board class
+import time
+from game_state import GameState
+from players import EnginePlayer
+from notation import square_name
+
+# posted by TurnWorker: a new position is ready, or the engine finished another depth
+TURN_READY = pygame.USEREVENT + 1
+ENGINE_PROGRESS = pygame.USEREVENT + 2
+
+
+def move_text(move):
+    return f"{square_name(move[0])}-{square_name(move[1])}"
+
+
+class TurnWorker(threading.Thread):
+    # owns the GameState: plays moves, computes the next turn (legal moves, check, mate) and runs
+    # the engine off the event loop. The UI only sees the snapshots posted with TURN_READY
+    def __init__(self, state, engine=None, engine_color=None):
+        super().__init__(daemon=True)
+        self.state = state
+        self.engine = engine
+        self.engine_color = engine_color
+        self.moves = queue.Queue()
+
+    def run(self):
+        self.publish()
+        self.play_engine_move()
+        while True:
+            move = self.moves.get()
+            if move is None:
+                return
+            self.state.play(move)
+            self.publish()
+            self.play_engine_move()
+
+    def engine_to_move(self):
+        return self.engine is not None and self.state.turn == self.engine_color and not self.state.is_over()
+
+    def publish(self):
+        state = self.state
+        pygame.event.post(pygame.event.Event(TURN_READY, {
+            # (color, figure) per square: the pieces themselves keep changing while the engine searches
+            'grid': [[(piece.color, piece.figure) if piece else None for piece in row] for row in state.board_instance.board],
+            'valid_moves': list(state.valid_moves),
+            'turn': state.turn,
+            'turn_iteration': state.turn_iteration,
+            'in_check': state.in_check,
+            'result': state.result,
+            'last_move': state.history[-1] if state.history else None,
+            'thinking': self.engine_to_move(),
+        }))
+
+    def play_engine_move(self):
+        if self.engine_to_move():
+            move = self.engine.select_move(self.state.board_instance, self.state.turn, self.post_progress)
+            self.state.play(move)
+            self.publish()
+
+    def post_progress(self, result):
+        pygame.event.post(pygame.event.Event(ENGINE_PROGRESS, {
+            'depth': result.depth, 'nodes': result.nodes, 'score': result.score,
+            'best_move': result.best_move, 'elapsed': result.elapsed,
+        }))
+
+    def submit(self, move):
+        self.moves.put(move)
+
+    def stop(self):
+        if self.engine is not None and self.engine.search is not None:
+            self.engine.search.stop()
+        self.moves.put(None)
+        self.join(timeout=1)
+
 
 class ChessGame:
-    def __init__(self):
+    def __init__(self, backend='board', engine_color=None, depth=2, book=None):
+        self.backend = backend
+        # the side the engine plays, None for two human players
+        self.engine_color = engine_color
+        self.engine = EnginePlayer(max_depth=depth, book=book) if engine_color else None
         self.WIDTH, self.HEIGHT = 800, 800
         self.ROWS, self.COLS = 8, 8
         self.SQUARE_SIZE = self.WIDTH // self.COLS
@@ -33,7 +111,30 @@ class ChessGame:
         }
         self.reverse_figures = {v: k[0] for k, v in self.figures.items()}
 
+        self.image_letters = {figure: 'n' if name == 'Knight' else name[0].lower() for name, figure in self.figures.items()}
+
         self.IMAGES = self.load_images()
+        self.background = self.render_background()
+        # what each square currently shows on screen, and the squares to repaint on the next frame
+        self.drawn = [[None] * self.COLS for _ in range(self.ROWS)]
+        self.targets = set()
+        self.drag_rect = None
+        self.invalidate()
+
+        self.frame_count = 0
+        self.frame_total = 0.0
+        self.frame_max = 0.0
+        self.frame_report = time.perf_counter()
+        self.frame_stats = ''
+        self.status = ''
+
+        # the last position TurnWorker published; busy while it owns the game
+        self.grid = [[None] * self.COLS for _ in range(self.ROWS)]
+        self.valid_moves = []
+        self.turn = 'white'
+        self.result = None
+        self.busy = True
+        self.worker = None
 
     def load_images(self):
         pieces = {
@@ -59,48 +160,149 @@ class ChessGame:
                 print(f"File not found: images/{file_name}")
         return images
 
-    def draw_board(self):
-        self.WIN.fill(self.WHITE)
+    def render_background(self):
+        # the empty board never changes, draw its 64 squares once
+        background = pygame.Surface((self.WIDTH, self.HEIGHT))
+        background.fill(self.WHITE)
         for row in range(self.ROWS):
             for col in range(self.COLS):
                 color = self.LIGHT_BROWN if (row + col) % 2 == 0 else self.DARK_BROWN
-                pygame.draw.rect(self.WIN, color, (col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE))
+                pygame.draw.rect(background, color, self.square_rect(row, col))
+        return background
+
+    def square_rect(self, row, col):
+        return pygame.Rect(col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE)
+
+    def image_key(self, piece):
+        color, figure = piece
+        return f"{'w' if color == 0 else 'b'}{self.image_letters[figure]}"
 
-    def draw_pieces(self, board):
+    def squares_under(self, rect):
+        # board squares overlapped by a pixel rect, clipped to the window
+        rect = rect.clip(self.WIN.get_rect())
+        if rect.width == 0 or rect.height == 0:
+            return set()
+        cols = range(rect.left // self.SQUARE_SIZE, (rect.right - 1) // self.SQUARE_SIZE + 1)
+        rows = range(rect.top // self.SQUARE_SIZE, (rect.bottom - 1) // self.SQUARE_SIZE + 1)
+        return {(row, col) for row in rows for col in cols}
+
+    def mark_changed_squares(self, board):
+        # compare against what is on screen, so moves from any source repaint only what changed
         for row in range(self.ROWS):
             for col in range(self.COLS):
                 piece = board[row][col]
-                if piece:
-                    piece_key = f"{'w' if piece.color == 0 else 'b'}{'n' if piece.__class__.__name__ == 'Knight' else piece.__class__.__name__[0].lower()}"
-                    self.WIN.blit(self.IMAGES[piece_key], (col * self.SQUARE_SIZE, row * self.SQUARE_SIZE))
-
-    def highlight_moves(self, piece_position, valid_moves):
-        for move in valid_moves:
-            if tuple(move[0]) == piece_position:
-                row, col = move[1]
-                pygame.draw.circle(self.WIN, self.BLUE, (col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2, row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2), self.SQUARE_SIZE // 4)
-
-    def handle_mouse_button_up(self, board_instance, selected_piece, dragging, valid_moves):
-        if dragging and selected_piece:
+                key = self.image_key(piece) if piece else None
+                if self.drawn[row][col] != key:
+                    self.drawn[row][col] = key
+                    self.dirty.add((row, col))
+
+    def draw_square(self, row, col, targets=()):
+        rect = self.square_rect(row, col)
+        self.WIN.blit(self.background, rect, rect)
+        key = self.drawn[row][col]
+        if key:
+            self.WIN.blit(self.IMAGES[key], rect)
+        if (row, col) in targets:
+            pygame.draw.circle(self.WIN, self.BLUE, rect.center, self.SQUARE_SIZE // 4)
+        return rect
+
+    def highlight_targets(self, piece_position, valid_moves):
+        return {tuple(move[1]) for move in valid_moves if tuple(move[0]) == piece_position}
+
+    def render(self, selected, drag_rect):
+        # selected is the (square, piece) picked up at mouse-down, or None
+        start = time.perf_counter()
+        self.mark_changed_squares(self.grid)
+        targets = self.highlight_targets(selected[0], self.valid_moves) if selected else set()
+        # highlights that appear or disappear
+        self.dirty |= targets ^ self.targets
+        self.targets = targets
+        # the dragged image is erased where it was and drawn where it is now
+        if self.drag_rect:
+            self.dirty |= self.squares_under(self.drag_rect)
+        if drag_rect:
+            self.dirty |= self.squares_under(drag_rect)
+
+        rects = [self.draw_square(row, col, targets) for row, col in self.dirty]
+        if drag_rect:
+            self.WIN.blit(self.IMAGES[self.image_key(selected[1])], drag_rect)
+        self.drag_rect = drag_rect
+        self.dirty = set()
+
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        elif rects:
+            pygame.display.update(rects)
+        if rects:
+            self.count_frame(time.perf_counter() - start)
+
+    def invalidate(self):
+        self.dirty = {(row, col) for row in range(self.ROWS) for col in range(self.COLS)}
+        self.full_redraw = True
+
+    def count_frame(self, frame_time):
+        # frame times are shown in the caption about twice a second
+        self.frame_count += 1
+        self.frame_total += frame_time
+        self.frame_max = max(self.frame_max, frame_time)
+        now = time.perf_counter()
+        if now - self.frame_report >= 0.5:
+            average = self.frame_total / self.frame_count * 1000
+            self.frame_stats = f"{self.frame_count / (now - self.frame_report):.0f} frames/s, {average:.2f} ms avg, {self.frame_max * 1000:.2f} ms max"
+            self.frame_count, self.frame_total, self.frame_max = 0, 0.0, 0.0
+            self.frame_report = now
+            self.update_caption()
+
+    def update_caption(self):
+        pygame.display.set_caption(' - '.join(part for part in ('Chess', self.status, self.frame_stats) if part))
+
+    def handle_mouse_button_up(self, selected, dragging):
+        if dragging and selected:
             pos = pygame.mouse.get_pos()
             col, row = pos[0] // self.SQUARE_SIZE, pos[1] // self.SQUARE_SIZE
-            end_pos = [row, col]
-            start_pos = list(selected_piece.position)
-            if [start_pos, end_pos] in valid_moves:
-                board_instance.move_piece(tuple(start_pos), tuple(end_pos))
-                selected_piece.position = tuple(end_pos)
+            start, piece = selected
+            if [start, (row, col)] in self.valid_moves:
+                # shown right away, the worker confirms it with the next turn
+                self.grid[row][col], self.grid[start[0]][start[1]] = piece, None
+                self.busy = True
+                self.worker.submit([start, (row, col)])
         return None, False
 
-    def handle_mouse_button_down(self, board_instance, current_turn_color):
+    def handle_turn_ready(self, event):
+        self.grid = event.grid
+        self.valid_moves = event.valid_moves
+        self.turn = event.turn
+        self.result = event.result
+        # input stays locked while the engine thinks about its reply
+        self.busy = event.thinking
+        if event.thinking:
+            self.status = f"engine thinking as {event.turn}"
+        elif self.engine and event.last_move and event.turn != self.engine_color:
+            self.status = f"engine played {move_text(event.last_move)}"
+        else:
+            self.status = ''
+        self.update_caption()
+        self.report_turn(event)
+
+    def handle_engine_progress(self, event):
+        score = event.score if self.engine_color == 'white' else -event.score
+        self.status = f"engine depth {event.depth}, {event.nodes} nodes, best {move_text(event.best_move)}, score {score / 100:+.2f}, {event.elapsed:.1f} s"
+        self.update_caption()
+
+    def handle_mouse_button_down(self, current_turn_color):
+        if self.busy or self.result or current_turn_color == self.engine_color:
+            return None, False, 0, 0
         pos = pygame.mouse.get_pos()
         col, row = pos[0] // self.SQUARE_SIZE, pos[1] // self.SQUARE_SIZE
-        piece = board_instance.get_piece((row, col))
-        if piece and piece.color == self.colors[current_turn_color]:
-            selected_piece = piece
+        piece = self.grid[row][col]
+        if piece and piece[0] == self.colors[current_turn_color]:
+            # the square is kept with the piece, the move starts from where it was picked up
+            selected = ((row, col), piece)
             dragging = True
             drag_offset_x = pos[0] - col * self.SQUARE_SIZE
             drag_offset_y = pos[1] - row * self.SQUARE_SIZE
-            return selected_piece, dragging, drag_offset_x, drag_offset_y
+            return selected, dragging, drag_offset_x, drag_offset_y
         return None, False, 0, 0
 
     def handle_mouse_motion(self, dragging):
@@ -110,17 +312,25 @@ class ChessGame:
             col, row = pos[0] // self.SQUARE_SIZE, pos[1] // self.SQUARE_SIZE
         return col, row
 
+    def report_turn(self, turn):
+        print("Turn:", turn.turn_iteration, turn.turn)
+        print("Is check", turn.in_check)
+        if turn.result == 'checkmate':
+            print(f"Checkmate! {turn.turn} is in checkmate!")
+        elif turn.result == 'stalemate':
+            print(f"Pat! {turn.turn} is in pat!")
+        elif turn.result:
+            print(f"Draw by {turn.result}!")
+
     def main(self):
-        turn_iteration = 1
-        board_instance = Board()
-        board_instance.populate_board()
-        selected_piece = None
-        valid_moves = []
+        # the game is built and played on the worker, the loop below only handles input and drawing
+        self.worker = TurnWorker(GameState(self.backend), self.engine, self.engine_color)
+        self.worker.start()
+        selected = None
         dragging = False
         drag_offset_x = 0
         drag_offset_y = 0
-        turn = 1
-        colors_turn = ['white', 'black']
+        self.render(None, None)
 
         run = True
         while run:
@@ -129,53 +339,40 @@ class ChessGame:
             if event.type == pygame.QUIT:
                 run = False
 
+            elif event.type == TURN_READY:
+                self.handle_turn_ready(event)
+            elif event.type == ENGINE_PROGRESS:
+                self.handle_engine_progress(event)
+
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
-                    selected_piece, dragging, drag_offset_x, drag_offset_y = self.handle_mouse_button_down(board_instance, colors_turn[turn])
+                    selected, dragging, drag_offset_x, drag_offset_y = self.handle_mouse_button_down(self.turn)
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 1:
-                    selected_piece, dragging = self.handle_mouse_button_up(board_instance, selected_piece, dragging, valid_moves)
-                    dragging = False
-                    selected_piece = None
+                    selected, dragging = self.handle_mouse_button_up(selected, dragging)
 
             elif event.type == pygame.MOUSEMOTION:
                 col, row = self.handle_mouse_motion(dragging)
 
-            if board_instance.is_changed():
-                turn = 1 if turn == 0 else 0
-                print("Turn:", turn_iteration, colors_turn[turn])
-                turn_iteration += 1
-                moves = board_instance.get_moves(colors_turn[turn])
-                moves_free_check = []
-                for move in moves:
-                    future_board = copy.deepcopy(board_instance)
-                    start_pos = tuple(move[0])
-                    end_pos = tuple(move[1])
-                    future_board.move_piece(start_pos, end_pos)
-                    if not future_board.is_check(colors_turn[turn])[0]:
-                        moves_free_check.append([list(move[0]), list(move[1])])  # Convert to lists
-                valid_moves = moves_free_check
-
-                print("Is check", board_instance.is_check(colors_turn[turn]))
-                if board_instance.check_for_check_mate(colors_turn[turn], valid_moves):
-                    print(f"Checkmate! {colors_turn[turn]} is in checkmate!")
-                elif board_instance.check_for_pat(colors_turn[turn], valid_moves):
-                    print(f"Pat! {colors_turn[turn]} is in pat!")
-
-            self.draw_board()
-            self.draw_pieces(board_instance.board)
-            if selected_piece:
-                self.highlight_moves(selected_piece.position, valid_moves)
-
-            if dragging and selected_piece:
-                pos = pygame.mouse.get_pos()
-                self.WIN.blit(self.IMAGES[f"{'w' if selected_piece.color == 0 else 'b'}{'n' if selected_piece.__class__.__name__ == 'Knight' else selected_piece.__class__.__name__[0].lower()}"], (pos[0] - drag_offset_x, pos[1] - drag_offset_y))
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.invalidate()
 
-            pygame.display.flip()
+            drag_rect = None
+            if dragging and selected:
+                pos = pygame.mouse.get_pos()
+                drag_rect = pygame.Rect(pos[0] - drag_offset_x, pos[1] - drag_offset_y, self.SQUARE_SIZE, self.SQUARE_SIZE)
+            self.render(selected, drag_rect)
 
+        self.worker.stop()
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    game = ChessGame()
-    game.main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Play chess against a friend or the engine")
+    parser.add_argument('--backend', choices=['board', 'bitboard'], default='board')
+    parser.add_argument('--engine', choices=['white', 'black'], default=None, help="side played by the engine")
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--book', default=None, help="opening book built with book.py")
+    args = parser.parse_args()
+    game = ChessGame(args.backend, args.engine, args.depth, args.book)
+    game.main()
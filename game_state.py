@@ -0,0 +1,68 @@
+from board import Board
+from bitboard import BitBoard
+from piece import other_color
+
+backends = {
+    'board': Board,
+    'bitboard': BitBoard,
+}
+
+
+class GameState:
+    # turns, legal moves and the result of one game, without any rendering
+    def __init__(self, backend='board', max_plies=None):
+        self.board_instance = backends[backend]()
+        self.max_plies = max_plies
+        self.turn = 'white'
+        self.turn_iteration = 1
+        self.history = []
+        self.repetitions = {}
+        self.valid_moves = []
+        self.in_check = False
+        self.result = None
+        self.winner = None
+        self.start_turn()
+
+    def start_turn(self):
+        board_instance = self.board_instance
+        self.valid_moves = board_instance.legal_moves(self.turn)
+        self.in_check = board_instance.is_check(self.turn)[0]
+        key = board_instance.zobrist_key
+        self.repetitions[key] = self.repetitions.get(key, 0) + 1
+
+        if board_instance.check_for_check_mate(self.turn, self.valid_moves):
+            self.result = 'checkmate'
+            self.winner = other_color(self.turn)
+        elif board_instance.check_for_pat(self.turn, self.valid_moves):
+            self.result = 'stalemate'
+        elif self.repetitions[key] >= 3:
+            self.result = 'repetition'
+        elif len(board_instance.captured_pieces) == 30:
+            self.result = 'insufficient material'
+        elif self.max_plies is not None and len(self.history) >= self.max_plies:
+            self.result = 'move limit'
+
+    def is_over(self):
+        return self.result is not None
+
+    def is_legal(self, move):
+        return [tuple(move[0]), tuple(move[1])] in self.valid_moves
+
+    def play(self, move):
+        if self.is_over() or not self.is_legal(move):
+            return False
+        move = [tuple(move[0]), tuple(move[1])]
+        self.board_instance.make_move(move)
+        self.history.append(move)
+        self.turn = other_color(self.turn)
+        self.turn_iteration += 1
+        self.start_turn()
+        return True
+
+    def score(self, color):
+        # 1 for a win, 0.5 for a draw, 0 for a loss, None while the game is running
+        if self.result is None:
+            return None
+        if self.winner is None:
+            return 0.5
+        return 1.0 if self.winner == color else 0.0
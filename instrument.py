@@ -0,0 +1,288 @@
+import argparse
+import copy
+import cProfile
+import json
+import marshal
+import time
+import bitboard
+import board
+import game_state
+import piece
+import search
+import arena
+
+# instrumentation is opt-in: enable() swaps wrappers into the classes and modules below and disable()
+# puts the original functions back, so nothing is counted (and nothing costs) while it is off
+
+
+def default_targets():
+    # (owner, attribute, name); piece subclasses each define their own valid_moves
+    targets = [(piece_class, 'valid_moves', f"{piece_class.__name__}.valid_moves") for piece_class in piece.piece_classes.values()]
+    for owner in (board.Board, bitboard.BitBoard):
+        for attribute in ('get_moves', 'enemy_moves', 'is_check', 'move_piece', 'make_move', 'unmake_move',
+                          'get_moves_free_check', 'legal_moves', 'from_serialized', 'from_fen'):
+            if attribute in vars(owner):
+                targets.append((owner, attribute, f"{owner.__name__}.{attribute}"))
+    targets.append((game_state.GameState, 'play', 'GameState.play'))
+    targets.append((search.Search, 'negamax', 'Search.negamax'))
+    targets.append((search.Search, 'quiescence', 'Search.quiescence'))
+    targets.append((search, 'evaluate', 'search.evaluate'))
+    return targets
+
+
+# a section is one turn or one search, calls and time inside it are also reported per section
+default_sections = [
+    (game_state.GameState, 'start_turn', 'GameState.start_turn', 'turn'),
+    (search.Search, 'search', 'Search.search', 'search'),
+]
+
+# board copies are counted by wrapping the copy module, only when a board is what gets copied
+board_types = (board.Board, bitboard.BitBoard)
+
+
+class Stats:
+    def __init__(self):
+        # name -> [calls, primitive calls, self seconds, cumulative seconds]
+        self.functions = {}
+        # (caller, callee) -> [calls, primitive calls, self seconds, cumulative seconds]
+        self.edges = {}
+        # folded call stack -> self seconds
+        self.stacks = {}
+        self.locations = {}
+        self.sections = []
+        # frames of [name, start, child seconds, path, (section, counters before it) or None]
+        self.frames = []
+        self.active = {}
+
+    def enter(self, name, section=None):
+        path = f"{self.frames[-1][3]};{name}" if self.frames else name
+        snapshot = (section, {key: (entry[0], entry[3]) for key, entry in self.functions.items()}) if section else None
+        self.active[name] = self.active.get(name, 0) + 1
+        self.frames.append([name, time.perf_counter(), 0.0, path, snapshot])
+
+    def leave(self):
+        end = time.perf_counter()
+        name, start, child, path, snapshot = self.frames.pop()
+        elapsed = end - start
+        own = elapsed - child
+        self.active[name] -= 1
+        # recursive calls count once in the cumulative time, as in cProfile
+        primitive = not self.active[name]
+        caller = self.frames[-1][0] if self.frames else None
+        if self.frames:
+            self.frames[-1][2] += elapsed
+
+        entry = self.functions.get(name)
+        if entry is None:
+            entry = self.functions[name] = [0, 0, 0.0, 0.0]
+        entry[0] += 1
+        entry[2] += own
+        if primitive:
+            entry[1] += 1
+            entry[3] += elapsed
+        edge = self.edges.get((caller, name))
+        if edge is None:
+            edge = self.edges[(caller, name)] = [0, 0, 0.0, 0.0]
+        edge[0] += 1
+        edge[2] += own
+        if primitive:
+            edge[1] += 1
+            edge[3] += elapsed
+        self.stacks[path] = self.stacks.get(path, 0.0) + own
+
+        if snapshot is not None:
+            section, before = snapshot
+            calls, times = {}, {}
+            for key, (count, _, _, cumulative) in self.functions.items():
+                before_count, before_time = before.get(key, (0, 0.0))
+                if count > before_count and key != name:
+                    calls[key] = count - before_count
+                    times[key] = cumulative - before_time
+            self.sections.append({'section': section, 'seconds': elapsed, 'calls': calls, 'seconds_by_function': times})
+
+    def reset(self):
+        self.__init__()
+
+    def summary(self):
+        functions = {}
+        for name, (calls, primitive, own, cumulative) in sorted(self.functions.items(), key=lambda item: -item[1][3]):
+            functions[name] = {
+                'calls': calls,
+                'primitive_calls': primitive,
+                'cumulative_ms': cumulative * 1000,
+                'self_ms': own * 1000,
+                'mean_us': cumulative / primitive * 1e6 if primitive else 0,
+            }
+        sections = {}
+        for record in self.sections:
+            entry = sections.setdefault(record['section'], {'count': 0, 'seconds': [], 'calls': {}})
+            entry['count'] += 1
+            entry['seconds'].append(record['seconds'])
+            for key, count in record['calls'].items():
+                entry['calls'][key] = entry['calls'].get(key, 0) + count
+        for entry in sections.values():
+            seconds = entry.pop('seconds')
+            entry['mean_ms'] = sum(seconds) / len(seconds) * 1000
+            entry['max_ms'] = max(seconds) * 1000
+            entry['calls_per_section'] = {key: count / entry['count'] for key, count in sorted(entry.pop('calls').items(), key=lambda item: -item[1])}
+        return {'functions': functions, 'sections': sections}
+
+    def dump_json(self, path):
+        # the summary plus every section, one record per turn or search
+        with open(path, 'w') as json_file:
+            json.dump(dict(self.summary(), section_records=self.sections), json_file, indent=2)
+
+    def dump_folded(self, path):
+        # "a;b;c microseconds" lines, the input of flamegraph.pl, speedscope and inferno
+        with open(path, 'w') as folded_file:
+            for stack, seconds in sorted(self.stacks.items()):
+                folded_file.write(f"{stack} {max(1, round(seconds * 1e6))}\n")
+
+    def dump_pstats(self, path):
+        # the marshal layout cProfile writes, so pstats.Stats(path), snakeviz and gprof2dot read it
+        stats = {}
+        for name, (calls, primitive, own, cumulative) in self.functions.items():
+            stats[self.locations[name]] = (primitive, calls, own, cumulative, {})
+        for (caller, name), (calls, primitive, own, cumulative) in self.edges.items():
+            if caller is not None:
+                stats[self.locations[name]][4][self.locations[caller]] = (calls, primitive, own, cumulative)
+        with open(path, 'wb') as pstats_file:
+            marshal.dump(stats, pstats_file)
+
+
+stats = Stats()
+installed = []
+
+
+def wrap(function, name, section=None):
+    enter, leave = stats.enter, stats.leave
+
+    def wrapper(*args, **kwargs):
+        enter(name, section)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            leave()
+    wrapper.__wrapped__ = function
+    wrapper.__name__ = function.__name__
+    wrapper.__qualname__ = function.__qualname__
+    code = function.__code__
+    stats.locations[name] = (code.co_filename, code.co_firstlineno, name)
+    return wrapper
+
+
+def wrap_copy(function, name):
+    def wrapper(value, *args, **kwargs):
+        if not isinstance(value, board_types):
+            return function(value, *args, **kwargs)
+        stats.enter(name)
+        try:
+            return function(value, *args, **kwargs)
+        finally:
+            stats.leave()
+    wrapper.__wrapped__ = function
+    stats.locations[name] = ('copy.py', 0, name)
+    return wrapper
+
+
+def install(owner, attribute, replacement):
+    installed.append((owner, attribute, vars(owner)[attribute]))
+    setattr(owner, attribute, replacement)
+
+
+def enable(targets=None, sections=None):
+    # installs the wrappers and returns the shared Stats, counting starts from zero
+    if installed:
+        disable()
+    stats.reset()
+    for owner, attribute, name, section in [target + (None,) for target in targets or default_targets()] + \
+                                           list(sections or default_sections):
+        original = vars(owner)[attribute]
+        if isinstance(original, classmethod):
+            install(owner, attribute, classmethod(wrap(original.__func__, name, section)))
+        else:
+            install(owner, attribute, wrap(original, name, section))
+    install(copy, 'copy', wrap_copy(copy.copy, 'copy.copy'))
+    install(copy, 'deepcopy', wrap_copy(copy.deepcopy, 'copy.deepcopy'))
+    return stats
+
+
+def disable():
+    # restores the original functions, the collected stats stay readable
+    while installed:
+        owner, attribute, original = installed.pop()
+        setattr(owner, attribute, original)
+    return stats
+
+
+def is_enabled():
+    return bool(installed)
+
+
+class instrumented:
+    # with instrumented() as stats: ... , wrappers are removed on the way out
+    def __init__(self, targets=None, sections=None):
+        self.targets = targets
+        self.sections = sections
+
+    def __enter__(self):
+        return enable(self.targets, self.sections)
+
+    def __exit__(self, *exc_info):
+        disable()
+        return False
+
+
+def run_workload(player_kinds, depths, max_plies, backend, seed):
+    white = arena.make_player(player_kinds[0], depths[0], seed)
+    black = arena.make_player(player_kinds[1], depths[1], seed + 1)
+    return arena.play_game(white, black, max_plies, backend)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count and time hot-path calls over one headless game, results printed as JSON")
+    parser.add_argument('--white', choices=['random', 'engine'], default='engine')
+    parser.add_argument('--black', choices=['random', 'engine'], default='random')
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--max-plies', type=int, default=40)
+    parser.add_argument('--backend', choices=['board', 'bitboard'], default='board')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help="write the summary and every per-turn/per-search record")
+    parser.add_argument('--folded', default=None, help="write folded stacks for a flame graph")
+    parser.add_argument('--pstats', default=None, help="write the counters in cProfile's format")
+    parser.add_argument('--cprofile', default=None, help="also run the game under cProfile and write its full profile")
+    args = parser.parse_args()
+
+    workload = ((args.white, args.black), (args.depth, args.depth), args.max_plies, args.backend, args.seed)
+    start = time.perf_counter()
+    run_workload(*workload)
+    plain = time.perf_counter() - start
+
+    with instrumented() as collected:
+        start = time.perf_counter()
+        state = run_workload(*workload)
+        elapsed = time.perf_counter() - start
+
+    if args.cprofile:
+        profiler = cProfile.Profile()
+        profiler.runcall(run_workload, *workload)
+        profiler.dump_stats(args.cprofile)
+    if args.json:
+        collected.dump_json(args.json)
+    if args.folded:
+        collected.dump_folded(args.folded)
+    if args.pstats:
+        collected.dump_pstats(args.pstats)
+
+    result = {
+        'plies': len(state.history),
+        'result': state.result,
+        'seconds': plain,
+        'instrumented_seconds': elapsed,
+    }
+    result.update(collected.summary())
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import math
+import time
+import numpy as np
+from piece import colors, figures, other_color
+import encoder
+import evaluation
+from notation import encode_move, decode_move
+
+POLICY_SIZE = 64 * 64
+# node states
+UNEXPANDED, PENDING, EXPANDED, TERMINAL = 0, 1, 2, 3
+
+
+def build_material_tables():
+    # (13, 64) tables indexed by code + 6, the evaluation.py scores for each signed square code
+    mg = np.zeros((13, 64), dtype=np.float32)
+    eg = np.zeros((13, 64), dtype=np.float32)
+    phase = np.zeros((13, 64), dtype=np.float32)
+    for figure in figures.values():
+        for color, code in ((colors['white'], figure), (colors['black'], -figure)):
+            mg[code + 6] = evaluation.mg_tables[color][figure]
+            eg[code + 6] = evaluation.eg_tables[color][figure]
+            phase[code + 6] = evaluation.phase_weights[figure]
+    return mg, eg, phase
+
+
+mg_table, eg_table, phase_table = build_material_tables()
+square_index = np.arange(64)
+
+
+def material_scores(codes):
+    # tapered evaluation of (N, 65) codes from the side to move's point of view, like evaluation.evaluate
+    squares = codes[:, :64].astype(np.intp) + 6
+    mg = mg_table[squares, square_index].sum(axis=1)
+    eg = eg_table[squares, square_index].sum(axis=1)
+    phase = np.minimum(phase_table[squares, square_index].sum(axis=1), evaluation.MAX_PHASE)
+    score = (mg * phase + eg * (evaluation.MAX_PHASE - phase)) / evaluation.MAX_PHASE
+    return np.where(codes[:, 64] == 0, score, -score)
+
+
+class NumpyEvaluator:
+    # CPU stand-in for the policy/value model: one hidden layer over the encoder planes, a 64*64
+    # from-to policy head and a tanh value head. Untrained weights are small and seeded; the value
+    # starts from the tapered evaluation so the stub still prefers winning material
+    def __init__(self, hidden=256, planes=12, material_scale=1 / 400, seed=0, weights=None):
+        self.planes = planes
+        self.material_scale = material_scale
+        inputs = encoder.plane_count(planes, True) * 64
+        if weights is None:
+            rng = np.random.default_rng(seed)
+            weights = {
+                'hidden_w': rng.standard_normal((inputs, hidden), dtype=np.float32) * 0.05,
+                'hidden_b': np.zeros(hidden, dtype=np.float32),
+                'policy_w': rng.standard_normal((hidden, POLICY_SIZE), dtype=np.float32) * 0.01,
+                'policy_b': np.zeros(POLICY_SIZE, dtype=np.float32),
+                'value_w': rng.standard_normal(hidden, dtype=np.float32) * 0.01,
+                'value_b': np.zeros(1, dtype=np.float32),
+            }
+        self.weights = {name: np.asarray(value, dtype=np.float32) for name, value in weights.items()}
+        self.buffer = encoder.allocate(0, planes, True, np.float32)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with np.load(path) as data:
+            return cls(weights=dict(data), **kwargs)
+
+    def save(self, path):
+        np.savez(path, **self.weights)
+
+    def __call__(self, codes):
+        # (N, 65) int8 codes -> (N, 4096) policy logits and (N,) values for the side to move
+        count = len(codes)
+        if len(self.buffer) < count:
+            self.buffer = encoder.allocate(count, self.planes, True, np.float32)
+        planes = encoder.encode_batch(codes, self.buffer[:count], self.planes, True).reshape(count, -1)
+        weights = self.weights
+        hidden = np.maximum(planes @ weights['hidden_w'] + weights['hidden_b'], 0)
+        logits = hidden @ weights['policy_w'] + weights['policy_b']
+        values = np.tanh(hidden @ weights['value_w'] + weights['value_b'] + material_scores(codes) * self.material_scale)
+        return logits, values
+
+
+class MCTSResult:
+    def __init__(self, best_move, value, visits, simulations, elapsed, batches, collisions):
+        self.best_move = best_move
+        self.value = value
+        self.visits = visits
+        self.simulations = simulations
+        self.elapsed = elapsed
+        self.sims_per_second = simulations / elapsed if elapsed > 0 else 0
+        self.batches = batches
+        self.collisions = collisions
+
+    def __repr__(self):
+        return f"MCTSResult(best_move={self.best_move}, value={self.value:.3f}, simulations={self.simulations}, sims_per_second={self.sims_per_second:.0f})"
+
+
+class MCTS:
+    # PUCT over a tree held in flat arrays: node i has its statistics at index i and its children
+    # in the contiguous slice first_child[i]:first_child[i] + child_count[i]. Values are stored from
+    # the point of view of the side that made the move into the node
+    def __init__(self, board_instance, evaluator=None, batch_size=16, c_puct=1.5, virtual_loss=1, capacity=1 << 16):
+        self.board = board_instance
+        self.evaluator = evaluator or NumpyEvaluator()
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self.virtual_loss = virtual_loss
+        self.codes = np.zeros((batch_size, 65), dtype=np.int8)
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.move = np.zeros(capacity, dtype=np.int16)
+        self.prior = np.zeros(capacity, dtype=np.float32)
+        self.visits = np.zeros(capacity, dtype=np.int32)
+        self.value_sum = np.zeros(capacity, dtype=np.float32)
+        self.in_flight = np.zeros(capacity, dtype=np.int32)
+        self.first_child = np.zeros(capacity, dtype=np.int32)
+        self.child_count = np.zeros(capacity, dtype=np.int16)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.size = 0
+
+    def grow(self, needed):
+        # doubling keeps the amortised cost per node constant, searches rarely outgrow the first buffers
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name in ('move', 'prior', 'visits', 'value_sum', 'in_flight', 'first_child', 'child_count', 'state'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def reset(self):
+        self.size = 1
+        for array in (self.visits, self.value_sum, self.in_flight, self.child_count, self.state):
+            array[0] = 0
+
+    def search(self, color, simulations=800, time_limit=None):
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+        self.reset()
+        self.batches = 0
+        self.collisions = 0
+        legal_moves = self.board.legal_moves(color)
+        if not legal_moves:
+            return MCTSResult(None, 0.0, [], 0, 0.0, 0, 0)
+        self.codes[0] = np.frombuffer(self.board.serialize(), dtype=np.int8)
+        logits, values = self.evaluator(self.codes[:1])
+        self.expand(0, legal_moves, logits[0])
+        self.visits[0] = 1
+        self.value_sum[0] = -values[0]
+
+        done = 0
+        while done < simulations and (deadline is None or time.perf_counter() < deadline):
+            done += self.run_batch(color, min(self.batch_size, simulations - done))
+
+        first, count = self.first_child[0], self.child_count[0]
+        children = range(first, first + count)
+        # (move, visits) pairs, most visited first
+        visits = sorted(((self.decode(child), int(self.visits[child])) for child in children), key=lambda entry: -entry[1])
+        best = max(children, key=lambda child: self.visits[child])
+        value = float(self.value_sum[best] / self.visits[best]) if self.visits[best] else 0.0
+        return MCTSResult(self.decode(best), value, visits, done, time.perf_counter() - start, self.batches, self.collisions)
+
+    def decode(self, node):
+        return decode_move(self.move[node])
+
+    def run_batch(self, color, count):
+        # walks count simulations down the tree with virtual loss, evaluates their leaves together
+        # and backs every one of them up; returns the simulations completed
+        pending = []
+        completed = 0
+        for _ in range(count):
+            path, leaf_color, records = self.select(color)
+            leaf = path[-1]
+            state = self.state[leaf]
+            if state == PENDING:
+                # another simulation of this batch already waits on the leaf, stop gathering
+                self.undo_records(records)
+                self.add_in_flight(path, -1)
+                self.collisions += 1
+                break
+            if state == TERMINAL:
+                self.undo_records(records)
+                self.backup(path, self.value_sum[leaf] / max(self.visits[leaf], 1))
+                completed += 1
+                continue
+            legal_moves = self.board.legal_moves(leaf_color)
+            if not legal_moves:
+                # mate or stalemate, the value is for the side that moved into the leaf
+                value = 1.0 if self.board.is_check(leaf_color)[0] else 0.0
+                self.state[leaf] = TERMINAL
+                self.undo_records(records)
+                self.backup(path, value)
+                completed += 1
+                continue
+            self.codes[len(pending)] = np.frombuffer(self.board.serialize(), dtype=np.int8)
+            self.state[leaf] = PENDING
+            pending.append((path, legal_moves))
+            self.undo_records(records)
+
+        if pending:
+            logits, values = self.evaluator(self.codes[:len(pending)])
+            self.batches += 1
+            for index, (path, legal_moves) in enumerate(pending):
+                self.expand(path[-1], legal_moves, logits[index])
+                # the network scores the side to move at the leaf, the leaf stores the mover's view
+                self.backup(path, -float(values[index]))
+                completed += 1
+        return completed
+
+    def select(self, color):
+        # from the root down to an unexpanded or terminal node, playing the moves on the board
+        node = 0
+        path = [0]
+        records = []
+        self.in_flight[0] += self.virtual_loss
+        while self.state[node] == EXPANDED:
+            first, count = self.first_child[node], self.child_count[node]
+            children = slice(first, first + count)
+            in_flight = self.in_flight[children]
+            visits = self.visits[children] + in_flight
+            # every simulation in flight counts as a loss until it is backed up
+            q = np.where(visits > 0, (self.value_sum[children] - in_flight) / np.maximum(visits, 1), 0.0)
+            parent_visits = self.visits[node] + self.in_flight[node]
+            u = self.c_puct * self.prior[children] * math.sqrt(parent_visits) / (1 + visits)
+            node = first + int(np.argmax(q + u))
+            path.append(node)
+            self.in_flight[node] += self.virtual_loss
+            records.append(self.board.make_move(self.decode(node)))
+            color = other_color(color)
+        return path, color, records
+
+    def undo_records(self, records):
+        for record in reversed(records):
+            self.board.unmake_move(record)
+
+    def add_in_flight(self, path, sign):
+        for node in path:
+            self.in_flight[node] += sign * self.virtual_loss
+
+    def expand(self, node, legal_moves, logits):
+        count = len(legal_moves)
+        if self.size + count > self.capacity:
+            self.grow(self.size + count)
+        first = self.size
+        children = slice(first, first + count)
+        codes = np.array([encode_move(move) for move in legal_moves], dtype=np.int16)
+        # softmax over the legal moves only
+        legal_logits = logits[codes.astype(np.intp)]
+        priors = np.exp(legal_logits - legal_logits.max())
+        self.move[children] = codes
+        self.prior[children] = priors / priors.sum()
+        self.visits[children] = 0
+        self.value_sum[children] = 0
+        self.in_flight[children] = 0
+        self.child_count[children] = 0
+        self.state[children] = UNEXPANDED
+        self.first_child[node] = first
+        self.child_count[node] = count
+        self.state[node] = EXPANDED
+        self.size += count
+
+    def backup(self, path, value):
+        # value is for the side that moved into the leaf and flips sign at every ply up
+        for node in reversed(path):
+            self.visits[node] += 1
+            self.value_sum[node] += value
+            self.in_flight[node] -= self.virtual_loss
+            value = -value
+
+
+def best_move(board_instance, color, simulations=800, batch_size=16, evaluator=None, time_limit=None):
+    return MCTS(board_instance, evaluator, batch_size).search(color, simulations, time_limit)
@@ -0,0 +1,38 @@
+# square names, UCI move text and the flat move code shared by the search, MCTS, book, PGN and UCI modules
+files = 'abcdefgh'
+
+
+def square_name(position):
+    row, col = position
+    return f"{files[col]}{row + 1}"
+
+
+def move_to_uci(move):
+    return square_name(move[0]) + square_name(move[1])
+
+
+def uci_to_move(text):
+    # no promotion under these rules, a fifth character never names a playable move
+    if len(text) != 4 or text[0] not in files or text[2] not in files or not text[1].isdigit() or not text[3].isdigit():
+        return None
+    start, end = (int(text[1]) - 1, files.index(text[0])), (int(text[3]) - 1, files.index(text[2]))
+    if not (0 <= start[0] < 8 and 0 <= end[0] < 8):
+        return None
+    return [start, end]
+
+
+def move_squares(move):
+    # (from, to) square indices, row * 8 + col
+    (start_row, start_col), (end_row, end_col) = move
+    return start_row * 8 + start_col, end_row * 8 + end_col
+
+
+def encode_move(move):
+    # from * 64 + to; bit for bit the Polyglot layout too (from row, from file, to row, to file, 3 bits each)
+    start, end = move_squares(move)
+    return start * 64 + end
+
+
+def decode_move(code):
+    start, end = divmod(int(code), 64)
+    return [divmod(start, 8), divmod(end, 8)]
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from board import Board
+from search import Search, SearchResult
+
+
+def search_root_moves(position, color, root_moves, max_depth, time_limit, node_limit, tt_memory_mb):
+    # runs in a worker process: rebuild the board from its serialized form and search a slice of the root
+    board_instance = Board.from_serialized(position)
+    result = Search(board_instance, tt_memory_mb).search(color, max_depth, time_limit, node_limit, root_moves=root_moves)
+    return result.best_move, result.score, result.depth, result.nodes, result.pv
+
+
+class ParallelSearch:
+    # root splitting: every worker searches its own slice of the root moves with a private TT. Slices do not
+    # share alpha bounds or TT entries and each search pays the inter-process round trip, so this only pays off
+    # for deep searches on several cores; at depth 2 with 2 workers it is several times slower than Search
+    def __init__(self, workers=2, tt_memory_mb=16):
+        self.workers = workers
+        self.tt_memory_mb = tt_memory_mb
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def search(self, board_instance, color, max_depth=64, time_limit=None, node_limit=None):
+        start = time.perf_counter()
+        legal_moves = board_instance.legal_moves(color)
+        if not legal_moves:
+            return SearchResult(None, 0, 0, 0, 0.0, [])
+
+        position = board_instance.serialize()
+        slices = [legal_moves[index::self.workers] for index in range(self.workers)]
+        slice_node_limit = node_limit // self.workers if node_limit is not None else None
+        futures = [
+            self.executor.submit(search_root_moves, position, color, root_moves, max_depth, time_limit, slice_node_limit, self.tt_memory_mb)
+            for root_moves in slices if root_moves
+        ]
+
+        outcomes = [future.result() for future in futures]
+        nodes = sum(outcome[3] for outcome in outcomes)
+        # slices interrupted before finishing depth 1 carry no score
+        searched = [outcome for outcome in outcomes if outcome[2] > 0] or outcomes
+        best = None
+        for best_move, score, depth, _, pv in searched:
+            # ties go to the move that comes first in legal_moves, whichever worker found it
+            if best is None or score > best[1] or (score == best[1] and legal_moves.index(best_move) < legal_moves.index(best[0])):
+                best = (best_move, score, pv)
+
+        elapsed = time.perf_counter() - start
+        depth = min(outcome[2] for outcome in searched)
+        return SearchResult(best[0], best[1], depth, nodes, elapsed, best[2])
@@ -0,0 +1,134 @@
+import argparse
+import copy
+import json
+import sys
+import time
+import numpy as np
+from board import Board
+from bitboard import BitBoard
+from piece import other_color
+from notation import move_to_uci
+
+# Node counts for this game's rules: no castling, en passant or promotion. They agree with the
+# published tables wherever those moves cannot occur yet (e.g. the starting position up to depth 4).
+reference_positions = {
+    'startpos': {
+        'fen': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1',
+        'nodes': [20, 400, 8902, 197281],
+    },
+    'kiwipete': {
+        'fen': 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w - - 0 1',
+        'nodes': [46, 1865, 86585, 3488552],
+    },
+    'endgame': {
+        'fen': '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+        'nodes': [14, 191, 2810, 43087],
+    },
+    'promotion-free': {
+        'fen': 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w - - 0 1',
+        'nodes': [6, 222, 7861, 302707],
+    },
+    'pins': {
+        'fen': '4k3/8/8/q2PK2r/8/8/8/8 w - - 0 1',
+        'nodes': [6, 191, 786, 26968],
+    },
+}
+
+
+def check_state(board_instance):
+    # incremental attack maps, king positions, Zobrist key and evaluation must match a full recompute
+    fresh = copy.copy(board_instance)
+    fresh.rebuild_state()
+    assert np.array_equal(fresh.attack_counts, board_instance.attack_counts), "attack maps drifted"
+    assert fresh.king_positions == board_instance.king_positions, "king positions drifted"
+    assert fresh.zobrist_key == board_instance.zobrist_key, "zobrist key drifted"
+    assert (fresh.mg_score, fresh.eg_score, fresh.phase) == (board_instance.mg_score, board_instance.eg_score, board_instance.phase), "evaluation drifted"
+
+
+def perft(board_instance, depth, color, generator='legal_moves', verify=False):
+    if depth == 0:
+        return 1
+    if verify:
+        check_state(board_instance)
+    moves = getattr(board_instance, generator)(color)
+    if depth == 1 and not verify:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        record = board_instance.make_move(move)
+        nodes += perft(board_instance, depth - 1, other_color(color), generator, verify) if depth > 1 else 1
+        if verify and depth == 1:
+            check_state(board_instance)
+        board_instance.unmake_move(record)
+    return nodes
+
+
+def divide(board_instance, depth, color, generator='legal_moves'):
+    counts = {}
+    for move in getattr(board_instance, generator)(color):
+        record = board_instance.make_move(move)
+        counts[move_to_uci(move)] = perft(board_instance, depth - 1, other_color(color), generator) if depth > 1 else 1
+        board_instance.unmake_move(record)
+    return counts
+
+
+def make_backend(fen, backend):
+    board_instance = Board.from_fen(fen)
+    if backend == 'bitboard':
+        return BitBoard.from_board(board_instance)
+    return board_instance
+
+
+def run_suite(names, max_depth, backend='board', generator='legal_moves', verify=False):
+    results = []
+    failed = False
+    for name in names:
+        position = reference_positions[name]
+        color = 'black' if position['fen'].split()[1] == 'b' else 'white'
+        depths = []
+        for depth in range(1, max_depth + 1):
+            board_instance = make_backend(position['fen'], backend)
+            start = time.perf_counter()
+            nodes = perft(board_instance, depth, color, generator, verify)
+            elapsed = time.perf_counter() - start
+            expected = position['nodes'][depth - 1] if depth <= len(position['nodes']) else None
+            ok = expected is None or nodes == expected
+            failed = failed or not ok
+            depths.append({
+                'depth': depth,
+                'nodes': nodes,
+                'expected': expected,
+                'ok': ok,
+                'seconds': elapsed,
+                'nps': int(nodes / elapsed) if elapsed > 0 else 0,
+            })
+        results.append({'position': name, 'fen': position['fen'], 'depths': depths})
+    return {'backend': backend, 'generator': generator, 'verify': verify, 'ok': not failed, 'positions': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft node counts and timings for the move generator, printed as JSON")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--position', choices=sorted(reference_positions), action='append')
+    parser.add_argument('--fen', help="divide a custom position instead of running the suite")
+    parser.add_argument('--divide', action='store_true', help="per-move node counts at --depth")
+    parser.add_argument('--backend', choices=['board', 'bitboard'], default='board')
+    parser.add_argument('--generator', choices=['legal_moves', 'get_moves_free_check'], default='legal_moves')
+    parser.add_argument('--verify', action='store_true', help="check incremental Board state against a rebuild at every node")
+    args = parser.parse_args()
+
+    if args.divide or args.fen:
+        fen = args.fen or reference_positions[(args.position or ['startpos'])[0]]['fen']
+        color = 'black' if fen.split()[1] == 'b' else 'white'
+        counts = divide(make_backend(fen, args.backend), args.depth, color, args.generator)
+        print(json.dumps({'fen': fen, 'depth': args.depth, 'nodes': sum(counts.values()), 'moves': counts}, indent=2))
+        return
+
+    result = run_suite(args.position or list(reference_positions), args.depth, args.backend, args.generator, args.verify)
+    print(json.dumps(result, indent=2))
+    if not result['ok']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
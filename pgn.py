@@ -0,0 +1,246 @@
+import gzip
+import io
+import re
+import numpy as np
+from board import Board
+from piece import figures, other_color
+from notation import files, square_name, move_squares
+import encoder
+
+# results, comments, NAGs, variation brackets and move numbers are dropped, anything else is a move;
+# a brace comment still open at the end of the text is one token too
+token_pattern = re.compile(r'\{[^}]*\}?|;[^\n]*|\$\d+|[()]|1-0|0-1|1/2-1/2|\*|\d+\.+|[^\s(){};]+')
+results = {'1-0', '0-1', '1/2-1/2', '*'}
+header_pattern = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+san_pattern = re.compile(r'^([KQRBN])?([a-h])?([1-8])?x?([a-h])([1-8])$')
+
+san_figures = {'K': figures['King'], 'Q': figures['Queen'], 'R': figures['Rook'], 'B': figures['Bishop'], 'N': figures['Knight']}
+figure_letters = {figure: letter for letter, figure in san_figures.items()}
+
+
+def open_pgn(path):
+    # gzip is detected from the magic bytes, not the file name
+    with open(path, 'rb') as raw:
+        compressed = raw.read(2) == b'\x1f\x8b'
+    binary = gzip.open(path, 'rb') if compressed else open(path, 'rb')
+    return io.TextIOWrapper(binary, encoding='utf-8', errors='replace')
+
+
+def parse_san(board_instance, san, color, legal_moves=None):
+    # the legal move a SAN token names, or None when these rules cannot play it
+    # (castling, promotion, en passant) or it matches no legal move
+    san = san.rstrip('+#!?')
+    match = san_pattern.match(san)
+    if not match:
+        return None
+    letter, from_file, from_rank, to_file, to_rank = match.groups()
+    figure = san_figures[letter] if letter else figures['Pawn']
+    target = (int(to_rank) - 1, files.index(to_file))
+    if legal_moves is None:
+        legal_moves = board_instance.legal_moves(color)
+    found = None
+    for move in legal_moves:
+        start, end = move
+        if end != target or board_instance.get_piece(start).figure != figure:
+            continue
+        if from_file and start[1] != files.index(from_file):
+            continue
+        if from_rank and start[0] != int(from_rank) - 1:
+            continue
+        if found:
+            return None
+        found = move
+    return found
+
+
+def move_to_san(board_instance, move, color, legal_moves=None):
+    if legal_moves is None:
+        legal_moves = board_instance.legal_moves(color)
+    start, end = move
+    piece = board_instance.get_piece(start)
+    capture = bool(board_instance.get_piece(end))
+    if piece.figure == figures['Pawn']:
+        san = f"{files[start[1]]}x" if capture else ''
+    else:
+        rivals = [other[0] for other in legal_moves
+                  if other[1] == end and other[0] != start and board_instance.get_piece(other[0]).figure == piece.figure]
+        san = figure_letters[piece.figure]
+        if rivals:
+            if all(rival[1] != start[1] for rival in rivals):
+                san += files[start[1]]
+            elif all(rival[0] != start[0] for rival in rivals):
+                san += str(start[0] + 1)
+            else:
+                san += square_name(start)
+        if capture:
+            san += 'x'
+    san += square_name(end)
+
+    record = board_instance.make_move(move)
+    if board_instance.is_check(other_color(color))[0]:
+        san += '#' if not board_instance.legal_moves(other_color(color)) else '+'
+    board_instance.unmake_move(record)
+    return san
+
+
+class PgnGame:
+    def __init__(self, headers, sans, result):
+        self.headers = headers
+        self.sans = sans
+        self.result = result
+
+    def start_board(self):
+        if 'FEN' in self.headers:
+            return Board.from_fen(self.headers['FEN'])
+        return Board()
+
+    def positions(self):
+        # yields (board, move) before each move, the board is shared and changes after every yield;
+        # the game stops at the first move these rules cannot play
+        board_instance = self.start_board()
+        color = board_instance.turn
+        for san in self.sans:
+            move = parse_san(board_instance, san, color)
+            if move is None:
+                return
+            yield board_instance, move
+            board_instance.make_move(move)
+            color = other_color(color)
+
+    def moves(self):
+        return [move for _, move in self.positions()]
+
+    def outcome(self):
+        # +1/0/-1 for white, None for unfinished games
+        return {'1-0': 1, '0-1': -1, '1/2-1/2': 0}.get(self.result)
+
+
+def read_games(source):
+    # streams games from a path or an open text file, one game in memory at a time
+    stream = open_pgn(source) if isinstance(source, str) else source
+    try:
+        headers = {}
+        movetext = []
+        # [inside a brace comment, variation depth] at the end of the lines read so far
+        state = [False, 0]
+        for line in stream:
+            if line.startswith('[') and state == [False, 0]:
+                match = header_pattern.match(line)
+                if match:
+                    if movetext:
+                        # a game without a result token ends where the next one starts
+                        yield parse_movetext(headers, movetext)
+                        headers, movetext = {}, []
+                    headers[match.group(1)] = match.group(2).replace('\\"', '"')
+                    continue
+            if line.strip() or movetext:
+                movetext.append(line)
+            if scan_movetext(line, state):
+                yield parse_movetext(headers, movetext)
+                headers, movetext = {}, []
+        if headers or any(line.strip() for line in movetext):
+            yield parse_movetext(headers, movetext)
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def scan_movetext(line, state):
+    # carries state across lines; True when the line's last token is a result outside any comment or variation
+    if state[0]:
+        end = line.find('}')
+        if end < 0:
+            return False
+        line = line[end + 1:]
+        state[0] = False
+    ends = False
+    for token in token_pattern.findall(line):
+        ends = False
+        if token == '(':
+            state[1] += 1
+        elif token == ')':
+            state[1] = max(0, state[1] - 1)
+        elif token[0] == '{' and not token.endswith('}'):
+            state[0] = True
+        elif token in results:
+            ends = state[1] == 0
+    return ends
+
+
+def parse_movetext(headers, lines):
+    sans = []
+    result = headers.get('Result', '*')
+    depth = 0
+    for token in token_pattern.findall(''.join(lines)):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth or token[0] in '{;$' or token[0].isdigit() and token.rstrip('.').isdigit():
+            continue
+        elif token in results:
+            result = token
+        else:
+            sans.append(token)
+    return PgnGame(headers, sans, result)
+
+
+def encode_games(source, batch_size=4096, planes=12, side_to_move=True, max_games=None):
+    # bulk mode: yields (positions, moves, outcomes) batches straight from the encoder; the arrays are
+    # reused between batches, copy them to keep them. outcomes are for the side to move, 0 if unknown
+    out = encoder.allocate(batch_size, planes, side_to_move)
+    scratch = encoder.allocate_scratch(batch_size) if planes == 6 else None
+    codes = np.zeros((batch_size, 65), dtype=np.int8)
+    moves = np.zeros((batch_size, 2), dtype=np.int16)
+    outcomes = np.zeros(batch_size, dtype=np.int8)
+    filled = 0
+    for number, game in enumerate(read_games(source)):
+        if max_games is not None and number >= max_games:
+            break
+        outcome = game.outcome() or 0
+        for board_instance, move in game.positions():
+            codes[filled] = np.frombuffer(board_instance.serialize(), dtype=np.int8)
+            moves[filled] = move_squares(move)
+            outcomes[filled] = outcome if board_instance.turn == 'white' else -outcome
+            filled += 1
+            if filled == batch_size:
+                yield encoder.encode_batch(codes, out, planes, side_to_move, scratch), moves, outcomes
+                filled = 0
+    if filled:
+        yield encoder.encode_batch(codes[:filled], out[:filled], planes, side_to_move, scratch), moves[:filled], outcomes[:filled]
+
+
+def write_game(stream, moves, headers=None, result='*', board_instance=None):
+    # moves are played on a copy of board_instance (the starting position by default)
+    board_instance = Board.from_fen(board_instance.to_fen()) if board_instance else Board()
+    headers = dict(headers or {})
+    headers.setdefault('Result', result)
+    if board_instance.to_fen() != Board().to_fen():
+        headers.setdefault('SetUp', '1')
+        headers.setdefault('FEN', board_instance.to_fen())
+    for name, value in headers.items():
+        escaped = value.replace('"', '\\"')
+        stream.write(f'[{name} "{escaped}"]\n')
+
+    color = board_instance.turn
+    black_first = color == 'black'
+    tokens = []
+    for ply, move in enumerate(moves):
+        number = (ply + black_first) // 2 + 1
+        if color == 'white':
+            tokens.append(f"{number}.")
+        elif ply == 0:
+            tokens.append(f"{number}...")
+        tokens.append(move_to_san(board_instance, move, color))
+        board_instance.make_move(move)
+        color = other_color(color)
+    tokens.append(result)
+
+    line = ''
+    stream.write('\n')
+    for token in tokens:
+        if len(line) + len(token) >= 80:
+            stream.write(line.rstrip() + '\n')
+            line = ''
+        line += token + ' '
+    stream.write(line.rstrip() + '\n\n')
@@ -1,5 +1,3 @@
-import copy
-
 colors = {
     'white': 0,
     'black': 1,
@@ -14,7 +12,15 @@ figures = {
 }
 reverse_figures = {v: k[0] for k, v in figures.items()}
 
+
+def other_color(color):
+    return 'black' if color == 'white' else 'white'
+
+
 class Piece:
+    # no per-instance __dict__, boards hold many of these
+    __slots__ = ('color', 'position', 'eliminated', 'destructable', 'first_move', 'figure')
+
     def __init__(self, color, position):
         self.color = color
         self.position = position
@@ -27,7 +33,31 @@ class Piece:
     def valid_moves(self, board_instance):
         return []
 
+    def attacked_squares(self, board_instance):
+        return []
+
+    def ray_attacks(self, board_instance, directions):
+        squares = []
+        row, col = self.position
+
+        for dr, dc in directions:
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                squares.append((r, c))
+                if not board_instance.check_for_empty((r, c)):
+                    break
+                r += dr
+                c += dc
+
+        return squares
+
+    def leaper_attacks(self, offsets):
+        row, col = self.position
+        return [(row + dr, col + dc) for dr, dc in offsets if 0 <= row + dr < 8 and 0 <= col + dc < 8]
+
 class Pawn(Piece):
+    __slots__ = ()
+
     def __init__(self, color, position):
         super().__init__(color, position)
         self.first_move = True
@@ -61,7 +91,14 @@ class Pawn(Piece):
 
         return moves
 
+    def attacked_squares(self, board_instance):
+        if self.color == colors['white']:
+            return self.leaper_attacks([[1, 1], [1, -1]])
+        return self.leaper_attacks([[-1, 1], [-1, -1]])
+
 class Rook(Piece):
+    __slots__ = ()
+
     def __init__(self, color, position):
         super().__init__(color, position)
         self.first_move = True
@@ -86,7 +123,12 @@ class Rook(Piece):
 
         return moves
 
+    def attacked_squares(self, board_instance):
+        return self.ray_attacks(board_instance, [[1, 0], [-1, 0], [0, 1], [0, -1]])
+
 class Knight(Piece):
+    __slots__ = ()
+
     def __init__(self, color, position):
         super().__init__(color, position)
         self.figure = figures['Knight']
@@ -104,7 +146,12 @@ class Knight(Piece):
 
         return moves
 
+    def attacked_squares(self, board_instance):
+        return self.leaper_attacks([[1, 2], [1, -2], [-1, 2], [-1, -2], [2, 1], [2, -1], [-2, 1], [-2, -1]])
+
 class Bishop(Piece):
+    __slots__ = ()
+
     def __init__(self, color, position):
         super().__init__(color, position)
         self.figure = figures['Bishop']
@@ -128,7 +175,12 @@ class Bishop(Piece):
 
         return moves
 
+    def attacked_squares(self, board_instance):
+        return self.ray_attacks(board_instance, [[1, 1], [1, -1], [-1, 1], [-1, -1]])
+
 class Queen(Piece):
+    __slots__ = ()
+
     def __init__(self, color, position):
         super().__init__(color, position)
         self.figure = figures['Queen']
@@ -152,7 +204,12 @@ class Queen(Piece):
 
         return moves
 
+    def attacked_squares(self, board_instance):
+        return self.ray_attacks(board_instance, [[1, 0], [-1, 0], [0, 1], [0, -1], [1, 1], [1, -1], [-1, 1], [-1, -1]])
+
 class King(Piece):
+    __slots__ = ()
+
     def __init__(self, color, position):
         super().__init__(color, position)
         self.figure = figures['King']
@@ -170,7 +227,6 @@ class King(Piece):
                 moves.append((new_row, new_col))
 
         # restricted moves
-        enemy_moves = board_instance.enemy_moves(self.color)
         king_position = board_instance.get_enemy_king_position(self.color)
         if king_position:
             restricted_positions = []
@@ -182,15 +238,18 @@ class King(Piece):
                     restricted_positions.append((new_row, new_col))
 
             moves = [move for move in moves if move not in restricted_positions]
-        moves = [move for move in moves if move not in enemy_moves]
-
-        valid_moves = []
-        for move in moves:
-            future_board = copy.deepcopy(board_instance)
-            future_board.board[move[0]][move[1]] = self
-            future_board.board[row][col] = None
-            future_enemy_moves = future_board.future_enemy_moves(self.color)
-            if move not in future_enemy_moves:
-                valid_moves.append(move)
-
-        return valid_moves
\ No newline at end of file
+
+        # squares attacked by the enemy are rejected by Board.get_moves_free_check
+        return moves
+
+    def attacked_squares(self, board_instance):
+        return self.leaper_attacks([[1, 0], [-1, 0], [0, 1], [0, -1], [1, 1], [1, -1], [-1, 1], [-1, -1]])
+
+piece_classes = {
+    figures['Pawn']: Pawn,
+    figures['Rook']: Rook,
+    figures['Knight']: Knight,
+    figures['Bishop']: Bishop,
+    figures['Queen']: Queen,
+    figures['King']: King,
+}
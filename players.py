@@ -0,0 +1,57 @@
+import random
+from search import Search
+from book import Book
+from mcts import MCTS
+
+# EnginePlayer is deterministic: self-play and matches open its games with this many random plies so they differ
+ENGINE_RANDOM_PLIES = 4
+
+
+class RandomPlayer:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def select_move(self, board_instance, color):
+        legal_moves = board_instance.legal_moves(color)
+        if not legal_moves:
+            return None
+        return self.rng.choice(legal_moves)
+
+
+class EnginePlayer:
+    def __init__(self, max_depth=2, time_limit=None, node_limit=None, tt_memory_mb=16, book=None, seed=None, tablebase=None):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.tt_memory_mb = tt_memory_mb
+        # a Book or the path of a book file, consulted before searching
+        self.book = Book(book) if isinstance(book, str) else book
+        self.rng = random.Random(seed)
+        self.tablebase = tablebase
+        self.search = None
+
+    def select_move(self, board_instance, color, info=None):
+        # info, if given, gets a SearchResult after every completed depth
+        if self.book is not None:
+            move = self.book.choose(board_instance, color, self.rng)
+            if move is not None:
+                return move
+        # keep the search (and its TT) while we play on the same board
+        if self.search is None or self.search.board is not board_instance:
+            self.search = Search(board_instance, self.tt_memory_mb, self.tablebase)
+        return self.search.search(color, self.max_depth, self.time_limit, self.node_limit, info).best_move
+
+
+class MCTSPlayer:
+    def __init__(self, simulations=400, batch_size=16, time_limit=None, evaluator=None):
+        self.simulations = simulations
+        self.batch_size = batch_size
+        self.time_limit = time_limit
+        self.evaluator = evaluator
+        self.mcts = None
+
+    def select_move(self, board_instance, color, info=None):
+        # the tree buffers are kept between moves on the same board
+        if self.mcts is None or self.mcts.board is not board_instance:
+            self.mcts = MCTS(board_instance, self.evaluator, self.batch_size)
+        return self.mcts.search(color, self.simulations, self.time_limit).best_move
@@ -0,0 +1,72 @@
+import numpy as np
+from board import Board
+from piece import colors
+from zobrist import piece_keys, side_key
+from notation import move_squares
+
+
+class Position:
+    # a whole position in 65 bytes: the signed square codes of Board.serialize, then the side to move
+    __slots__ = ('codes',)
+
+    def __init__(self, codes=None):
+        self.codes = start_codes if codes is None else bytes(codes)
+        if len(self.codes) != 65:
+            raise ValueError(f"a position is 65 bytes, got {len(self.codes)}")
+
+    @classmethod
+    def from_board(cls, board_instance):
+        return cls(board_instance.serialize())
+
+    def to_board(self):
+        return Board.from_serialized(self.codes)
+
+    def copy(self):
+        # bytes are immutable, the copy can share them
+        return Position(self.codes)
+
+    @property
+    def turn(self):
+        return 'black' if self.codes[64] else 'white'
+
+    def squares(self):
+        # read-only (8, 8) int8 view, positive codes are white pieces
+        return np.frombuffer(self.codes, dtype=np.int8, count=64).reshape(8, 8)
+
+    def get_code(self, position):
+        row, col = position
+        code = self.codes[row * 8 + col]
+        return code - 256 if code > 127 else code
+
+    def after_move(self, move):
+        # the position after an unvalidated move, the board itself is not touched
+        start, end = move_squares(move)
+        codes = bytearray(self.codes)
+        codes[end] = codes[start]
+        codes[start] = 0
+        codes[64] ^= 1
+        return Position(codes)
+
+    @property
+    def zobrist_key(self):
+        # same key as Board.zobrist_key for the same position
+        key = side_key if self.codes[64] else 0
+        for sq, code in enumerate(self.codes[:64]):
+            if code:
+                if code > 127:
+                    key ^= piece_keys[colors['black']][256 - code][sq]
+                else:
+                    key ^= piece_keys[colors['white']][code][sq]
+        return key
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.codes == other.codes
+
+    def __hash__(self):
+        return hash(self.codes)
+
+    def __repr__(self):
+        return f"Position({self.codes.hex()})"
+
+
+start_codes = Board().serialize()
@@ -0,0 +1,337 @@
+import time
+import numpy as np
+from piece import figures, other_color
+from notation import encode_move, decode_move
+import evaluation
+from tablebase import Tablebase
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+INFINITY = 1000000
+MAX_PLY = 128
+
+piece_values = {
+    figures['Pawn']: 100,
+    figures['Rook']: 500,
+    figures['Knight']: 320,
+    figures['Bishop']: 330,
+    figures['Queen']: 900,
+    figures['King']: 0,
+}
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+def evaluate(board_instance, color):
+    # tapered material and piece-square score, kept up to date by make_move/unmake_move
+    return evaluation.evaluate(board_instance, color)
+
+
+class TranspositionTable:
+    # key, move, score, depth, flag, age
+    entry_bytes = 8 + 2 + 4 + 1 + 1 + 1
+
+    def __init__(self, memory_mb=16):
+        self.size = max(1, int(memory_mb * 1024 * 1024) // self.entry_bytes)
+        self.keys = np.zeros(self.size, dtype=np.uint64)
+        self.moves = np.zeros(self.size, dtype=np.int16)
+        self.scores = np.zeros(self.size, dtype=np.int32)
+        self.depths = np.full(self.size, -1, dtype=np.int8)
+        self.flags = np.zeros(self.size, dtype=np.uint8)
+        self.ages = np.zeros(self.size, dtype=np.uint8)
+        self.age = 0
+
+    def new_search(self):
+        self.age = (self.age + 1) % 256
+
+    def clear(self):
+        self.keys[:] = 0
+        self.depths[:] = -1
+        self.age = 0
+
+    def probe(self, key):
+        index = key % self.size
+        if self.depths[index] < 0 or int(self.keys[index]) != key:
+            return None
+        return int(self.depths[index]), int(self.flags[index]), int(self.scores[index]), int(self.moves[index])
+
+    def store(self, key, depth, flag, score, move):
+        index = key % self.size
+        # replace entries from older searches, otherwise keep the deeper one
+        if int(self.keys[index]) != key and self.ages[index] == self.age and self.depths[index] > depth:
+            return
+        self.keys[index] = key
+        self.depths[index] = min(depth, 127)
+        self.flags[index] = flag
+        self.scores[index] = score
+        self.moves[index] = move
+        self.ages[index] = self.age
+
+    def usage(self):
+        return float(np.count_nonzero(self.depths >= 0)) / self.size
+
+
+class SearchResult:
+    def __init__(self, best_move, score, depth, nodes, elapsed, pv):
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.nps = int(nodes / elapsed) if elapsed > 0 else 0
+        self.pv = pv
+
+    def __repr__(self):
+        return f"SearchResult(best_move={self.best_move}, score={self.score}, depth={self.depth}, nodes={self.nodes}, nps={self.nps})"
+
+
+class Search:
+    def __init__(self, board_instance, tt_memory_mb=16, tablebase=None):
+        self.board = board_instance
+        self.tt = TranspositionTable(tt_memory_mb)
+        # a Tablebase or the directory of generated tables, probed once few pieces are left
+        self.tablebase = Tablebase(tablebase) if isinstance(tablebase, str) else tablebase
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {'white': [0] * 4096, 'black': [0] * 4096}
+        self.nodes = 0
+        self.stopped = False
+        # set by stop() from another thread, cleared by whoever starts the next search so an early stop is not lost
+        self.stop_requested = False
+        # set by set_deadline() from another thread, cleared like stop_requested
+        self.requested_deadline = None
+        self.deadline = None
+        self.node_limit = None
+
+    def search(self, color, max_depth=64, time_limit=None, node_limit=None, info=None, root_moves=None, history=None):
+        # history: Zobrist keys of the game's earlier positions, reaching one again scores as a draw
+        self.nodes = 0
+        self.stopped = False
+        self.node_limit = node_limit
+        start = time.perf_counter()
+        self.deadline = start + time_limit if time_limit is not None else None
+        # read after the line above so a deadline set before this search got going is not overwritten
+        if self.requested_deadline is not None:
+            self.deadline = self.requested_deadline
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.tt.new_search()
+        self.path = list(history or [])
+
+        result = SearchResult(None, 0, 0, 0, 0.0, [])
+        legal_moves = self.board.legal_moves(color)
+        if root_moves is not None:
+            legal_moves = [move for move in legal_moves if move in root_moves]
+        if not legal_moves:
+            return result
+        # always have a move to return, even if the first iteration is interrupted
+        result.best_move = legal_moves[0]
+
+        for depth in range(1, max_depth + 1):
+            score, best_move = self.search_root(color, depth, legal_moves)
+            if self.stopped:
+                break
+            elapsed = time.perf_counter() - start
+            result = SearchResult(best_move, score, depth, self.nodes, elapsed, self.principal_variation(color, depth))
+            if info:
+                info(result)
+            if abs(score) >= MATE_THRESHOLD:
+                break
+
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        result.nps = int(result.nodes / result.elapsed) if result.elapsed > 0 else 0
+        return result
+
+    def stop(self):
+        self.stop_requested = True
+
+    def set_deadline(self, deadline):
+        # a perf_counter() deadline for the running search, or the next one if it has not started yet
+        self.requested_deadline = deadline
+        self.deadline = deadline
+
+    def check_limits(self):
+        if self.stop_requested:
+            self.stopped = True
+        elif self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+        elif self.deadline is not None and self.nodes & 255 == 0 and time.perf_counter() >= self.deadline:
+            self.stopped = True
+
+    def search_root(self, color, depth, legal_moves):
+        alpha, beta = -INFINITY, INFINITY
+        best_move = None
+        entry = self.tt.probe(self.board.zobrist_key)
+        tt_move = entry[3] if entry else None
+        self.path.append(self.board.zobrist_key)
+        for move in self.order_moves(legal_moves, color, 0, tt_move):
+            record = self.board.make_move(move)
+            score = -self.negamax(other_color(color), depth - 1, -beta, -alpha, 1)
+            self.board.unmake_move(record)
+            if self.stopped:
+                break
+            if best_move is None or score > alpha:
+                alpha = score
+                best_move = move
+        self.path.pop()
+        if best_move is not None and not self.stopped:
+            self.tt.store(self.board.zobrist_key, depth, EXACT, alpha, encode_move(best_move))
+        return alpha, best_move
+
+    def negamax(self, color, depth, alpha, beta, ply):
+        self.nodes += 1
+        self.check_limits()
+        if self.stopped:
+            return 0
+
+        board_instance = self.board
+        key = board_instance.zobrist_key
+        if key in self.path:
+            return 0
+        if self.tablebase is not None and board_instance.piece_count() <= self.tablebase.max_pieces:
+            entry = self.tablebase.probe(board_instance)
+            if entry is not None:
+                wdl, dtm = entry
+                if wdl > 0:
+                    return MATE_SCORE - ply - dtm
+                if wdl < 0:
+                    return -MATE_SCORE + ply + dtm
+                return 0
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self.quiescence(color, alpha, beta, ply)
+
+        original_alpha = alpha
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry:
+            entry_depth, flag, score, tt_move = entry
+            if entry_depth >= depth:
+                score = self.score_from_tt(score, ply)
+                if flag == EXACT:
+                    return score
+                if flag == LOWER_BOUND and score >= beta:
+                    return score
+                if flag == UPPER_BOUND and score <= alpha:
+                    return score
+
+        legal_moves = board_instance.legal_moves(color)
+        if not legal_moves:
+            if board_instance.is_check(color)[0]:
+                return -MATE_SCORE + ply
+            return 0
+
+        best_score = -INFINITY
+        best_move = 0
+        self.path.append(key)
+        for move in self.order_moves(legal_moves, color, ply, tt_move):
+            target_piece = board_instance.get_piece(move[1])
+            record = board_instance.make_move(move)
+            score = -self.negamax(other_color(color), depth - 1, -beta, -alpha, ply + 1)
+            board_instance.unmake_move(record)
+            if self.stopped:
+                self.path.pop()
+                return 0
+            if score > best_score:
+                best_score = score
+                best_move = encode_move(move)
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not target_piece:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[color][best_move] += depth * depth
+                        break
+        self.path.pop()
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, self.score_to_tt(best_score, ply), best_move)
+        return best_score
+
+    def quiescence(self, color, alpha, beta, ply):
+        board_instance = self.board
+        stand_pat = evaluate(board_instance, color)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = [move for move in board_instance.legal_moves(color) if board_instance.get_piece(move[1])]
+        for move in self.order_moves(captures, color, ply):
+            self.nodes += 1
+            self.check_limits()
+            if self.stopped:
+                return 0
+            record = board_instance.make_move(move)
+            score = -self.quiescence(other_color(color), -beta, -alpha, ply + 1)
+            board_instance.unmake_move(record)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def order_moves(self, moves, color, ply, tt_move=None):
+        board_instance = self.board
+        killers = self.killers[ply] if ply < MAX_PLY else [None, None]
+        history = self.history[color]
+        scored = []
+        for move in moves:
+            encoded = encode_move(move)
+            target_piece = board_instance.get_piece(move[1])
+            if encoded == tt_move:
+                order = 10000000
+            elif target_piece:
+                # MVV-LVA: most valuable victim first, cheapest attacker first
+                attacker = board_instance.get_piece(move[0])
+                order = 1000000 + piece_values[target_piece.figure] * 10 - piece_values[attacker.figure] // 10
+            elif move == killers[0]:
+                order = 900000
+            elif move == killers[1]:
+                order = 800000
+            else:
+                order = history[encoded]
+            scored.append((order, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def score_to_tt(self, score, ply):
+        if score >= MATE_THRESHOLD:
+            return score + ply
+        if score <= -MATE_THRESHOLD:
+            return score - ply
+        return score
+
+    def score_from_tt(self, score, ply):
+        if score >= MATE_THRESHOLD:
+            return score - ply
+        if score <= -MATE_THRESHOLD:
+            return score + ply
+        return score
+
+    def principal_variation(self, color, depth):
+        pv = []
+        records = []
+        for _ in range(depth):
+            entry = self.tt.probe(self.board.zobrist_key)
+            if not entry:
+                break
+            move = decode_move(entry[3])
+            if move not in self.board.legal_moves(color):
+                break
+            pv.append(move)
+            records.append(self.board.make_move(move))
+            color = other_color(color)
+        for record in reversed(records):
+            self.board.unmake_move(record)
+        return pv
+
+
+def best_move(board_instance, color, max_depth=64, time_limit=None, node_limit=None, tt_memory_mb=16, tablebase=None):
+    return Search(board_instance, tt_memory_mb, tablebase).search(color, max_depth, time_limit, node_limit)
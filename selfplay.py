@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from board import Board
+from players import RandomPlayer, EnginePlayer, ENGINE_RANDOM_PLIES
+import encoder
+from notation import move_squares
+
+INDEX_FILE = 'index.json'
+PLANES = 12
+SIDE_TO_MOVE = True
+
+
+def record_dtype(planes=PLANES, side_to_move=SIDE_TO_MOVE):
+    # move holds the from/to square indices (row * 8 + col), outcome is +1/0/-1 for the side to move
+    return np.dtype([
+        ('position', np.int8, (encoder.plane_count(planes, side_to_move), 8, 8)),
+        ('move', np.int16, (2,)),
+        ('outcome', np.int8),
+    ])
+
+
+def play_game(players, max_plies=200, random_plies=0, rng=None):
+    # returns the serialized positions, the moves played from them and the result for white
+    board_instance = Board()
+    positions = []
+    moves = []
+    repetitions = {}
+    outcome = 0
+    for ply in range(max_plies):
+        color = board_instance.turn
+        legal_moves = board_instance.legal_moves(color)
+        if not legal_moves:
+            if board_instance.is_check(color)[0]:
+                outcome = -1 if color == 'white' else 1
+            break
+        # draws: threefold repetition or bare kings
+        repetitions[board_instance.zobrist_key] = repetitions.get(board_instance.zobrist_key, 0) + 1
+        if repetitions[board_instance.zobrist_key] >= 3 or len(board_instance.captured_pieces) == 30:
+            break
+
+        if ply < random_plies:
+            move = rng.choice(legal_moves)
+        else:
+            move = players[color].select_move(board_instance, color)
+        positions.append(board_instance.serialize())
+        moves.append(move_squares(move))
+        board_instance.make_move(move)
+    return positions, moves, outcome
+
+
+def opening_plies(policy, random_plies=None):
+    # None picks the policy's default, an engine policy without random plies would repeat one game
+    if random_plies is None:
+        return ENGINE_RANDOM_PLIES if policy == 'engine' else 0
+    if policy == 'engine' and random_plies < 1:
+        raise ValueError("the engine policy is deterministic, it needs random_plies > 0 for its games to differ")
+    return random_plies
+
+
+def make_players(policy, depth, seed):
+    if policy == 'random':
+        return {'white': RandomPlayer(seed), 'black': RandomPlayer(seed + 1)}
+    if policy == 'engine':
+        return {'white': EnginePlayer(max_depth=depth, seed=seed), 'black': EnginePlayer(max_depth=depth, seed=seed + 1)}
+    raise ValueError(f"unknown policy {policy!r}")
+
+
+def play_games(task, games_per_task, policy, depth, max_plies, random_plies, seed):
+    # runs in a worker process, deterministic for a given task number
+    random_plies = opening_plies(policy, random_plies)
+    rng = random.Random(seed * 1000003 + task)
+    players = make_players(policy, depth, rng.getrandbits(32))
+    positions, moves, outcomes = [], [], []
+    for _ in range(games_per_task):
+        game_positions, game_moves, outcome = play_game(players, max_plies, random_plies, rng)
+        positions.extend(game_positions)
+        moves.extend(game_moves)
+        for position in game_positions:
+            # byte 64 is the side to move, 0 for white
+            outcomes.append(outcome if position[64] == 0 else -outcome)
+    codes = encoder.stack_positions(positions) if positions else np.zeros((0, 65), dtype=np.int8)
+    return task, codes, np.array(moves, dtype=np.int16).reshape(-1, 2), np.array(outcomes, dtype=np.int8)
+
+
+def load_index(directory):
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as index_file:
+        return json.load(index_file)
+
+
+def load_shards(directory, mmap_mode='r'):
+    # memory-maps every finished shard, trimmed to its valid records
+    index = load_index(directory)
+    if index is None:
+        return []
+    return [np.load(os.path.join(directory, shard['file']), mmap_mode=mmap_mode)[:shard['records']] for shard in index['shards']]
+
+
+class ShardWriter:
+    # the index records the finished shards and the (task, offset) of the first record not in them,
+    # tasks are deterministic so a resumed run replays that task and skips what is already stored
+    def __init__(self, directory, shard_size, settings):
+        self.directory = directory
+        self.shard_size = shard_size
+        self.dtype = record_dtype()
+        os.makedirs(directory, exist_ok=True)
+        self.index = load_index(directory)
+        if self.index is None:
+            self.index = {'shard_size': shard_size, 'settings': settings, 'shards': [], 'next_task': 0, 'next_task_offset': 0}
+        elif self.index['shard_size'] != shard_size or self.index['settings'] != settings:
+            raise ValueError(f"{directory} was generated with different settings, resume with the same ones")
+        # leftovers of the shard that was being filled when the previous run stopped
+        for name in os.listdir(directory):
+            if name.endswith('.tmp.npy'):
+                os.remove(os.path.join(directory, name))
+        self.resume_task = self.index['next_task']
+        self.resume_offset = self.index['next_task_offset']
+        self.cursor = (self.resume_task, self.resume_offset)
+        self.shard = None
+        self.filled = 0
+
+    def shard_path(self, number, suffix='.npy'):
+        return os.path.join(self.directory, f"shard_{number:05d}{suffix}")
+
+    def open_shard(self):
+        path = self.shard_path(len(self.index['shards']), '.tmp.npy')
+        self.shard = np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype, shape=(self.shard_size,))
+        self.filled = 0
+
+    def close_shard(self):
+        number = len(self.index['shards'])
+        self.shard.flush()
+        self.shard = None
+        os.replace(self.shard_path(number, '.tmp.npy'), self.shard_path(number))
+        self.index['shards'].append({'file': os.path.basename(self.shard_path(number)), 'records': self.filled})
+        self.save_index()
+
+    def save_index(self):
+        self.index['next_task'], self.index['next_task_offset'] = self.cursor
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + '.tmp', 'w') as index_file:
+            json.dump(self.index, index_file, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def add(self, task, codes, moves, outcomes):
+        offset = self.resume_offset if task == self.resume_task else 0
+        while offset < len(codes):
+            if self.shard is None:
+                self.open_shard()
+            count = min(len(codes) - offset, self.shard_size - self.filled)
+            rows = slice(self.filled, self.filled + count)
+            encoder.encode_batch(codes[offset:offset + count], self.shard['position'][rows], PLANES, SIDE_TO_MOVE)
+            self.shard['move'][rows] = moves[offset:offset + count]
+            self.shard['outcome'][rows] = outcomes[offset:offset + count]
+            self.filled += count
+            offset += count
+            self.cursor = (task, offset) if offset < len(codes) else (task + 1, 0)
+            if self.filled == self.shard_size:
+                self.close_shard()
+        self.cursor = (task + 1, 0)
+
+    def close(self):
+        # the last shard keeps its fixed size, the index says how many records are valid
+        if self.shard is not None:
+            self.close_shard()
+        else:
+            self.save_index()
+
+
+def generate(directory, games, workers=2, shard_size=65536, games_per_task=4, policy='random', depth=1, max_plies=200, random_plies=None, seed=0):
+    random_plies = opening_plies(policy, random_plies)
+    settings = {
+        'games_per_task': games_per_task,
+        'policy': policy,
+        'depth': depth,
+        'max_plies': max_plies,
+        'random_plies': random_plies,
+        'seed': seed,
+        'planes': encoder.plane_count(PLANES, SIDE_TO_MOVE),
+    }
+    writer = ShardWriter(directory, shard_size, settings)
+    tasks = range(writer.index['next_task'], -(-games // games_per_task))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_games, task, games_per_task, policy, depth, max_plies, random_plies, seed) for task in tasks]
+        for future in futures:
+            writer.add(*future.result())
+    writer.close()
+    return writer.index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless self-play data generation into memory-mapped .npy shards")
+    parser.add_argument('directory')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--shard-size', type=int, default=65536)
+    parser.add_argument('--games-per-task', type=int, default=4)
+    parser.add_argument('--policy', choices=['random', 'engine'], default='random')
+    parser.add_argument('--depth', type=int, default=1)
+    parser.add_argument('--max-plies', type=int, default=200)
+    parser.add_argument('--random-plies', type=int, default=None, help=f"random opening plies per game, default 0 for random and {ENGINE_RANDOM_PLIES} for engine")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    index = generate(args.directory, args.games, args.workers, args.shard_size, args.games_per_task, args.policy,
+                     args.depth, args.max_plies, args.random_plies, args.seed)
+    records = sum(shard['records'] for shard in index['shards'])
+    print(f"{len(index['shards'])} shards, {records} records, {index['next_task'] * args.games_per_task} games")
+
+
+if __name__ == "__main__":
+    main()
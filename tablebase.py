@@ -0,0 +1,577 @@
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from board import Board
+from piece import colors, figures
+
+# Pawnless endgame tables, one byte per position, from the point of view of the side to move:
+# 0 draw, 255 illegal or not canonical, otherwise dtm + 1 where dtm is the distance to mate in plies
+# (odd dtm: the side to move mates, even dtm: it gets mated). The white king is mapped into the
+# a1-d1-d4 triangle by the 8 board symmetries.
+DRAW = 0
+UNKNOWN = 254
+ILLEGAL = 255
+
+figure_letters = {figures['King']: 'K', figures['Queen']: 'Q', figures['Rook']: 'R', figures['Bishop']: 'B', figures['Knight']: 'N'}
+letter_figures = {letter: figure for figure, letter in figure_letters.items()}
+letter_values = {'K': 0, 'Q': 9, 'R': 5, 'B': 3, 'N': 3}
+letter_order = 'KQRBN'
+
+
+def build_square_tables():
+    rows, cols = np.divmod(np.arange(64), 8)
+    transforms = []
+    for transpose in (False, True):
+        for flip_row in (False, True):
+            for flip_col in (False, True):
+                r = 7 - rows if flip_row else rows
+                c = 7 - cols if flip_col else cols
+                if transpose:
+                    r, c = c, r
+                transforms.append(r * 8 + c)
+    transforms = np.array(transforms)
+    in_triangle = (rows <= 3) & (cols <= 3) & (rows <= cols)
+    triangle_index = np.full(64, -1)
+    triangle_index[in_triangle] = np.arange(np.count_nonzero(in_triangle))
+    canon_transform = np.array([next(t for t in range(8) if triangle_index[transforms[t][sq]] >= 0) for sq in range(64)])
+    return transforms, triangle_index, canon_transform, rows == cols
+
+
+TRANSFORMS, TRIANGLE_INDEX, CANON_TRANSFORM, ON_DIAGONAL = build_square_tables()
+TRIANGLE_SQUARES = np.flatnonzero(TRIANGLE_INDEX >= 0)[np.argsort(TRIANGLE_INDEX[TRIANGLE_INDEX >= 0])]
+TRANSPOSE = 4
+
+ORTHOGONAL = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+KING_OFFSETS = ORTHOGONAL + DIAGONAL
+KNIGHT_OFFSETS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+slider_rays = {figures['Rook']: range(0, 4), figures['Bishop']: range(4, 8), figures['Queen']: range(0, 8)}
+
+
+def build_move_tables():
+    # leaper targets (64, 8) and ray squares (8 directions, 64, 7 steps), -1 when off the board
+    king = np.full((64, 8), -1)
+    knight = np.full((64, 8), -1)
+    rays = np.full((8, 64, 7), -1)
+    between = np.zeros((64, 64), dtype=np.uint64)
+    orthogonal = np.zeros((64, 64), dtype=bool)
+    diagonal = np.zeros((64, 64), dtype=bool)
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        for j, (dr, dc) in enumerate(KING_OFFSETS):
+            if 0 <= row + dr < 8 and 0 <= col + dc < 8:
+                king[sq, j] = (row + dr) * 8 + col + dc
+        for j, (dr, dc) in enumerate(KNIGHT_OFFSETS):
+            if 0 <= row + dr < 8 and 0 <= col + dc < 8:
+                knight[sq, j] = (row + dr) * 8 + col + dc
+        for d, (dr, dc) in enumerate(KING_OFFSETS):
+            mask = 0
+            for step in range(7):
+                r, c = row + dr * (step + 1), col + dc * (step + 1)
+                if not (0 <= r < 8 and 0 <= c < 8):
+                    break
+                rays[d, sq, step] = r * 8 + c
+                between[sq, r * 8 + c] = mask
+                (orthogonal if d < 4 else diagonal)[sq, r * 8 + c] = True
+                mask |= 1 << (r * 8 + c)
+    king_adjacent = np.zeros((64, 64), dtype=bool)
+    knight_adjacent = np.zeros((64, 64), dtype=bool)
+    for sq in range(64):
+        king_adjacent[sq, king[sq][king[sq] >= 0]] = True
+        knight_adjacent[sq, knight[sq][knight[sq] >= 0]] = True
+    return king, knight, rays, between, orthogonal, diagonal, king_adjacent, knight_adjacent
+
+
+KING_TARGETS, KNIGHT_TARGETS, RAYS, BETWEEN, ORTHOGONAL_LINE, DIAGONAL_LINE, KING_ADJACENT, KNIGHT_ADJACENT = build_move_tables()
+SQUARE_BITS = np.left_shift(np.uint64(1), np.arange(64, dtype=np.uint64))
+
+
+def sort_letters(letters):
+    return ''.join(sorted(letters, key=letter_order.index))
+
+
+def table_name(white, black):
+    # the stronger side is white in the file name, swapped says the position's colors must be exchanged
+    white, black = sort_letters(white), sort_letters(black)
+    strength = lambda side: (sum(letter_values[letter] for letter in side), len(side), [-letter_order.index(letter) for letter in side])
+    if strength(black) > strength(white):
+        return f"{black}v{white}", True
+    return f"{white}v{black}", False
+
+
+class TableSpec:
+    # piece order: white king, other white pieces, black king, other black pieces
+    def __init__(self, name):
+        white, black = name.split('v')
+        if table_name(white, black) != (name, False) or white[0] != 'K' or black[0] != 'K' or 'K' in white[1:] + black[1:]:
+            raise ValueError(f"not a canonical pawnless table name: {name!r}")
+        self.name = name
+        self.pieces = [(colors['white'], letter_figures[letter]) for letter in white] + [(colors['black'], letter_figures[letter]) for letter in black]
+        self.count = len(self.pieces)
+        self.color_pieces = [[k for k, (color, _) in enumerate(self.pieces) if color == side] for side in (0, 1)]
+        self.kings = [self.color_pieces[0][0], self.color_pieces[1][0]]
+        self.strides = [64 ** (self.count - 1 - k) for k in range(self.count)]
+        self.side_stride = 10 * self.strides[0]
+        self.size = 2 * self.side_stride
+        self.captures = {k: self.capture_table(k) for k, (_, figure) in enumerate(self.pieces) if figure != figures['King']}
+
+    def capture_table(self, captured):
+        # the table reached when piece captured is taken: (name or None for bare kings, swapped, column order)
+        remaining = [k for k in range(self.count) if k != captured]
+        letters = [''.join(figure_letters[self.pieces[k][1]] for k in remaining if self.pieces[k][0] == side) for side in (0, 1)]
+        name, swapped = table_name(*letters)
+        if name == 'KvK':
+            return None, False, remaining
+        order = []
+        for color, figure in TableSpec(name).pieces:
+            wanted = 1 - color if swapped else color
+            order.append(next(k for k in remaining if k not in order and self.pieces[k] == (wanted, figure)))
+        return name, swapped, order
+
+    def subtables(self):
+        return sorted({name for name, _, _ in self.captures.values() if name})
+
+    def encode(self, squares, side):
+        index = side * self.side_stride + TRIANGLE_INDEX[squares[:, 0]] * self.strides[0]
+        for k in range(1, self.count):
+            index = index + squares[:, k] * self.strides[k]
+        return index
+
+    def decode(self, index):
+        side, rest = np.divmod(index, self.side_stride)
+        squares = np.empty((len(index), self.count), dtype=np.int64)
+        triangle, rest = np.divmod(rest, self.strides[0])
+        squares[:, 0] = TRIANGLE_SQUARES[triangle]
+        for k in range(1, self.count):
+            squares[:, k], rest = np.divmod(rest, self.strides[k])
+        return squares, side
+
+    def canonical_index(self, squares, side):
+        # the smallest index over the symmetries that put the white king in the triangle
+        mapped = TRANSFORMS[CANON_TRANSFORM[squares[:, 0]][:, None], squares]
+        index = self.encode(mapped, side)
+        rows = np.flatnonzero(ON_DIAGONAL[mapped[:, 0]])
+        if len(rows):
+            index[rows] = np.minimum(index[rows], self.encode(TRANSFORMS[TRANSPOSE][mapped[rows]], side[rows]))
+        return index
+
+
+def attacked(spec, squares, target, color):
+    # whether target (one square per row) is attacked by the pieces of color
+    occupancy = np.zeros(len(squares), dtype=np.uint64)
+    for k in range(spec.count):
+        occupancy |= SQUARE_BITS[squares[:, k]]
+    result = np.zeros(len(squares), dtype=bool)
+    for k in spec.color_pieces[color]:
+        origin = squares[:, k]
+        figure = spec.pieces[k][1]
+        if figure == figures['King']:
+            result |= KING_ADJACENT[origin, target]
+        elif figure == figures['Knight']:
+            result |= KNIGHT_ADJACENT[origin, target]
+        else:
+            if figure == figures['Rook']:
+                lines = ORTHOGONAL_LINE[origin, target]
+            elif figure == figures['Bishop']:
+                lines = DIAGONAL_LINE[origin, target]
+            else:
+                lines = ORTHOGONAL_LINE[origin, target] | DIAGONAL_LINE[origin, target]
+            result |= lines & ((BETWEEN[origin, target] & occupancy) == 0)
+    return result
+
+
+def legal_positions(spec, squares, side):
+    # distinct squares, canonical, and the side that just moved is not in check
+    legal = np.ones(len(squares), dtype=bool)
+    for k in range(spec.count):
+        for l in range(k + 1, spec.count):
+            legal &= squares[:, k] != squares[:, l]
+    legal &= ~attacked(spec, squares, squares[:, spec.kings[1 - side]], side)
+    return legal
+
+
+def generate_moves(spec, squares, color, captures=True):
+    # all pseudo-legal moves of color as (row, squares after the move, captured piece or -1);
+    # with captures=False these are also the un-moves of the side that just moved
+    own = spec.color_pieces[color]
+    enemy = spec.color_pieces[1 - color]
+    rows, results, captured_pieces = [], [], []
+
+    def emit(k, target, mask, captured):
+        picked = np.flatnonzero(mask)
+        if len(picked):
+            moved = squares[picked]
+            moved[:, k] = target[picked]
+            rows.append(picked)
+            results.append(moved)
+            captured_pieces.append(captured[picked])
+
+    for k in own:
+        origin = squares[:, k]
+        figure = spec.pieces[k][1]
+        if figure in (figures['King'], figures['Knight']):
+            targets = (KING_TARGETS if figure == figures['King'] else KNIGHT_TARGETS)[origin]
+            steps = [(targets[:, j], targets[:, j] >= 0) for j in range(8)]
+            walks = [steps]
+        else:
+            walks = [[(RAYS[d, origin, step], None) for step in range(7)] for d in slider_rays[figure]]
+        for walk in walks:
+            alive = np.ones(len(squares), dtype=bool)
+            for target, valid in walk:
+                if valid is not None:
+                    # leaper offsets are independent of each other
+                    alive = valid
+                    if not alive.any():
+                        continue
+                else:
+                    alive = alive & (target >= 0)
+                    if not alive.any():
+                        break
+                blocked = np.zeros(len(squares), dtype=bool)
+                for l in own:
+                    if l != k:
+                        blocked |= squares[:, l] == target
+                captured = np.full(len(squares), -1)
+                for l in enemy:
+                    captured = np.where(squares[:, l] == target, l, captured)
+                empty = ~blocked & (captured < 0)
+                emit(k, target, alive & empty, captured)
+                if captures:
+                    emit(k, target, alive & (captured >= 0), captured)
+                if valid is None:
+                    alive = alive & empty
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, spec.count), dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(results), np.concatenate(captured_pieces)
+
+
+_open_tables = {}
+
+
+def open_table(path):
+    if path not in _open_tables:
+        _open_tables[path] = np.load(path, mmap_mode='r')
+    return _open_tables[path]
+
+
+def table_path(directory, name):
+    return os.path.join(directory, f"{name}.npy")
+
+
+def successor_codes(spec, directory, codes, moved, captured, side):
+    # codes of the positions after each move, seen from the side that moves next (side)
+    result = np.empty(len(moved), dtype=np.uint8)
+    plain = np.flatnonzero(captured < 0)
+    result[plain] = codes[spec.canonical_index(moved[plain], np.full(len(plain), side))]
+    for k in np.unique(captured[captured >= 0]):
+        rows = np.flatnonzero(captured == k)
+        name, swapped, order = spec.captures[k]
+        remaining = moved[rows][:, order]
+        if name is None:
+            # bare kings, legal unless they touch
+            result[rows] = np.where(KING_ADJACENT[remaining[:, 0], remaining[:, 1]], ILLEGAL, DRAW)
+            continue
+        sub_spec = TableSpec(name)
+        sub_side = np.full(len(rows), 1 - side if swapped else side)
+        result[rows] = open_table(table_path(directory, name))[sub_spec.canonical_index(remaining, sub_side)]
+    return result
+
+
+def evaluate_positions(name, directory, codes_path, index):
+    # per position: legal move count, best win (smallest successor loss code, 255 if none),
+    # whether a successor is a draw or unresolved, worst loss (largest successor win code) and check
+    spec = TableSpec(name)
+    codes = open_table(codes_path)
+    count = len(index)
+    moves = np.zeros(count, dtype=np.int32)
+    win = np.full(count, ILLEGAL, dtype=np.uint8)
+    undecided = np.zeros(count, dtype=bool)
+    loss = np.zeros(count, dtype=np.uint8)
+    in_check = np.zeros(count, dtype=bool)
+    squares, sides = spec.decode(index)
+    for side in (0, 1):
+        group = np.flatnonzero(sides == side)
+        if not len(group):
+            continue
+        group_squares = squares[group]
+        in_check[group] = attacked(spec, group_squares, group_squares[:, spec.kings[side]], 1 - side)
+        rows, moved, captured = generate_moves(spec, group_squares, side)
+        successor = successor_codes(spec, directory, codes, moved, captured, 1 - side)
+        legal = successor != ILLEGAL
+        rows, successor = group[rows[legal]], successor[legal]
+        np.add.at(moves, rows, 1)
+        losing = successor % 2 == 1
+        np.minimum.at(win, rows[losing], successor[losing])
+        undecided[rows[(successor == DRAW) | (successor == UNKNOWN)]] = True
+        winning = (successor % 2 == 0) & (successor != DRAW) & (successor != UNKNOWN)
+        np.maximum.at(loss, rows[winning], successor[winning])
+    return moves, win, undecided, loss, in_check
+
+
+def legal_range(name, start, stop):
+    spec = TableSpec(name)
+    squares, sides = spec.decode(np.arange(start, stop))
+    legal = np.zeros(stop - start, dtype=bool)
+    for side in (0, 1):
+        group = np.flatnonzero(sides == side)
+        legal[group] = legal_positions(spec, squares[group], side)
+    # every orbit keeps only its canonical index
+    legal &= spec.canonical_index(squares, sides) == np.arange(start, stop)
+    return start, legal
+
+
+def evaluate_range(name, directory, codes_path, start, stop):
+    codes = open_table(codes_path)
+    index = start + np.flatnonzero(codes[start:stop] != ILLEGAL)
+    return (index,) + evaluate_positions(name, directory, codes_path, index)
+
+
+def predecessors(spec, codes, index):
+    # canonical positions one un-move before index, the side that just moved is to move in them
+    squares, sides = spec.decode(index)
+    found = []
+    for side in (0, 1):
+        group = np.flatnonzero(sides == side)
+        if not len(group):
+            continue
+        _, moved, _ = generate_moves(spec, squares[group], 1 - side, captures=False)
+        found.append(spec.canonical_index(moved, np.full(len(moved), 1 - side)))
+    if not found:
+        return np.zeros(0, dtype=np.int64)
+    found = np.unique(np.concatenate(found))
+    return found[codes[found] != ILLEGAL]
+
+
+def run_chunks(executor, function, calls):
+    if executor is None:
+        return [function(*call) for call in calls]
+    futures = [executor.submit(function, *call) for call in calls]
+    return [future.result() for future in futures]
+
+
+def generate(directory, name, workers=None, chunk_size=1 << 16, log=None):
+    spec = TableSpec(name)
+    os.makedirs(directory, exist_ok=True)
+    for sub_name in spec.subtables():
+        if not os.path.exists(table_path(directory, sub_name)):
+            generate(directory, sub_name, workers, chunk_size, log)
+    start_time = time.perf_counter()
+    path = table_path(directory, name)
+    codes_path = path[:-4] + '.tmp.npy'
+    _open_tables.pop(codes_path, None)
+    codes = np.lib.format.open_memmap(codes_path, mode='w+', dtype=np.uint8, shape=(spec.size,))
+    win_at = np.zeros(spec.size, dtype=np.uint8)
+    pending = np.zeros(spec.size, dtype=np.uint8)
+    workers = workers or os.cpu_count()
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        ranges = [(start, min(start + chunk_size, spec.size)) for start in range(0, spec.size, chunk_size)]
+        for start, legal in run_chunks(executor, legal_range, [(name, start, stop) for start, stop in ranges]):
+            codes[start:start + len(legal)] = np.where(legal, UNKNOWN, ILLEGAL)
+        codes.flush()
+
+        # mates, stalemates and positions decided by captures into smaller tables
+        for index, moves, win, undecided, loss, in_check in run_chunks(executor, evaluate_range, [(name, directory, codes_path, start, stop) for start, stop in ranges]):
+            terminal = moves == 0
+            codes[index[terminal & in_check]] = 1
+            codes[index[terminal & ~in_check]] = DRAW
+            win_at[index[win != ILLEGAL]] = win[win != ILLEGAL]
+            decided = ~terminal & ~undecided & (win == ILLEGAL)
+            pending[index[decided]] = loss[decided]
+        codes.flush()
+
+        # retrograde by plies: positions one move before a loss are wins, positions one move
+        # before a win are losses once every move is known to lose
+        ply = 1
+        last_change = 0
+        while ply <= last_change + 2 or (win_at > ply).any() or (pending > ply).any():
+            if ply + 1 >= UNKNOWN:
+                raise ValueError(f"{name}: distance to mate does not fit in a byte")
+            frontier = np.flatnonzero(codes == ply)
+            candidates = predecessors(spec, codes, frontier)
+            candidates = candidates[codes[candidates] == UNKNOWN]
+            if ply % 2 == 1:
+                found = np.union1d(candidates, np.flatnonzero((win_at == ply) & (codes == UNKNOWN)))
+            else:
+                candidates = candidates[pending[candidates] == 0]
+                chunks = [(name, directory, codes_path, candidates[start:start + chunk_size]) for start in range(0, len(candidates), chunk_size)]
+                found = [np.flatnonzero((pending == ply) & (codes == UNKNOWN))]
+                for chunk, (moves, win, undecided, loss, _) in zip(chunks, run_chunks(executor, evaluate_positions, chunks)):
+                    lost = (moves > 0) & ~undecided & (win == ILLEGAL)
+                    later = lost & (loss > ply)
+                    pending[chunk[3][later]] = loss[later]
+                    found.append(chunk[3][lost & ~later])
+                found = np.concatenate(found)
+            codes[found] = ply + 1
+            codes.flush()
+            if len(found):
+                last_change = ply
+            if log:
+                log(f"{name} ply {ply}: {len(found)} positions")
+            ply += 1
+
+        codes[np.flatnonzero(codes == UNKNOWN)] = DRAW
+        codes.flush()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    del codes
+    _open_tables.pop(codes_path, None)
+    os.replace(codes_path, path)
+    table = np.load(path, mmap_mode='r')
+    return {
+        'table': name,
+        'positions': spec.size,
+        'legal': int(np.count_nonzero(table != ILLEGAL)),
+        'wins': int(np.count_nonzero((table != ILLEGAL) & (table != DRAW) & (table % 2 == 0))),
+        'losses': int(np.count_nonzero((table != ILLEGAL) & (table % 2 == 1))),
+        'draws': int(np.count_nonzero(table == DRAW)),
+        'longest_mate_plies': int(table[table != ILLEGAL].max()) - 1 if np.any((table != ILLEGAL) & (table != DRAW)) else 0,
+        'seconds': time.perf_counter() - start_time,
+    }
+
+
+def decode_code(code):
+    # (wdl, dtm) for the side to move: 1 win, 0 draw, -1 loss and plies to mate
+    if code == ILLEGAL or code == UNKNOWN:
+        return None
+    if code == DRAW:
+        return 0, 0
+    dtm = int(code) - 1
+    return (1 if dtm % 2 == 1 else -1), dtm
+
+
+class Tablebase:
+    def __init__(self, directory):
+        self.directory = directory
+        self.names = {file[:-4] for file in os.listdir(directory) if file.endswith('.npy') and not file.endswith('.tmp.npy')}
+        self.max_pieces = max((len(name) - 1 for name in self.names), default=0)
+        self.specs = {}
+
+    def lookup(self, white, black, side):
+        # white and black are (letter, square) lists, side is 0 when white is to move
+        name, swapped = table_name(''.join(letter for letter, _ in white), ''.join(letter for letter, _ in black))
+        if name == 'KvK':
+            return 0, 0
+        if name not in self.names:
+            return None
+        if name not in self.specs:
+            self.specs[name] = TableSpec(name)
+        spec = self.specs[name]
+        if swapped:
+            white, black, side = black, white, 1 - side
+        squares = []
+        for color, figure in spec.pieces:
+            side_pieces = white if color == colors['white'] else black
+            position = next(k for k, (letter, _) in enumerate(side_pieces) if letter_figures[letter] == figure)
+            squares.append(side_pieces.pop(position)[1])
+        index = spec.canonical_index(np.array([squares]), np.array([side]))[0]
+        return decode_code(open_table(table_path(self.directory, name))[index])
+
+    def probe(self, board_instance):
+        # None unless the position is covered by a generated table
+        pieces = ([], [])
+        grid = board_instance.board
+        for row in range(8):
+            for col in range(8):
+                piece = grid[row][col]
+                if piece:
+                    if piece.figure == figures['Pawn'] or len(pieces[0]) + len(pieces[1]) >= self.max_pieces:
+                        return None
+                    pieces[piece.color].append((figure_letters[piece.figure], row * 8 + col))
+        return self.lookup(list(pieces[0]), list(pieces[1]), colors[board_instance.turn])
+
+
+def all_tables(pieces):
+    # every pawnless table with the given number of pieces, weakest first
+    letters = 'QRBN'
+    names = set()
+    for extra in range(pieces - 2 + 1):
+        for white in combinations(letters, pieces - 2 - extra):
+            for black in combinations(letters, extra):
+                names.add(table_name('K' + white, 'K' + black)[0])
+    return sorted(names, key=lambda name: (len(name), name))
+
+
+def combinations(letters, count):
+    if count == 0:
+        return ['']
+    return sorted({sort_letters(letter + rest) for letter in letters for rest in combinations(letters, count - 1)})
+
+
+def verify(directory, name, samples=200, seed=0):
+    # every sampled position must agree with a one-move lookahead done with Board's own move generator
+    tablebase = Tablebase(directory)
+    spec = TableSpec(name)
+    table = open_table(table_path(directory, name))
+    rng = random.Random(seed)
+    legal = np.flatnonzero(table != ILLEGAL)
+    checked = 0
+    for index in rng.sample(list(legal), min(samples, len(legal))):
+        squares, sides = spec.decode(np.array([index]))
+        codes = bytearray(65)
+        for (color, figure), sq in zip(spec.pieces, squares[0]):
+            codes[sq] = figure if color == colors['white'] else 256 - figure
+        codes[64] = sides[0]
+        board_instance = Board.from_serialized(bytes(codes))
+        expected = tablebase.probe(board_instance)
+        legal_moves = board_instance.legal_moves(board_instance.turn)
+        if not legal_moves:
+            actual = (-1, 0) if board_instance.is_check(board_instance.turn)[0] else (0, 0)
+        else:
+            children = []
+            for move in legal_moves:
+                record = board_instance.make_move(move)
+                children.append(tablebase.probe(board_instance))
+                board_instance.unmake_move(record)
+            wins = [dtm for wdl, dtm in children if wdl == -1]
+            if wins:
+                actual = (1, min(wins) + 1)
+            elif any(wdl == 0 for wdl, _ in children):
+                actual = (0, 0)
+            else:
+                actual = (-1, max(dtm for _, dtm in children) + 1)
+        if actual != expected:
+            raise AssertionError(f"{name} index {index} ({board_instance.to_fen()}): table {expected}, lookahead {actual}")
+        checked += 1
+    return checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate, verify and probe pawnless endgame tables")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    generate_parser = subparsers.add_parser('generate', help="build tables and the smaller ones they need")
+    generate_parser.add_argument('directory')
+    generate_parser.add_argument('tables', nargs='*', help="names like KQvK or KRvKN, default all 3-piece tables")
+    generate_parser.add_argument('--pieces', type=int, choices=[3, 4], default=None, help="every table with this many pieces")
+    generate_parser.add_argument('--workers', type=int, default=None)
+    generate_parser.add_argument('--chunk-size', type=int, default=1 << 16)
+    verify_parser = subparsers.add_parser('verify', help="check sampled positions against a lookahead with Board")
+    verify_parser.add_argument('directory')
+    verify_parser.add_argument('tables', nargs='*')
+    verify_parser.add_argument('--samples', type=int, default=200)
+    probe_parser = subparsers.add_parser('probe', help="win/draw/loss and distance to mate of a position")
+    probe_parser.add_argument('directory')
+    probe_parser.add_argument('fen')
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        names = args.tables or all_tables(args.pieces or 3)
+        if args.pieces and args.tables:
+            names = args.tables + all_tables(args.pieces)
+        result = [generate(args.directory, name, args.workers, args.chunk_size) for name in names if not os.path.exists(table_path(args.directory, name))]
+    elif args.command == 'verify':
+        names = args.tables or sorted(Tablebase(args.directory).names)
+        result = {name: verify(args.directory, name, args.samples) for name in names}
+    else:
+        entry = Tablebase(args.directory).probe(Board.from_fen(args.fen))
+        result = {'fen': args.fen, 'wdl': entry[0], 'dtm_plies': entry[1]} if entry else {'fen': args.fen, 'wdl': None}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import random
+import pytest
+import arena
+
+
+def test_engine_games_differ():
+    histories = []
+    for game in range(4):
+        rng = random.Random(game)
+        white = arena.make_player('engine', 1, rng.getrandbits(32))
+        black = arena.make_player('engine', 1, rng.getrandbits(32))
+        state = arena.play_game(white, black, 16, 'board', arena.opening_plies(('engine', 'engine')), rng)
+        histories.append(tuple(map(str, state.history)))
+    assert len(set(histories)) == 4
+
+
+def test_engine_vs_engine_needs_random_plies():
+    with pytest.raises(ValueError):
+        arena.opening_plies(('engine', 'engine'), 0)
+    assert arena.opening_plies(('engine', 'random'), 0) == 0
+    assert arena.opening_plies(('random', 'random')) == 0
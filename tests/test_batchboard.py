@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from board import Board
+from batchboard import BatchBoard, batch_perft, compare_with_board, random_moves, ONGOING, CHECKMATE, NO_MOVE
+from notation import encode_move
+from perft import reference_positions
+
+
+@pytest.mark.parametrize('name', sorted(reference_positions))
+def test_perft_matches_reference_counts(name):
+    reference = reference_positions[name]
+    batch = BatchBoard.from_boards([Board.from_fen(reference['fen'])])
+    assert [batch_perft(batch, depth) for depth in (1, 2, 3)] == reference['nodes'][:3]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_games_match_board(seed):
+    # lockstep games: legal moves and check flags against Board.legal_moves / is_check at every ply
+    rng = np.random.default_rng(seed)
+    batch = BatchBoard.start(8)
+    for _ in range(60):
+        mask, in_check, terminal = batch.status()
+        assert compare_with_board(batch, mask, in_check) == []
+        moves = random_moves(mask, rng)
+        moves[terminal != ONGOING] = NO_MOVE
+        batch.apply(moves)
+
+
+def test_status_and_apply():
+    # fool's mate: the last move is played through apply and leaves white mated
+    board_instance = Board()
+    for move in ([(1, 5), (2, 5)], [(6, 4), (4, 4)], [(1, 6), (3, 6)]):
+        board_instance.make_move(move)
+    batch = BatchBoard.from_boards([board_instance, Board()])
+    batch.apply(np.array([encode_move([(7, 3), (3, 7)]), NO_MOVE]))
+    mask, in_check, terminal = batch.status()
+    assert list(in_check) == [True, False]
+    assert list(terminal) == [CHECKMATE, ONGOING]
+    assert batch.to_board(1).to_fen() == Board().to_fen()
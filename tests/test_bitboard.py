@@ -0,0 +1,48 @@
+import random
+import numpy as np
+import pytest
+from board import Board
+from bitboard import BitBoard
+from piece import other_color
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_moves_match_board(seed):
+    # seeded random games, both backends compared for both colors at every ply
+    rng = random.Random(seed)
+    board_instance = Board()
+    bitboard = BitBoard.from_board(board_instance)
+    turn = 'white'
+    for _ in range(60):
+        for color in ('white', 'black'):
+            assert sorted(bitboard.get_moves(color)) == sorted(board_instance.get_moves(color))
+            assert bitboard.is_check(color)[0] == board_instance.is_check(color)[0]
+        assert np.array_equal(bitboard.translate_to_matrix(), board_instance.translate_to_matrix())
+
+        legal = sorted(board_instance.get_moves_free_check(turn))
+        assert sorted(bitboard.get_moves_free_check(turn)) == legal
+        assert sorted(board_instance.legal_moves(turn)) == legal
+        assert sorted(bitboard.legal_moves(turn)) == legal
+        if not legal:
+            break
+        start_pos, end_pos = rng.choice(legal)
+        assert board_instance.move_piece(start_pos, end_pos)
+        assert bitboard.move_piece(start_pos, end_pos)
+        turn = other_color(turn)
+
+
+def test_unmake_restores_bitboards():
+    bitboard = BitBoard()
+    before = list(bitboard.bitboards)
+    records = [bitboard.make_move(move) for move in ([(1, 4), (3, 4)], [(6, 3), (4, 3)], [(3, 4), (4, 3)])]
+    for record in reversed(records):
+        bitboard.unmake_move(record)
+    assert bitboard.bitboards == before
+
+
+@pytest.mark.parametrize('make', [BitBoard, lambda: BitBoard.from_board(Board())])
+def test_first_poll_reports_start_position(make):
+    # ChessGame starts white's turn on the first is_changed poll
+    bitboard = make()
+    assert bitboard.is_changed()
+    assert not bitboard.is_changed()
@@ -0,0 +1,43 @@
+import io
+import random
+import numpy as np
+from board import Board
+from book import Book, build_book
+
+PGN = '''[Result "1-0"]
+1. e4 e5 2. Nf3 1-0
+
+[Result "0-1"]
+1. e4 c5 0-1
+
+[Result "1/2-1/2"]
+1. d4 d5 1/2-1/2
+'''
+
+E4, D4, C5 = [(1, 4), (3, 4)], [(1, 3), (3, 3)], [(6, 2), (4, 2)]
+
+
+def test_build_and_probe(tmp_path):
+    path = str(tmp_path / 'book.bin')
+    summary = build_book([io.StringIO(PGN)], path)
+    assert summary['games'] == 3
+    book = Book(path)
+    # the file is sorted by key, which is what the bisect lookup relies on
+    keys = book.records['key'].astype(np.uint64)
+    assert np.all(keys[1:] >= keys[:-1])
+
+    # 2 points per win and 1 per draw for the mover, best first
+    start = Board()
+    assert book.entries(start.zobrist_key) == [(E4, 2), (D4, 1)]
+    # black lost after 1... e5, so only the winning reply is kept
+    start.make_move(E4)
+    assert book.entries(start.zobrist_key) == [(C5, 2)]
+
+    board_instance = Board()
+    legal_moves = board_instance.legal_moves('white')
+    rng = random.Random(0)
+    chosen = {tuple(map(tuple, book.choose(board_instance, 'white', rng))) for _ in range(50)}
+    assert chosen == {tuple(E4), tuple(D4)}
+    assert all(list(move) in legal_moves for move in chosen)
+    assert book.choose(board_instance, 'white', best=True) == E4
+    assert book.choose(Board.from_fen('4k3/8/8/8/8/8/8/4K3 w - - 0 1'), 'white') is None
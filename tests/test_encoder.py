@@ -0,0 +1,61 @@
+import tracemalloc
+import numpy as np
+import pytest
+from board import Board
+from bitboard import BitBoard
+import encoder
+
+FENS = [
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b - - 0 1',
+]
+
+
+def board_planes(board_instance):
+    # (12, 8, 8) one-hot planes straight from the pieces: six white, then six black
+    planes = np.zeros((12, 8, 8), dtype=np.int8)
+    for row in range(8):
+        for col in range(8):
+            piece = board_instance.get_piece((row, col))
+            if piece:
+                planes[piece.color * 6 + piece.figure - 1, row, col] = 1
+    return planes
+
+
+@pytest.mark.parametrize('fen', FENS)
+def test_planes_match_the_board(fen):
+    board_instance = Board.from_fen(fen)
+    positions = [board_instance.serialize()]
+    expected = board_planes(board_instance)
+    twelve = encoder.encode_batch(positions, encoder.allocate(1, 12), 12)[0]
+    assert np.array_equal(twelve, expected)
+    six = encoder.encode_batch(positions, encoder.allocate(1, 6), 6)[0]
+    assert np.array_equal(six, expected[:6] - expected[6:])
+    assert np.array_equal(six, board_instance.translate_to_matrix())
+    assert np.array_equal(six, BitBoard.from_board(board_instance).translate_to_matrix())
+
+
+@pytest.mark.parametrize('fen, turn', [(FENS[0], 0), (FENS[1], 1)])
+@pytest.mark.parametrize('planes', [6, 12])
+def test_side_to_move_plane(fen, turn, planes):
+    out = encoder.encode_batch([Board.from_fen(fen).serialize()], encoder.allocate(1, planes, True), planes, True)
+    assert out.shape == (1, planes + 1, 8, 8)
+    assert np.all(out[0, -1] == turn)
+
+
+def test_six_planes_reject_unsigned_output():
+    with pytest.raises(ValueError):
+        encoder.encode_batch([Board().serialize()], encoder.allocate(1, 6, dtype=np.uint8), 6)
+
+
+def test_six_planes_with_scratch_allocate_nothing():
+    codes = encoder.stack_positions([Board.from_fen(fen).serialize() for fen in FENS] * 512)
+    out = encoder.allocate(len(codes), 6)
+    scratch = encoder.allocate_scratch(len(codes))
+    encoder.encode_batch(codes, out, 6, scratch=scratch)
+    tracemalloc.start()
+    encoder.encode_batch(codes, out, 6, scratch=scratch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # a (1024, 6, 8, 8) temporary would be 393 KB
+    assert peak < 64 * 1024
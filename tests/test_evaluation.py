@@ -0,0 +1,42 @@
+import random
+import pytest
+from board import Board
+from bitboard import BitBoard
+from piece import other_color
+import evaluation
+
+
+def scores(board_instance):
+    return board_instance.mg_score, board_instance.eg_score, board_instance.phase
+
+
+@pytest.mark.parametrize('backend', [Board, BitBoard])
+@pytest.mark.parametrize('seed', range(4))
+def test_incremental_scores_match_recompute(backend, seed):
+    # random games with captures: the scores kept by make/unmake never drift from a full recompute
+    rng = random.Random(seed)
+    board_instance = backend()
+    assert scores(board_instance) == board_instance.compute_scores()
+    turn = 'white'
+    records, history = [], []
+    for _ in range(100):
+        legal = board_instance.legal_moves(turn)
+        if not legal:
+            break
+        # captures first when there are any, so the material and phase terms change often
+        captures = [move for move in legal if board_instance.get_piece(move[1])]
+        history.append(scores(board_instance))
+        records.append(board_instance.make_move(rng.choice(captures or legal)))
+        assert scores(board_instance) == board_instance.compute_scores()
+        turn = other_color(turn)
+    assert len(board_instance.captured_pieces) > 4
+    for record, expected in zip(reversed(records), reversed(history)):
+        board_instance.unmake_move(record)
+        assert scores(board_instance) == expected
+        assert scores(board_instance) == board_instance.compute_scores()
+
+
+def test_backends_score_alike():
+    board_instance = Board.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w - - 0 1')
+    assert board_instance.compute_scores() == BitBoard.from_board(board_instance).compute_scores()
+    assert evaluation.evaluate(board_instance, 'white') == -evaluation.evaluate(board_instance, 'black')
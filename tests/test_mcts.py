@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from board import Board
+from mcts import MCTS, NumpyEvaluator
+
+BACK_RANK = '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1'
+
+
+@pytest.mark.parametrize('batch_size', [1, 8])
+def test_finds_back_rank_mate(batch_size):
+    board_instance = Board.from_fen(BACK_RANK)
+    result = MCTS(board_instance, NumpyEvaluator(seed=0), batch_size).search('white', 300)
+    assert result.best_move == [(0, 0), (7, 0)]
+    assert result.value == pytest.approx(1.0)
+    # the search plays and takes back its moves on the board it was given
+    assert board_instance.to_fen() == Board.from_fen(BACK_RANK).to_fen()
+
+
+@pytest.mark.parametrize('batch_size', [1, 16])
+def test_visits_add_up_after_virtual_loss(batch_size):
+    mcts = MCTS(Board(), NumpyEvaluator(seed=0), batch_size)
+    result = mcts.search('white', 200)
+    assert result.simulations == 200
+    first, count = mcts.first_child[0], mcts.child_count[0]
+    assert mcts.visits[first:first + count].sum() == result.simulations
+    assert sum(visits for _, visits in result.visits) == result.simulations
+    # the root holds its own evaluation plus one visit per playout
+    assert mcts.visits[0] == result.simulations + 1
+    # every virtual loss was taken back
+    assert not np.any(mcts.in_flight[:mcts.size])
@@ -0,0 +1,22 @@
+import pytest
+from board import Board
+from search import Search
+from parallel import ParallelSearch
+from perft import reference_positions
+
+
+@pytest.fixture(scope='module')
+def parallel_search():
+    with ParallelSearch(2) as parallel_search:
+        yield parallel_search
+
+
+@pytest.mark.parametrize('name', ['startpos', 'kiwipete'])
+def test_root_split_matches_single_process(parallel_search, name):
+    fen = reference_positions[name]['fen']
+    color = 'black' if fen.split()[1] == 'b' else 'white'
+    expected = Search(Board.from_fen(fen)).search(color, max_depth=2)
+    result = parallel_search.search(Board.from_fen(fen), color, max_depth=2)
+    assert result.score == expected.score
+    assert result.depth == 2
+    assert result.best_move in Board.from_fen(fen).legal_moves(color)
@@ -0,0 +1,23 @@
+import pytest
+import perft
+
+
+@pytest.mark.parametrize('backend', ['board', 'bitboard'])
+@pytest.mark.parametrize('generator', ['legal_moves', 'get_moves_free_check'])
+def test_reference_node_counts(backend, generator):
+    result = perft.run_suite(list(perft.reference_positions), 2, backend, generator)
+    for position in result['positions']:
+        for depth in position['depths']:
+            assert depth['nodes'] == depth['expected'], (position['position'], depth['depth'])
+    assert result['ok']
+
+
+def test_verify_checks_incremental_state():
+    assert perft.run_suite(['kiwipete'], 2, 'board', verify=True)['ok']
+
+
+def test_divide_sums_to_perft():
+    board_instance = perft.make_backend(perft.reference_positions['startpos']['fen'], 'board')
+    counts = perft.divide(board_instance, 2, 'white')
+    assert len(counts) == 20
+    assert sum(counts.values()) == 400
@@ -0,0 +1,42 @@
+import io
+import pytest
+import pgn
+from board import Board
+
+
+def read(text):
+    return [(game.sans, game.result) for game in pgn.read_games(io.StringIO(text))]
+
+
+def test_games_end_on_result_tokens():
+    assert read('1. e4 e5 2. Nf3 1-0\n1. d4 d5 0-1\n') == [(['e4', 'e5', 'Nf3'], '1-0'), (['d4', 'd5'], '0-1')]
+
+
+def test_result_inside_a_multiline_comment_does_not_end_the_game():
+    assert read('1. e4 {a comment with 1-0\n} e5 1/2-1/2\n') == [(['e4', 'e5'], '1/2-1/2')]
+
+
+def test_result_inside_a_multiline_variation_does_not_end_the_game():
+    assert read('1. e4 (1. d4 d5 1-0\n) e5 0-1\n1. d4 *\n') == [(['e4', 'e5'], '0-1'), (['d4'], '*')]
+
+
+def test_bracket_lines_inside_a_comment_are_not_headers():
+    games = list(pgn.read_games(io.StringIO('[Event "x"]\n1. e4 {\n[not a header]\n} e5 1-0\n')))
+    assert len(games) == 1
+    assert games[0].headers == {'Event': 'x'}
+    assert games[0].sans == ['e4', 'e5']
+
+
+def test_write_and_read_back():
+    moves = [[(1, 4), (3, 4)], [(6, 4), (4, 4)], [(0, 6), (2, 5)]]
+    stream = io.StringIO()
+    pgn.write_game(stream, moves, {'Event': 'test'}, '1-0')
+    (game,) = pgn.read_games(io.StringIO(stream.getvalue()))
+    assert game.moves() == moves
+    assert game.result == '1-0'
+
+
+@pytest.mark.parametrize('fen', ['', '   ', '8/8/8 w', 'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w'])
+def test_bad_fen_raises_value_error(fen):
+    with pytest.raises(ValueError):
+        Board.from_fen(fen)
@@ -0,0 +1,36 @@
+import pytest
+from board import Board
+from position import Position
+
+
+@pytest.mark.parametrize('fen', [
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b - - 0 1',
+])
+def test_board_round_trip(fen):
+    board_instance = Board.from_fen(fen)
+    position = Position.from_board(board_instance)
+    assert len(position.codes) == 65
+    assert position.turn == board_instance.turn
+    assert position.zobrist_key == board_instance.zobrist_key
+    restored = position.to_board()
+    assert restored.to_fen() == board_instance.to_fen()
+    assert restored.turn == board_instance.turn
+    assert restored.zobrist_key == board_instance.zobrist_key
+
+
+def test_after_move_matches_make_move():
+    board_instance = Board()
+    position = Position.from_board(board_instance)
+    move = [(0, 6), (2, 5)]
+    board_instance.make_move(move)
+    after = position.after_move(move)
+    assert after == Position.from_board(board_instance)
+    assert after.zobrist_key == board_instance.zobrist_key
+    assert after.get_code((2, 5)) == 3
+    assert Position().turn == 'white'
+
+
+def test_rejects_wrong_length():
+    with pytest.raises(ValueError):
+        Position(bytes(64))
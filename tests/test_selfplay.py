@@ -0,0 +1,15 @@
+import pytest
+import selfplay
+
+
+@pytest.mark.parametrize('policy', ['random', 'engine'])
+def test_tasks_play_different_games(policy):
+    games = [selfplay.play_games(task, 1, policy, 1, 20, None, 0)[1].tobytes() for task in range(3)]
+    assert len(set(games)) == 3
+    # and a task replays its own game
+    assert selfplay.play_games(0, 1, policy, 1, 20, None, 0)[1].tobytes() == games[0]
+
+
+def test_engine_policy_needs_random_plies():
+    with pytest.raises(ValueError):
+        selfplay.play_games(0, 1, 'engine', 1, 20, 0, 0)
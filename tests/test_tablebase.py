@@ -0,0 +1,39 @@
+import pytest
+from board import Board
+import tablebase
+
+
+@pytest.fixture(scope='module')
+def directory(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('tables'))
+    tablebase.generate(directory, 'KQvK', workers=1)
+    return directory
+
+
+def test_mate_in_one(directory):
+    # Qg7# or Qh7#, the queen is covered by the king on g6
+    board_instance = Board.from_fen('7k/Q7/6K1/8/8/8/8/8 w - - 0 1')
+    assert tablebase.Tablebase(directory).probe(board_instance) == (1, 1)
+
+
+def test_mated_and_stalemated(directory):
+    probe = tablebase.Tablebase(directory).probe
+    assert probe(Board.from_fen('7k/6Q1/6K1/8/8/8/8/8 b - - 0 1')) == (-1, 0)
+    assert probe(Board.from_fen('7k/5Q2/5K2/8/8/8/8/8 b - - 0 1')) == (0, 0)
+
+
+def test_symmetric_positions_agree(directory):
+    # the same mate in one mirrored left-right and flipped top-bottom with colors swapped
+    probe = tablebase.Tablebase(directory).probe
+    assert probe(Board.from_fen('k7/7Q/1K6/8/8/8/8/8 w - - 0 1')) == (1, 1)
+    assert probe(Board.from_fen('8/8/8/8/8/6k1/q7/7K b - - 0 1')) == (1, 1)
+
+
+def test_positions_outside_the_tables(directory):
+    probe = tablebase.Tablebase(directory).probe
+    assert probe(Board()) is None
+    assert probe(Board.from_fen('7k/R7/6K1/8/8/8/8/8 w - - 0 1')) is None
+
+
+def test_verify(directory):
+    assert tablebase.verify(directory, 'KQvK', samples=300) == 300
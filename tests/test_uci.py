@@ -0,0 +1,71 @@
+import asyncio
+import io
+import time
+import pytest
+from board import Board
+from search import Search
+import uci
+
+
+async def lines_of(commands):
+    for line in commands:
+        yield line
+
+
+def run_engine(commands):
+    output = io.StringIO()
+    asyncio.run(uci.UciEngine(output).run(lines_of(commands)))
+    return output.getvalue().splitlines()
+
+
+@pytest.mark.parametrize('command', [
+    'go wtime abc',
+    'setoption name Hash value x',
+    'setoption name BookFile value /nonexistent/book.bin',
+    'position fen',
+    'position fen 8/8/8 w',
+])
+def test_malformed_commands_are_ignored(command):
+    output = run_engine([command, 'isready', 'position startpos moves e2e4', 'go depth 1', 'quit'])
+    assert any(line.startswith('info string') for line in output)
+    assert 'readyok' in output
+    assert output[-1].startswith('bestmove ')
+
+
+def test_uci_move_text():
+    move = [(1, 4), (3, 4)]
+    assert uci.move_to_uci(move) == 'e2e4'
+    assert uci.uci_to_move('e2e4') == move
+    assert uci.uci_to_move('e2e9') is None
+    assert uci.uci_to_move('e7e8q') is None
+
+
+def test_deadline_set_before_the_search_starts_is_kept():
+    # a ponderhit can arrive before the worker thread has entered search()
+    search = Search(Board())
+    search.set_deadline(time.perf_counter() + 0.2)
+    start = time.perf_counter()
+    result = search.search('white', 64)
+    assert time.perf_counter() - start < 2
+    assert result.best_move is not None
+
+
+def test_position_moves_are_kept_for_repetition_detection():
+    engine = uci.UciEngine(io.StringIO())
+    engine.set_position('startpos moves g1f3 g8f6 f3g1 f6g8'.split())
+    assert engine.history[0] == Board().zobrist_key
+    assert len(engine.history) == 4
+    assert engine.board.zobrist_key == engine.history[0]
+
+
+def test_search_scores_a_repetition_of_the_game_history_as_a_draw():
+    # white is a queen up; moving the queen back to a square it stood on before repeats a game position
+    board_instance = Board.from_fen('4k3/8/8/8/8/8/8/Q3K3 w - - 0 1')
+    move = [(0, 0), (1, 0)]
+    record = board_instance.make_move(move)
+    repeated = board_instance.zobrist_key
+    board_instance.unmake_move(record)
+    search = Search(board_instance)
+    assert search.search('white', 2, root_moves=[move]).score > 500
+    search = Search(board_instance)
+    assert search.search('white', 2, root_moves=[move], history=[repeated]).score == 0
@@ -0,0 +1,86 @@
+import random
+import pytest
+from board import Board
+from bitboard import BitBoard
+from piece import other_color
+import zobrist
+
+backends = [Board, BitBoard]
+
+NF3, NF6, NC3, NC6 = [(0, 6), (2, 5)], [(7, 6), (5, 5)], [(0, 1), (2, 2)], [(7, 1), (5, 2)]
+
+
+def play(board_instance, moves):
+    return [board_instance.make_move(move) for move in moves]
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_transpositions_share_a_key(backend):
+    first, second = backend(), backend()
+    play(first, [NF3, NF6, NC3, NC6])
+    play(second, [NC3, NC6, NF3, NF6])
+    assert first.zobrist_key == second.zobrist_key
+    assert first.zobrist_key == first.compute_zobrist_key()
+    assert first.zobrist_key != backend().zobrist_key
+
+
+def test_backends_agree():
+    board_instance, bitboard = Board(), BitBoard()
+    assert board_instance.zobrist_key == bitboard.zobrist_key
+    play(board_instance, [NF3, NF6])
+    play(bitboard, [NF3, NF6])
+    assert board_instance.zobrist_key == bitboard.zobrist_key
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_side_to_move_is_part_of_the_key(backend):
+    # the same placement with the other side to move differs by exactly the side key
+    first = backend()
+    board_instance = Board.from_fen('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR b - - 0 1')
+    second = board_instance if backend is Board else BitBoard.from_board(board_instance)
+    assert second.turn == 'black'
+    assert first.zobrist_key ^ second.zobrist_key == zobrist.side_key
+    assert second.zobrist_key == second.compute_zobrist_key()
+
+
+@pytest.mark.parametrize('backend', backends)
+@pytest.mark.parametrize('seed', range(3))
+def test_incremental_key_matches_recompute(backend, seed):
+    # random games with captures: the key follows every make and comes back on every unmake
+    rng = random.Random(seed)
+    board_instance = backend()
+    turn = 'white'
+    records, keys = [], []
+    captures = 0
+    for _ in range(80):
+        legal = board_instance.legal_moves(turn)
+        if not legal:
+            break
+        keys.append(board_instance.zobrist_key)
+        pieces = board_instance.piece_count()
+        records.append(board_instance.make_move(rng.choice(legal)))
+        captures += board_instance.piece_count() != pieces
+        assert board_instance.zobrist_key == board_instance.compute_zobrist_key()
+        turn = other_color(turn)
+    assert captures
+    for record, key in zip(reversed(records), reversed(keys)):
+        board_instance.unmake_move(record)
+        assert board_instance.zobrist_key == key
+        assert board_instance.zobrist_key == board_instance.compute_zobrist_key()
+    assert board_instance.zobrist_key == backend().zobrist_key
+
+
+@pytest.mark.parametrize('backend', backends)
+def test_is_changed(backend):
+    board_instance = backend()
+    # the first poll reports the starting position, later polls only report a different position
+    assert board_instance.is_changed()
+    assert not board_instance.is_changed()
+    record = board_instance.make_move(NF3)
+    assert board_instance.is_changed()
+    assert not board_instance.is_changed()
+    # a move taken back before the next poll leaves the polled position unchanged
+    board_instance.unmake_move(board_instance.make_move(NF6))
+    assert not board_instance.is_changed()
+    board_instance.unmake_move(record)
+    assert board_instance.is_changed()
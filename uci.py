@@ -0,0 +1,265 @@
+import argparse
+import asyncio
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from board import Board
+from search import Search, MATE_SCORE, MATE_THRESHOLD
+from book import Book
+from notation import move_to_uci, uci_to_move
+from tablebase import Tablebase
+
+ENGINE_NAME = 'Chess_AI'
+# milliseconds kept back from every time budget for the GUI and the deadline check granularity
+MOVE_OVERHEAD = 50
+DEFAULT_MOVES_TO_GO = 30
+
+
+def score_to_uci(score):
+    if score >= MATE_THRESHOLD:
+        return f"mate {(MATE_SCORE - score + 1) // 2}"
+    if score <= -MATE_THRESHOLD:
+        return f"mate -{(MATE_SCORE + score) // 2}"
+    return f"cp {score}"
+
+
+def parse_go(tokens):
+    limits = {}
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token in ('ponder', 'infinite'):
+            limits[token] = True
+        elif token in ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo', 'mate') and index + 1 < len(tokens):
+            limits[token] = int(tokens[index + 1])
+            index += 1
+        elif token == 'searchmoves':
+            limits['searchmoves'] = []
+            while index + 1 < len(tokens) and uci_to_move(tokens[index + 1]):
+                limits['searchmoves'].append(uci_to_move(tokens[index + 1]))
+                index += 1
+        index += 1
+    return limits
+
+
+def allot_time(limits, color):
+    # seconds for this move, None without a clock
+    if 'movetime' in limits:
+        return max(10, limits['movetime'] - MOVE_OVERHEAD) / 1000
+    remaining = limits.get('wtime' if color == 'white' else 'btime')
+    if remaining is None:
+        return None
+    increment = limits.get('winc' if color == 'white' else 'binc', 0)
+    budget = remaining / limits.get('movestogo', DEFAULT_MOVES_TO_GO) + increment * 3 // 4
+    return max(10, min(budget, remaining / 2) - MOVE_OVERHEAD) / 1000
+
+
+class UciEngine:
+    def __init__(self, output=sys.stdout, hash_mb=16, book=None, tablebase=None):
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.hash_mb = hash_mb
+        self.book = Book(book) if book else None
+        self.tablebase = Tablebase(tablebase) if tablebase else None
+        self.rng = random.Random()
+        self.board = Board()
+        self.search = Search(self.board, hash_mb, self.tablebase)
+        # one worker: the search owns self.board until it reports
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.task = None
+        self.release = None
+        self.limits = {}
+        # keys of the positions before the current one, for repetition detection in the search
+        self.history = []
+
+    def send(self, line):
+        # the search thread streams info lines while the reader answers isready
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def send_info(self, result):
+        elapsed_ms = int(result.elapsed * 1000)
+        nps = int(result.nodes / result.elapsed) if result.elapsed > 0 else 0
+        pv = ' '.join(move_to_uci(move) for move in result.pv)
+        self.send(f"info depth {result.depth} score {score_to_uci(result.score)} nodes {result.nodes} nps {nps} "
+                  f"time {elapsed_ms} hashfull {int(self.search.tt.usage() * 1000)} pv {pv}".rstrip())
+
+    async def handle(self, line):
+        # False once the engine should exit
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        try:
+            return await self.dispatch(command, arguments)
+        except (ValueError, IndexError, OSError) as error:
+            # a malformed command (or a book/tablebase path that cannot be read) is reported and ignored
+            self.send(f"info string bad {command} command: {error}")
+            return True
+
+    async def dispatch(self, command, arguments):
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_NAME} contributors")
+            self.send("option name Hash type spin default 16 min 1 max 1024")
+            self.send("option name Ponder type check default false")
+            self.send("option name BookFile type string default <empty>")
+            self.send("option name TablebasePath type string default <empty>")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'setoption':
+            await self.stop_search()
+            self.set_option(arguments)
+        elif command == 'ucinewgame':
+            await self.stop_search()
+            self.search.tt.clear()
+        elif command == 'position':
+            await self.stop_search()
+            self.set_position(arguments)
+        elif command == 'go':
+            await self.stop_search()
+            self.go(arguments)
+        elif command == 'stop':
+            await self.stop_search()
+        elif command == 'ponderhit':
+            self.ponder_hit()
+        elif command == 'quit':
+            await self.stop_search()
+            return False
+        elif command not in ('debug', 'register'):
+            self.send(f"info string unknown command {command}")
+        return True
+
+    def set_option(self, arguments):
+        if 'name' not in arguments:
+            return
+        value_at = arguments.index('value') if 'value' in arguments else len(arguments)
+        name = ' '.join(arguments[arguments.index('name') + 1:value_at]).lower()
+        value = ' '.join(arguments[value_at + 1:])
+        if name == 'hash':
+            self.hash_mb = max(1, int(value))
+            self.search = Search(self.board, self.hash_mb, self.tablebase)
+        elif name == 'bookfile':
+            self.book = Book(value) if value and value != '<empty>' else None
+        elif name == 'tablebasepath':
+            self.tablebase = Tablebase(value) if value and value != '<empty>' else None
+            self.search.tablebase = self.tablebase
+
+    def set_position(self, arguments):
+        moves_at = arguments.index('moves') if 'moves' in arguments else len(arguments)
+        try:
+            if arguments and arguments[0] == 'fen':
+                board_instance = Board.from_fen(' '.join(arguments[1:moves_at]))
+            else:
+                board_instance = Board()
+        except ValueError as error:
+            self.send(f"info string bad fen: {error}")
+            return
+        history = []
+        for text in arguments[moves_at + 1:]:
+            move = uci_to_move(text)
+            if move is None or move not in board_instance.legal_moves(board_instance.turn):
+                self.send(f"info string illegal move {text}")
+                break
+            history.append(board_instance.zobrist_key)
+            board_instance.make_move(move)
+        self.board = board_instance
+        self.history = history
+        # the search keeps its transposition table across positions
+        self.search.board = board_instance
+
+    def go(self, arguments):
+        self.limits = limits = parse_go(arguments)
+        color = self.board.turn
+        hold = bool(limits.get('ponder') or limits.get('infinite'))
+        if self.book is not None and not hold:
+            move = self.book.choose(self.board, color, self.rng)
+            if move is not None:
+                self.send(f"bestmove {move_to_uci(move)}")
+                return
+        max_depth = limits.get('depth', limits['mate'] * 2 if 'mate' in limits else 64)
+        time_limit = None if hold else allot_time(limits, color)
+        self.search.stop_requested = False
+        self.search.requested_deadline = None
+        self.release = asyncio.Event()
+        if not hold:
+            self.release.set()
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor, self.search.search, color, max_depth, time_limit, limits.get('nodes'), self.send_info, limits.get('searchmoves'), self.history)
+        self.task = asyncio.ensure_future(self.report(future))
+
+    async def report(self, future):
+        result = await future
+        # a ponder or infinite search that finishes early still waits for stop or ponderhit
+        await self.release.wait()
+        if result.best_move is None:
+            self.send("bestmove 0000")
+            return
+        line = f"bestmove {move_to_uci(result.best_move)}"
+        if len(result.pv) > 1:
+            line += f" ponder {move_to_uci(result.pv[1])}"
+        self.send(line)
+
+    def ponder_hit(self):
+        # the predicted move was played, keep searching on the clock the go ponder command gave
+        if self.task is None or self.task.done():
+            return
+        time_limit = allot_time(self.limits, self.board.turn)
+        if time_limit is not None:
+            self.search.set_deadline(time.perf_counter() + time_limit)
+        self.release.set()
+
+    async def stop_search(self):
+        if self.task is None:
+            return
+        self.search.stop()
+        self.release.set()
+        await self.task
+        self.task = None
+
+    async def run(self, lines):
+        async for line in lines:
+            if not await self.handle(line):
+                break
+        await self.stop_search()
+        self.executor.shutdown()
+
+
+async def read_lines(stream):
+    # a stream reader on the pipe keeps the event loop free while the search thread runs,
+    # regular files (input redirected from disk) are read on a thread instead
+    loop = asyncio.get_running_loop()
+    try:
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stream)
+    except (ValueError, OSError, NotImplementedError):
+        reader = None
+    while True:
+        if reader is not None:
+            line = (await reader.readline()).decode('utf-8', errors='replace')
+        else:
+            line = await loop.run_in_executor(None, stream.readline)
+        if not line:
+            return
+        yield line.strip()
+
+
+async def serve(engine, stream=sys.stdin):
+    await engine.run(read_lines(stream))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UCI engine over stdin/stdout")
+    parser.add_argument('--hash', type=int, default=16, help="transposition table size in MB")
+    parser.add_argument('--book', default=None)
+    parser.add_argument('--tablebase', default=None, help="directory of generated endgame tables")
+    args = parser.parse_args()
+    asyncio.run(serve(UciEngine(sys.stdout, args.hash, args.book, args.tablebase)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import random
+
+# fixed seed so keys are stable across runs and processes (books, caches, shards)
+_rng = random.Random(0x5EED)
+
+# piece_keys[color][figure][row * 8 + col], figure 0 is unused
+piece_keys = [[[_rng.getrandbits(64) for _ in range(64)] for _ in range(7)] for _ in range(2)]
+side_key = _rng.getrandbits(64)
+
+
+def piece_key(piece, position):
+    return piece_keys[piece.color][piece.figure][position[0] * 8 + position[1]]